@@ -0,0 +1,4 @@
+import time
+
+# when the worker started importing the app, see `APP_STARTUP_DURATION_SECONDS`
+IMPORT_STARTED_AT = time.perf_counter()
@@ -1,4 +1,6 @@
+from collections.abc import Iterable
 from typing import Annotated, Literal
+from uuid import UUID
 
 from fastapi import Depends, HTTPException, Security, status
 from fastapi.security import OAuth2PasswordBearer, SecurityScopes
@@ -8,8 +10,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
 from app.core.db import get_db_session
-from app.core.security import APIScope, decode_jwt_subject
-from app.models import User
+from app.core.security import APIScope, decode_jwt, decode_jwt_subject
+from app.models import Organization, RevokedToken, User
+from app.models.organizations import OrganizationMemberPermission
+from app.models.schemas.api import TokenSubject
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/auth/access-token"
@@ -37,23 +41,34 @@ async def get_current_user(
         headers={"WWW-Authenticate": authenticate_value},
     )
     try:
-        subject = decode_jwt_subject(token)
+        claims = decode_jwt(token)
+        subject = claims.subject
         if token_type != subject.type:
             raise ValidationError("invalid token type")
     except (InvalidTokenError, ValidationError) as error:
         if isinstance(error, ExpiredSignatureError):
             credentials_exception.detail = "Token has expired"
         raise credentials_exception from error
+    if claims.jti and await RevokedToken.objects.is_revoked(claims.jti):
+        credentials_exception.detail = "Token has been revoked"
+        raise credentials_exception
     try:
         user: User = await User.objects.get(session, User.id == subject.user_id)
     except User.DoesNotExist:
         raise HTTPException(status_code=404, detail="User not found")
+    if (
+        user.tokens_valid_after
+        and (claims.issued_at or 0) < user.tokens_valid_after.timestamp()
+    ):
+        credentials_exception.detail = "Token has been revoked"
+        raise credentials_exception
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user, contact admin")
-    if not user.is_email_verified:
+    if not user.is_email_verified and token_type != "verification_token":
         raise HTTPException(status_code=400, detail="User pending email verification")
     for scope in security_scopes.scopes:
-        if scope not in subject.scopes:
+        # organization permissions are checked per organization by `OrganizationPermissions`
+        if scope in APIScope and scope not in subject.scopes:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Not enough permissions",
@@ -97,3 +112,103 @@ CurrentUserViaEmailVerificationToken = Annotated[
         get_current_user_via_verification_token, scopes=[APIScope.EMAIL_VERIFICATION]
     ),
 ]
+
+
+class OrganizationPermissions:
+    """Authorizes the current user for the organization permissions required by the
+    route, from the permission claims of the access token.
+
+    The claims are trusted while the token's `permissions_version` matches the user's,
+    otherwise (or when the token has no claims) the user's membership is read from the
+    organization.
+    """
+
+    def __init__(
+        self,
+        user: User,
+        subject: TokenSubject,
+        required_permissions: list[OrganizationMemberPermission],
+    ):
+        self.user = user
+        self.subject = subject
+        self.required_permissions = required_permissions
+
+    @property
+    def has_fresh_claims(self) -> bool:
+        return (
+            self.subject.organization_permissions is not None
+            and self.subject.permissions_version == self.user.permissions_version
+        )
+
+    async def authorize(
+        self,
+        organization_id: UUID,
+        grants: Iterable[OrganizationMemberPermission] = (),
+    ) -> list[OrganizationMemberPermission]:
+        """Returns the permissions of the user in the organization, `grants` are the
+        permissions the user gives to other members, they can only give the ones they
+        have.
+
+        Raises:
+            HTTPException: 404 if the user is not a member of the organization, 403 if
+                they are missing any of the required or granted permissions
+        """
+        if self.has_fresh_claims:
+            permissions = self.subject.organization_permissions.get(organization_id)
+        else:
+            permissions = (
+                await Organization.objects.get_member_permissions(
+                    self.user.id, Organization.id == organization_id
+                )
+            ).get(organization_id)
+        if permissions is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="organization not found"
+            )
+        if not all(
+            permission in permissions for permission in self.required_permissions
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="you don't have the permissions required for this action "
+                "in the organization",
+            )
+        if not all(permission in permissions for permission in grants):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="you can't grant permissions you don't have in the organization",
+            )
+        return permissions
+
+
+async def get_organization_permissions(
+    security_scopes: SecurityScopes,
+    current_user: CurrentUser,
+    token: TokenDep,
+) -> OrganizationPermissions:
+    required_permissions = [
+        OrganizationMemberPermission(scope)
+        for scope in security_scopes.scopes
+        if scope in OrganizationMemberPermission
+    ]
+    # the token was verified by `get_current_user`, this is served from the token cache
+    subject = decode_jwt_subject(token)
+    return OrganizationPermissions(current_user, subject, required_permissions)
+
+
+def require_organization_permissions(*permissions: OrganizationMemberPermission):
+    """Route dependency authorizing the current user for `permissions`.
+
+    Example:
+        async def create_event(
+            data: CreateEvent,
+            permissions: Annotated[
+                OrganizationPermissions,
+                require_organization_permissions(
+                    OrganizationMemberPermission.MANAGE_EVENTS
+                ),
+            ],
+        ):
+            await permissions.authorize(data.organization_id)
+    """
+    return Security(get_organization_permissions, scopes=list(permissions))
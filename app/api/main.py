@@ -1,10 +1,11 @@
 from fastapi import APIRouter
 
-from app.api.routes import attendees, auth, events, organizations, users
+from app.api.routes import attendees, auth, events, organizations, tags, users
 
 api_router = APIRouter()
 api_router.include_router(attendees.router, tags=["attendees"])
 api_router.include_router(auth.router, tags=["auth"])
 api_router.include_router(events.router, tags=["events"])
 api_router.include_router(organizations.router, tags=["organizations"])
+api_router.include_router(tags.router, tags=["tags"])
 api_router.include_router(users.router, tags=["users"])
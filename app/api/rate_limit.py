@@ -0,0 +1,145 @@
+import math
+import time
+from collections.abc import Callable
+from typing import Annotated, Any, Protocol
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordRequestForm
+from pydantic import EmailStr
+
+from app.api.deps import CurrentUser, CurrentUserViaEmailVerificationToken
+from app.core.config import settings
+from app.models.rate_limits import RateLimitWindow
+
+
+class RateLimitStore(Protocol):
+    async def hit(self, key: str, window_seconds: int) -> tuple[int, int, float]:
+        """Records a hit for `key` in the current fixed window. Returns the hits of the
+        current window, the hits of the previous window and the elapsed fraction of
+        the current window"""
+        ...
+
+
+class InMemoryRateLimitStore:
+    """Per-process store, each app worker enforces the limits on its own"""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        # key -> (window size, window index, current window hits, previous window hits)
+        self._windows: dict[str, tuple[int, int, int, int]] = {}
+
+    async def hit(self, key: str, window_seconds: int) -> tuple[int, int, float]:
+        now = time.time()
+        window, elapsed = divmod(now, window_seconds)
+        window = int(window)
+        _, last_window, current, previous = self._windows.get(
+            key, (window_seconds, window, 0, 0)
+        )
+        if last_window == window - 1:
+            current, previous = 0, current
+        elif last_window < window - 1:
+            current, previous = 0, 0
+        current += 1
+        self._windows[key] = (window_seconds, window, current, previous)
+        if len(self._windows) > self.max_keys:
+            self._prune(now)
+        return current, previous, elapsed / window_seconds
+
+    def _prune(self, now: float) -> None:
+        """Drops the keys whose windows can no longer affect a limit, then the oldest
+        keys if the store is still full"""
+        self._windows = {
+            key: entry
+            for key, entry in self._windows.items()
+            if entry[1] >= now // entry[0] - 1
+        }
+        while len(self._windows) > self.max_keys // 2:
+            del self._windows[next(iter(self._windows))]
+
+
+class DatabaseRateLimitStore:
+    """Store shared by all the app workers, backed by the `rate_limit_windows` table"""
+
+    async def hit(self, key: str, window_seconds: int) -> tuple[int, int, float]:
+        return await RateLimitWindow.objects.hit(key, window_seconds)
+
+
+rate_limit_store: RateLimitStore = (
+    DatabaseRateLimitStore()
+    if settings.RATE_LIMIT_STORE == "database"
+    else InMemoryRateLimitStore()
+)
+
+
+class RateLimit:
+    """Sliding window limit of `limit` hits per `window_seconds` for each identity.
+
+    The sliding window is approximated from two fixed windows, the hits of the
+    previous window are weighted by the part of it still covered by the sliding window.
+    """
+
+    def __init__(self, scope: str, limit: int, window_seconds: int):
+        self.scope = scope
+        self.limit = limit
+        self.window_seconds = window_seconds
+
+    async def hit(self, identity: str) -> None:
+        """
+        Raises:
+            HTTPException: 429 with a `Retry-After` header if the limit is exceeded
+        """
+        current, previous, elapsed = await rate_limit_store.hit(
+            f"{self.scope}:{identity}", self.window_seconds
+        )
+        if previous * (1 - elapsed) + current > self.limit:
+            retry_after = math.ceil(self.window_seconds * (1 - elapsed))
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests, try again later",
+                headers={"Retry-After": str(retry_after)},
+            )
+
+
+def client_ip(request: Request) -> str:
+    if settings.RATE_LIMIT_TRUST_X_FORWARDED_FOR:
+        forwarded_for = request.headers.get("x-forwarded-for")
+        if forwarded_for:
+            return forwarded_for.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def query_email(email: EmailStr) -> str:
+    return email.lower()
+
+
+def form_username(form_data: Annotated[OAuth2PasswordRequestForm, Depends()]) -> str:
+    return form_data.username.lower()
+
+
+def verification_token_user(user: CurrentUserViaEmailVerificationToken) -> str:
+    return str(user.id)
+
+
+def current_user_id(user: CurrentUser) -> str:
+    return str(user.id)
+
+
+def rate_limit(
+    scope: str,
+    limit: int,
+    window_seconds: int,
+    key: Callable[..., Any] = client_ip,
+) -> Any:
+    """Route dependency enforcing a `RateLimit`, `key` is a dependency returning the
+    identity the limit applies to (e.g. the client ip, the email or the user id).
+
+    Example:
+        @router.post("/signup/", dependencies=[rate_limit("signup", 10, 60 * 60)])
+    """
+    limiter = RateLimit(scope, limit, window_seconds)
+
+    async def enforce_rate_limit(identity: Annotated[str, Depends(key)]) -> None:
+        if settings.RATE_LIMIT_ENABLED:
+            await limiter.hit(identity)
+
+    return Depends(enforce_rate_limit)
@@ -1,14 +1,28 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, status
 
-from app.core.utils import ENDPOINT_NOT_IMPLEMENTED
+from app.models import Attendee, Event
+from app.models.schemas.api import ResponseData
+from app.models.schemas.attendees import AttendeePublic, CreateAttendee
 
 router = APIRouter(prefix="/attendees")
 
 
-@router.post("/")
-async def create_attendee():
+@router.post("/", status_code=status.HTTP_201_CREATED)
+async def create_attendee(data: CreateAttendee):
     """Create an attendees.
 
     Attendees are users who sign up for an event
     """
-    raise ENDPOINT_NOT_IMPLEMENTED
+    try:
+        attendee = await Attendee.objects.rsvp(data)
+    except Event.DoesNotExist as error:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=str(error)
+        ) from error
+    except Attendee.AlreadyExist as error:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail=str(error)
+        ) from error
+    return ResponseData[AttendeePublic](
+        detail="RSVP successful", data=AttendeePublic.model_validate(attendee)
+    )
@@ -3,20 +3,32 @@ from typing import Annotated
 
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from jwt.exceptions import InvalidTokenError
 from pydantic import EmailStr
+from starlette.concurrency import run_in_threadpool
 
 from app.api.deps import (
+    CurrentUser,
     CurrentUserViaEmailVerificationToken,
     CurrentUserViaRefreshToken,
+    TokenDep,
+)
+from app.api.rate_limit import (
+    form_username,
+    query_email,
+    rate_limit,
+    verification_token_user,
 )
 from app.core import security
 from app.core.config import settings
 from app.core.email_service import EmailService
 from app.core.security import DEFAULT_USER_SCOPES, APIScope
-from app.models import User
+from app.core.utils import aware_datetime_now
+from app.models import Organization, RevokedToken, User
 from app.models.otp import OTPPurpose, OTPRecord
 from app.models.schemas.api import (
     AuthToken,
+    Logout,
     PasswordReset,
     ResponseData,
     TokenSubject,
@@ -33,6 +45,13 @@ async def get_email_verification_client_verification_token(
     otp: OTPRecord = await OTPRecord.objects.create_otp(
         user_id=user.id, purpose=OTPPurpose.EMAIL_VERIFICATION
     )
+    return send_email_verification_otp(user, otp, background_tasks)
+
+
+def send_email_verification_otp(
+    user: User, otp: OTPRecord, background_tasks: BackgroundTasks
+) -> str:
+    """Sends the OTP to the user in the background and returns the verification token"""
     email_service = EmailService()
     task_kwargs = {"email": user.email, "name": user.first_name, "otp": otp.code}
     background_tasks.add_task(email_service.send_verification_email, **task_kwargs)
@@ -49,11 +68,28 @@ async def get_email_verification_client_verification_token(
     )
 
 
-def generate_auth_token(user: User) -> AuthToken:
+async def generate_auth_token(user: User) -> AuthToken:
+    """Issues the access and refresh tokens, the access token carries the user's
+    organization permissions so permission checks don't read the organizations.
+
+    `user` must be loaded before the memberships are read, a membership change between
+    the two reads then leaves the claims flagged as stale by `permissions_version`.
+    """
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     refresh_token_expires = timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES)
+    organization_permissions = await Organization.objects.get_member_permissions(
+        user.id, limit=settings.TOKEN_MAX_ORGANIZATION_CLAIMS + 1
+    )
+    if len(organization_permissions) > settings.TOKEN_MAX_ORGANIZATION_CLAIMS:
+        organization_permissions = None
     access_token_subject = TokenSubject.model_validate(
-        {"type": "access_token", "user_id": user.id, "scopes": DEFAULT_USER_SCOPES}
+        {
+            "type": "access_token",
+            "user_id": user.id,
+            "scopes": DEFAULT_USER_SCOPES,
+            "organization_permissions": organization_permissions,
+            "permissions_version": user.permissions_version,
+        }
     )
     refresh_token_subject = TokenSubject.model_validate(
         {"type": "refresh_token", "user_id": user.id, "scopes": DEFAULT_USER_SCOPES}
@@ -68,7 +104,11 @@ def generate_auth_token(user: User) -> AuthToken:
     )
 
 
-@router.post("/signup/", status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/signup/",
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[rate_limit("signup:ip", limit=10, window_seconds=60 * 60)],
+)
 async def signup_via_email(data: CreateUser, background_tasks: BackgroundTasks):
     """Signup to EventTrakka with the email flow.
 
@@ -84,15 +124,13 @@ async def signup_via_email(data: CreateUser, background_tasks: BackgroundTasks):
     as the bearer token of the request and the OTP the user entered.
     """
     try:
-        user = await User.objects.create_user(
+        user, otp = await User.objects.signup(
             email=data.email,
             password=data.password,
             first_name=data.first_name,
             last_name=data.last_name,
         )
-        token = await get_email_verification_client_verification_token(
-            user, background_tasks
-        )
+        token = send_email_verification_otp(user, otp, background_tasks)
         return ResponseData(
             detail="Signup successful, verify email address via the email sent to user",
             data=VerificationToken.model_validate({"verification_token": token}),
@@ -105,18 +143,26 @@ async def signup_via_email(data: CreateUser, background_tasks: BackgroundTasks):
         ) from error
 
 
-@router.post("/verify-email/")
+@router.post(
+    "/verify-email/",
+    dependencies=[
+        rate_limit(
+            "verify-email:user",
+            limit=5,
+            window_seconds=60 * 10,
+            key=verification_token_user,
+        )
+    ],
+)
 async def verify_email(user: CurrentUserViaEmailVerificationToken, otp: str):
     """Verify the email address of the signed-up user after email link opened."""
     try:
-        otp_record: OTPRecord = await OTPRecord.objects.get(
-            None,
-            OTPRecord.purpose == OTPPurpose.EMAIL_VERIFICATION,
-            OTPRecord.user_id == user.id,
-            OTPRecord.code == otp,
+        await OTPRecord.objects.consume(
+            user_id=user.id,
+            purpose=OTPPurpose.EMAIL_VERIFICATION,
+            code=otp,
+            user_update_data={"is_email_verified": True},
         )
-        await user.objects.update(id=user.id, update_data={"is_email_verified": True})
-        await otp_record.objects.delete(id=otp_record.id, session=None)
         return ResponseData(detail="Email verification successful")
     except OTPRecord.DoesNotExist as error:
         raise HTTPException(
@@ -125,7 +171,18 @@ async def verify_email(user: CurrentUserViaEmailVerificationToken, otp: str):
         ) from error
 
 
-@router.post("/resend-verify-email/")
+@router.post(
+    "/resend-verify-email/",
+    dependencies=[
+        rate_limit("resend-verify-email:ip", limit=20, window_seconds=60 * 60),
+        rate_limit(
+            "resend-verify-email:user",
+            limit=3,
+            window_seconds=60 * 10,
+            key=verification_token_user,
+        ),
+    ],
+)
 async def resend_verify_email(
     user: CurrentUserViaEmailVerificationToken, background_tasks: BackgroundTasks
 ):
@@ -139,7 +196,15 @@ async def resend_verify_email(
     )
 
 
-@router.post("/access-token/")
+@router.post(
+    "/access-token/",
+    dependencies=[
+        rate_limit("access-token:ip", limit=30, window_seconds=60 * 5),
+        rate_limit(
+            "access-token:email", limit=10, window_seconds=60 * 5, key=form_username
+        ),
+    ],
+)
 async def obtain_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
     background_tasks: BackgroundTasks,
@@ -170,18 +235,51 @@ async def obtain_access_token(
             status_code=400,
             detail=detail.model_dump(),
         )
-    token = generate_auth_token(user)
+    token = await generate_auth_token(user)
     return ResponseData[AuthToken](detail="Tokens successfully retrieved", data=token)
 
 
 @router.post("/refresh-token/")
 async def refresh_access_token(current_user: CurrentUserViaRefreshToken):
     """Refresh the access token after expiry"""
-    token = generate_auth_token(current_user)
+    token = await generate_auth_token(current_user)
     return ResponseData[AuthToken](detail="Token refresh successful", data=token)
 
 
-@router.post("/forgot-password/")
+@router.post("/logout/")
+async def logout(
+    current_user: CurrentUser, token: TokenDep, data: Logout | None = None
+):
+    """Revoke the access token, and the refresh token if provided, before they expire"""
+    tokens = [security.decode_jwt(token)]
+    if data and data.refresh_token:
+        try:
+            refresh_token = security.decode_jwt(data.refresh_token)
+        except InvalidTokenError as error:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid refresh token"
+            ) from error
+        if (
+            refresh_token.subject.type != "refresh_token"
+            or refresh_token.subject.user_id != current_user.id
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid refresh token"
+            )
+        tokens.append(refresh_token)
+    await RevokedToken.objects.revoke(tokens)
+    return ResponseData(detail="Logout successful")
+
+
+@router.post(
+    "/forgot-password/",
+    dependencies=[
+        rate_limit("forgot-password:ip", limit=10, window_seconds=60 * 60),
+        rate_limit(
+            "forgot-password:email", limit=3, window_seconds=60 * 60, key=query_email
+        ),
+    ],
+)
 async def forgot_password(email: EmailStr, background_tasks: BackgroundTasks):
     """Initiate the password reset flow.
 
@@ -216,22 +314,37 @@ async def forgot_password(email: EmailStr, background_tasks: BackgroundTasks):
         ) from error
 
 
-@router.post("/reset-password/")
+@router.post(
+    "/reset-password/",
+    dependencies=[rate_limit("reset-password:ip", limit=10, window_seconds=60 * 10)],
+)
 async def reset_password(data: PasswordReset):
-    """Complete the password reset flow. not to be used directly"""
+    """Complete the password reset flow. not to be used directly
+
+    The tokens issued to the user before the reset are revoked.
+    """
+    invalid_otp = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid opt provided for password reset",
+    )
+    # invalid codes are rejected before paying for the password hash
+    if not await OTPRecord.objects.is_valid(
+        data.user_id, OTPPurpose.PASSWORD_RESET, data.otp
+    ):
+        raise invalid_otp
+    password_hash = await run_in_threadpool(
+        security.get_password_hash, data.new_password
+    )
     try:
-        otp_record = await OTPRecord.objects.get(
-            None,
-            OTPRecord.purpose == OTPPurpose.PASSWORD_RESET,
-            OTPRecord.user_id == data.user_id,
-            OTPRecord.code == data.otp,
+        await OTPRecord.objects.consume(
+            user_id=data.user_id,
+            purpose=OTPPurpose.PASSWORD_RESET,
+            code=data.otp,
+            user_update_data={
+                "password": password_hash,
+                "tokens_valid_after": aware_datetime_now(),
+            },
         )
-        await otp_record.objects.delete(id=otp_record.id, session=None)
     except OTPRecord.DoesNotExist:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid opt provided for password reset",
-        )
-    user: User = await User.objects.get(None, User.id == data.user_id)
-    await user.set_password(data.new_password)
+        raise invalid_otp
     return ResponseData(detail="Password reset successful")
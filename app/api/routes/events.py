@@ -1,36 +1,41 @@
+from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, Response, status
 from fastapi_pagination import Page
 
-from app.api.deps import CurrentUser
+from app.api.deps import (
+    CurrentUser,
+    OrganizationPermissions,
+    require_organization_permissions,
+)
+from app.core.calendar import calendar_response
 from app.core.utils import ENDPOINT_NOT_IMPLEMENTED
-from app.models import Event, Organization
+from app.models import Event, Tag
 from app.models.events import EventPublicationStatus
 from app.models.organizations import OrganizationMemberPermission
-from app.models.schemas.events import CreateEvent, EventPublic
+from app.models.schemas.api import ResponseData
+from app.models.schemas.events import CreateEvent, EventDetailPublic, EventPublic
 
 router = APIRouter(prefix="/events")
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
-async def create_event(current_user: CurrentUser, data: CreateEvent):
+async def create_event(
+    permissions: Annotated[
+        OrganizationPermissions,
+        require_organization_permissions(OrganizationMemberPermission.MANAGE_EVENTS),
+    ],
+    data: CreateEvent,
+):
     """Create a tech event"""
-    organization = await Organization.objects.get(
-        Organization.id == data.organization_id
-    )
-    if not organization.is_member(user=current_user):
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="organization not found"
-        )
-    if not organization.member_has_permission(
-        OrganizationMemberPermission.MANAGE_EVENTS, user=current_user
-    ):
+    await permissions.authorize(data.organization_id)
+    try:
+        return await Event.objects.create_event(data)
+    except Tag.DoesNotExist as error:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="you don't have permissions to create an event for the organization",
-        )
-    return await Event.objects.create_event(data)
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
+        ) from error
 
 
 @router.get("/public/")
@@ -38,6 +43,35 @@ async def get_events_as_public() -> Page[EventPublic]:
     return await Event.objects.filter(
         None,
         Event.status.in_([EventPublicationStatus.OPEN, EventPublicationStatus.CLOSE]),
+        options=Event.objects.listing_load_options,
+    )
+
+
+@router.get("/public/calendar.ics", response_class=Response)
+async def get_public_events_calendar(request: Request):
+    """iCalendar feed of the public events, for subscribing from calendar apps"""
+    return calendar_response(request, await Event.objects.calendar_feed())
+
+
+@router.get("/{id}/")
+async def get_event(id: UUID):
+    """Retrieve a tech event with its organization, tags, officials and attendee
+    counts"""
+    try:
+        detail = await Event.objects.get_detail(id)
+    except Event.DoesNotExist as error:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=str(error)
+        ) from error
+    return ResponseData[EventDetailPublic](
+        detail="Event retrieved successfully",
+        data=EventDetailPublic.model_validate(
+            {
+                **detail.snapshot,
+                "attendee_count": detail.attendee_count,
+                "attended_count": detail.attended_count,
+            }
+        ),
     )
 
 
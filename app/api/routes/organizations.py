@@ -1,14 +1,56 @@
+from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, status
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
 from fastapi_pagination import Page
+from jwt.exceptions import InvalidTokenError
+from sqlalchemy.orm import load_only
 
-from app.api.deps import CurrentUser
-from app.core.utils import ENDPOINT_NOT_IMPLEMENTED
-from app.models import Event, Organization
+from app.api.deps import (
+    CurrentUser,
+    OrganizationPermissions,
+    require_organization_permissions,
+)
+from app.api.rate_limit import current_user_id, rate_limit
+from app.core.calendar import calendar_response
+from app.core.config import settings
+from app.core.email_service import EmailService
+from app.core.security import create_invite_token, decode_invite_token
+from app.core.utils import decode_cursor, encode_cursor
+from app.models import (
+    Event,
+    Organization,
+    OrganizationInvite,
+    OrganizationJoinRequest,
+    User,
+)
 from app.models.events import EventPublicationStatus
-from app.models.schemas.api import ResponseData
-from app.models.schemas.organizations import CreateOrganization, OrganizationPublic
+from app.models.organizations import (
+    OrganizationInviteStatus,
+    OrganizationMemberPermission,
+)
+from app.models.schemas.api import KeysetPage, ResponseData
+from app.models.schemas.events import EventPublic
+from app.models.schemas.organizations import (
+    CreateOrganization,
+    InviteOrganizationMembers,
+    OrganizationInvitePublic,
+    OrganizationInviteResponse,
+    OrganizationJoinRequestPublic,
+    OrganizationJoinRequestReview,
+    OrganizationPublic,
+    ReviewOrganizationJoinRequests,
+    TransferOrganizationOwnership,
+    UpdateOrganizationMembers,
+)
 
 router = APIRouter(prefix="/organizations")
 
@@ -39,20 +81,267 @@ async def get_organizations_as_public() -> Page[OrganizationPublic]:
 
 
 @router.post("/{id}/transfer-ownership/")
-async def transfer_organization_ownership(id: UUID, current_user: CurrentUser):
+async def transfer_organization_ownership(
+    id: UUID,
+    permissions: Annotated[OrganizationPermissions, require_organization_permissions()],
+    data: TransferOrganizationOwnership,
+):
     """Transfer the ownership of an organization from one user to another"""
-    raise ENDPOINT_NOT_IMPLEMENTED
+    await permissions.authorize(id)
+    try:
+        organization = await Organization.objects.transfer_ownership(
+            id, owner_id=permissions.user.id, new_owner_id=data.new_owner_id
+        )
+    except Organization.DoesNotExist as error:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="organization not found"
+        ) from error
+    except PermissionError as error:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail=str(error)
+        ) from error
+    except ValueError as error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
+        ) from error
+    return ResponseData[Organization](
+        detail="Organization ownership successfully transferred", data=organization
+    )
 
 
 @router.post("/{id}/update-members/")
-async def update_organization_members(id: UUID, current_user: CurrentUser):
-    """Update the members of an organization by added or removing users"""
-    raise ENDPOINT_NOT_IMPLEMENTED
+async def update_organization_members(
+    id: UUID,
+    permissions: Annotated[
+        OrganizationPermissions,
+        require_organization_permissions(OrganizationMemberPermission.MANAGE_MEMBERS),
+    ],
+    data: UpdateOrganizationMembers,
+):
+    """Update the members of an organization by added or removing users.
+
+    Members can only give the permissions they have and can't update or remove
+    themselves.
+    """
+    await permissions.authorize(id, grants=data.granted_permissions)
+    if permissions.user.id in data.member_ids:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="you can't update or remove yourself from the organization",
+        )
+    try:
+        organization = await Organization.objects.update_members(id, data)
+    except Organization.DoesNotExist as error:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="organization not found"
+        ) from error
+    except (User.DoesNotExist, ValueError) as error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
+        ) from error
+    return ResponseData[Organization](
+        detail="Organization members successfully updated", data=organization
+    )
+
+
+@router.post("/{id}/invites/", status_code=status.HTTP_201_CREATED)
+async def invite_organization_members(
+    id: UUID,
+    permissions: Annotated[
+        OrganizationPermissions,
+        require_organization_permissions(OrganizationMemberPermission.INVITE_MEMBERS),
+    ],
+    data: InviteOrganizationMembers,
+    background_tasks: BackgroundTasks,
+):
+    """Invite users to be members of an organization by email, in bulk.
+
+    The emails of current members are skipped and emails invited before get their
+    invite renewed. The invitation emails are sent in the background as one batch,
+    each with a link to the frontend following the format
+    [FRONTEND_HOST_URL]/organization-invites/:token, the token is then used to accept
+    or decline the invite. Members can only invite with the permissions they have.
+    """
+    await permissions.authorize(id, grants=data.permissions)
+    try:
+        organization = await Organization.objects.get(
+            None, Organization.id == id, options=[load_only(Organization.name)]
+        )
+        invites = await OrganizationInvite.objects.invite(
+            id, data.emails, data.permissions, invited_by_id=permissions.user.id
+        )
+    except Organization.DoesNotExist as error:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="organization not found"
+        ) from error
+    invite_urls = {
+        invite.email: f"{settings.FRONTEND_HOST}/organization-invites/"
+        f"{create_invite_token(invite.id, invite.expires_at)}"
+        for invite in invites
+    }
+    if invite_urls:
+        email_service = EmailService()
+        background_tasks.add_task(
+            email_service.send_organization_invites, organization.name, invite_urls
+        )
+    return ResponseData[OrganizationInvitePublic](
+        detail=f"{len(invites)} invites successfully sent", data=invites
+    )
+
+
+async def respond_to_organization_invite(
+    current_user: User, data: OrganizationInviteResponse, accept: bool
+) -> OrganizationInvitePublic:
+    try:
+        invite_id = decode_invite_token(data.token)
+        invite = await OrganizationInvite.objects.respond(
+            invite_id, current_user, accept=accept
+        )
+    except InvalidTokenError as error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="invalid or expired invite"
+        ) from error
+    except OrganizationInvite.DoesNotExist as error:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=str(error)
+        ) from error
+    # the permissions are read from the JSONB column as plain strings
+    return OrganizationInvitePublic.model_validate(invite)
+
+
+@router.post("/invites/accept/")
+async def accept_organization_invite(
+    current_user: CurrentUser, data: OrganizationInviteResponse
+):
+    """Accept an invite to an organization, the invite must have been sent to the
+    email of the current user"""
+    invite = await respond_to_organization_invite(current_user, data, accept=True)
+    return ResponseData[OrganizationInvitePublic](
+        detail="Organization invite accepted", data=invite
+    )
+
+
+@router.post("/invites/decline/")
+async def decline_organization_invite(
+    current_user: CurrentUser, data: OrganizationInviteResponse
+):
+    """Decline an invite to an organization"""
+    invite = await respond_to_organization_invite(current_user, data, accept=False)
+    return ResponseData[OrganizationInvitePublic](
+        detail="Organization invite declined", data=invite
+    )
+
+
+@router.post(
+    "/{id}/join-requests/",
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[
+        rate_limit(
+            "join-request:user", limit=20, window_seconds=60 * 60, key=current_user_id
+        )
+    ],
+)
+async def request_to_join_organization(id: UUID, current_user: CurrentUser):
+    """Request to join an organization as a member, the request is reviewed by the
+    members allowed to approve requests"""
+    try:
+        join_request = await OrganizationJoinRequest.objects.request_to_join(
+            id, current_user.id
+        )
+    except Organization.DoesNotExist as error:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="organization not found"
+        ) from error
+    except OrganizationJoinRequest.AlreadyExist as error:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail=str(error)
+        ) from error
+    except ValueError as error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
+        ) from error
+    return ResponseData[OrganizationJoinRequestPublic](
+        detail="Request to join the organization sent", data=join_request
+    )
+
+
+@router.get("/{id}/join-requests/")
+async def get_organization_join_requests(
+    id: UUID,
+    permissions: Annotated[
+        OrganizationPermissions,
+        require_organization_permissions(OrganizationMemberPermission.APPROVE_REQUESTS),
+    ],
+    request_status: Annotated[
+        OrganizationInviteStatus, Query(alias="status")
+    ] = OrganizationInviteStatus.PENDING,
+    cursor: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=500)] = 50,
+) -> KeysetPage[OrganizationJoinRequestReview]:
+    """Retrieve the requests to join an organization in the order they were sent, the
+    `next_cursor` of a page is the `cursor` of the next one"""
+    await permissions.authorize(id)
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(error)
+        ) from error
+    rows = await OrganizationJoinRequest.objects.review_queue(
+        id, request_status, limit=limit, after=after
+    )
+    items = [OrganizationJoinRequestReview.model_validate(row) for row in rows]
+    next_cursor = None
+    if len(items) == limit:
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+    return KeysetPage[OrganizationJoinRequestReview](
+        items=items, next_cursor=next_cursor
+    )
+
+
+@router.post("/{id}/join-requests/review/")
+async def review_organization_join_requests(
+    id: UUID,
+    permissions: Annotated[
+        OrganizationPermissions,
+        require_organization_permissions(OrganizationMemberPermission.APPROVE_REQUESTS),
+    ],
+    data: ReviewOrganizationJoinRequests,
+):
+    """Approve and decline requests to join an organization in batch, the approved
+    users are added to the members. Requests that are no longer pending are skipped"""
+    await permissions.authorize(id)
+    reviewed = await OrganizationJoinRequest.objects.review(
+        id, approve=data.approve, decline=data.decline
+    )
+    approved = sum(
+        request.status == OrganizationInviteStatus.ACCEPTED for request in reviewed
+    )
+    return ResponseData[OrganizationJoinRequestPublic](
+        detail=f"{approved} requests approved, {len(reviewed) - approved} declined",
+        data=reviewed,
+    )
+
+
+@router.get("/{id}/calendar.ics", response_class=Response)
+async def get_organization_events_calendar(id: UUID, request: Request):
+    """iCalendar feed of the public events of the organization, for subscribing
+    from calendar apps"""
+    try:
+        feed = await Event.objects.calendar_feed(id)
+    except Organization.DoesNotExist as error:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=str(error)
+        ) from error
+    return calendar_response(request, feed)
 
 
-@router.get("{id}/events/")
-async def get_events(id: UUID, current_user: CurrentUser) -> Page[Event]:
+@router.get("/{id}/events/")
+async def get_events(id: UUID, current_user: CurrentUser) -> Page[EventPublic]:
     """Retrieve created tech events"""
     return await Event.objects.filter(
-        Event.organization_id == id, Event.status != EventPublicationStatus.ARCHIVE
+        None,
+        Event.organization_id == id,
+        Event.status != EventPublicationStatus.ARCHIVE,
+        options=Event.objects.listing_load_options,
     )
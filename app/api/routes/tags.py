@@ -0,0 +1,22 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Query
+
+from app.models import Tag
+from app.models.schemas.api import ResponseData
+from app.models.schemas.tags import TagSuggestion
+
+router = APIRouter(prefix="/tags")
+
+
+@router.get("/autocomplete/")
+async def autocomplete_tags(
+    q: Annotated[str, Query(min_length=1, max_length=32)],
+    limit: Annotated[int, Query(ge=1, le=50)] = 10,
+):
+    """Suggest existing tags starting with `q`, the most used tags come first"""
+    suggestions = await Tag.objects.autocomplete(q, limit=limit)
+    return ResponseData[TagSuggestion](
+        detail="Tags retrieved successfully",
+        data=[TagSuggestion.model_validate(s._asdict()) for s in suggestions],
+    )
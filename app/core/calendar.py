@@ -0,0 +1,123 @@
+"""iCalendar (RFC 5545) rendering of the event feeds"""
+
+from datetime import UTC, datetime
+from email.utils import format_datetime as format_http_date
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING
+
+from fastapi import Request, Response, status
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    from app.models import Event
+    from app.models.managers.events import CalendarFeed
+
+PRODID = "-//EventTrakka//Events//EN"
+# content lines longer than this many octets are folded
+LINE_OCTETS = 75
+
+
+def escape_text(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def format_datetime(value: datetime) -> str:
+    return value.astimezone(UTC).strftime("%Y%m%dT%H%M%SZ")
+
+
+def content_line(name: str, value: str) -> bytes:
+    """Encodes the property as a CRLF terminated content line, folded on utf-8
+    character boundaries every `LINE_OCTETS` octets"""
+    line = f"{name}:{value}".encode()
+    if len(line) <= LINE_OCTETS:
+        return line + b"\r\n"
+    chunks = []
+    start, limit = 0, LINE_OCTETS
+    while start < len(line):
+        end = min(start + limit, len(line))
+        # back off to the first byte of a utf-8 character
+        while end < len(line) and line[end] & 0xC0 == 0x80:
+            end -= 1
+        chunks.append(line[start:end])
+        # continuation lines start with a space
+        start, limit = end, LINE_OCTETS - 1
+    return b"\r\n ".join(chunks) + b"\r\n"
+
+
+def render_event(event: "Event") -> bytes:
+    """Renders the `VEVENT` component of the event"""
+    last_modified = format_datetime(event.last_updated_at or event.created_at)
+    lines = [
+        content_line("BEGIN", "VEVENT"),
+        content_line("UID", f"{event.id}@eventtrakka"),
+        content_line("DTSTAMP", last_modified),
+        content_line("LAST-MODIFIED", last_modified),
+        content_line("DTSTART", format_datetime(event.starts_at)),
+    ]
+    if event.ends_at:
+        lines.append(content_line("DTEND", format_datetime(event.ends_at)))
+    lines.append(content_line("SUMMARY", escape_text(event.title)))
+    if event.description:
+        lines.append(content_line("DESCRIPTION", escape_text(event.description)))
+    if event.location:
+        lines.append(content_line("LOCATION", escape_text(event.location)))
+    if event.link:
+        lines.append(content_line("URL", event.link))
+    lines.append(content_line("END", "VEVENT"))
+    return b"".join(lines)
+
+
+def render_calendar(name: str, components: list[bytes]) -> bytes:
+    """Wraps the rendered components in a `VCALENDAR` object named `name`"""
+    return b"".join(
+        [
+            content_line("BEGIN", "VCALENDAR"),
+            content_line("VERSION", "2.0"),
+            content_line("PRODID", PRODID),
+            content_line("CALSCALE", "GREGORIAN"),
+            content_line("METHOD", "PUBLISH"),
+            content_line("X-WR-CALNAME", escape_text(name)),
+            *components,
+            content_line("END", "VCALENDAR"),
+        ]
+    )
+
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime) -> bool:
+    """Evaluates the `If-None-Match` or, without it, the `If-Modified-Since` header of
+    the request"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            return last_modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def calendar_response(request: Request, feed: "CalendarFeed") -> Response:
+    """The feed as `text/calendar`, or an empty `304 Not Modified` response when the
+    client already has it"""
+    headers = {
+        "ETag": feed.etag,
+        "Last-Modified": format_http_date(
+            feed.last_modified.astimezone(UTC), usegmt=True
+        ),
+        "Cache-Control": f"public, max-age={settings.EVENT_FEED_REFRESH_SECONDS}",
+    }
+    if is_not_modified(request, feed.etag, feed.last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(
+        feed.body, media_type="text/calendar; charset=utf-8", headers=headers
+    )
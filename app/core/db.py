@@ -1,16 +1,263 @@
-from collections.abc import AsyncGenerator
+import asyncio
+import itertools
+import logging
+import math
+import time
+from collections.abc import AsyncGenerator, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from types import EllipsisType
+from typing import Literal
 
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 
 from app.core.config import settings
+from app.core.metrics import (
+    DB_POOL_CHECKOUT_SECONDS,
+    DB_POOL_CONNECTIONS_CHECKED_OUT,
+    DB_POOL_WAIT_SECONDS,
+    DB_REPLICA_LAG_SECONDS,
+)
+from app.core.query_stats import instrument_engine
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Records how long checkouts wait for a free connection, or for a new one to be
+    opened, when the pool is exhausted. The pool is named after its engine"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT_SECONDS.observe(
+                time.perf_counter() - started, engine=self.logging_name
+            )
+
+
+@dataclass
+class PoolMetrics:
+    """Checkout listeners recording the pool metrics of an engine"""
+
+    engine_name: str
+
+    def record_checkout(
+        self, _dbapi_connection, connection_record, _connection_proxy
+    ) -> None:
+        connection_record.info["checked_out_at"] = time.perf_counter()
+        DB_POOL_CONNECTIONS_CHECKED_OUT.inc(engine=self.engine_name)
+
+    def record_checkin(self, _dbapi_connection, connection_record) -> None:
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            DB_POOL_CONNECTIONS_CHECKED_OUT.dec(engine=self.engine_name)
+            DB_POOL_CHECKOUT_SECONDS.observe(
+                time.perf_counter() - checked_out_at, engine=self.engine_name
+            )
+
 
-engine = create_async_engine(
-    str(settings.DATABASE_URI),
-    echo=True,
+def _prepare_threshold() -> int | None:
+    if (
+        settings.DB_POOLER_MODE == "transaction"
+        and "DB_PREPARE_THRESHOLD" not in settings.model_fields_set
+    ):
+        # a statement prepared on a server connection is unknown to the next client
+        # handed that connection by the pooler
+        return None
+    return settings.DB_PREPARE_THRESHOLD
+
+
+def build_engine(
+    uri: str,
+    pool_class: Literal["queue", "null"] | None = None,
+    prepare_threshold: int | None | EllipsisType = ...,
+    name: str = "primary",
+) -> AsyncEngine:
+    """Creates an instrumented engine, the pool class and the prepared statements
+    policy default to the `DB_*` settings. `name` is the `engine` label of its pool
+    metrics"""
+    pool_class = pool_class or settings.DB_POOL_CLASS
+    if prepare_threshold is ...:
+        prepare_threshold = _prepare_threshold()
+    if pool_class == "null":
+        pool_options = {"poolclass": NullPool}
+    else:
+        pool_options = {
+            "poolclass": InstrumentedAsyncQueuePool,
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_POOL_MAX_OVERFLOW,
+        }
+    new_engine = create_async_engine(
+        uri,
+        echo=settings.SQL_ECHO,
+        connect_args={"prepare_threshold": prepare_threshold},
+        pool_logging_name=name,
+        **pool_options,
+    )
+    instrument_engine(new_engine)
+    pool_metrics = PoolMetrics(name)
+    event.listen(new_engine.sync_engine, "connect", _set_prepared_max)
+    event.listen(new_engine.sync_engine, "checkout", pool_metrics.record_checkout)
+    event.listen(new_engine.sync_engine, "checkin", pool_metrics.record_checkin)
+    return new_engine
+
+
+def _set_prepared_max(dbapi_connection, _connection_record):
+    dbapi_connection.driver_connection.prepared_max = settings.DB_PREPARED_MAX
+
+
+engine = build_engine(str(settings.DATABASE_URI))
+# only for session level state, i.e. the scheduler leader lock
+direct_engine = (
+    create_async_engine(str(settings.DB_DIRECT_URI), poolclass=NullPool)
+    if settings.DB_DIRECT_URI
+    else engine
 )
 
 
+@dataclass
+class ReadRouting:
+    """Read routing state of a request, set once the request writes to the primary"""
+
+    wrote: bool = False
+
+
+_read_routing: ContextVar[ReadRouting | None] = ContextVar("read_routing", default=None)
+
+
+@contextmanager
+def route_request_reads() -> Iterator[ReadRouting]:
+    """Lets `get_read_session` use the replicas in the current context (i.e. the
+    request) until it writes to the primary, the reads following a write are served
+    by the primary so the request reads its own writes"""
+    routing = ReadRouting()
+    context_token = _read_routing.set(routing)
+    try:
+        yield routing
+    finally:
+        _read_routing.reset(context_token)
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _record_primary_write(_connection, cursor, _statement, _parameters, context, *_):
+    """Marks the request as written once an INSERT, UPDATE or DELETE statement changed
+    rows. SELECT statements are reads even with a data modifying CTE, e.g. the upsert
+    of the rate limit counters, which are only read by the statement itself"""
+    routing = _read_routing.get()
+    if (
+        routing is not None
+        and not routing.wrote
+        and (context.isinsert or context.isupdate or context.isdelete)
+        and cursor.rowcount != 0
+    ):
+        routing.wrote = True
+
+
+class Replica:
+    """A read-only replica of the database, skipped while its replication lag exceeds
+    `REPLICA_MAX_LAG_SECONDS`. The lag is checked at most once per
+    `REPLICA_LAG_CHECK_INTERVAL_SECONDS` by each worker"""
+
+    # the lag is 0 once the replica replayed every change it received (an idle primary
+    # sends none and the last replay gets old), a server not in recovery has no lag
+    LAG_SQL = text(
+        "SELECT CASE"
+        " WHEN NOT pg_is_in_recovery()"
+        "  OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+        " ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp())"
+        " END"
+    )
+
+    def __init__(self, uri: str):
+        url = make_url(uri)
+        self.name = f"{url.host}:{url.port or 5432}"
+        self.engine = build_engine(uri, name=self.name)
+        self.lag_seconds = math.inf
+        self._checked_at = -math.inf
+        self._lock = asyncio.Lock()
+
+    async def is_fresh(self) -> bool:
+        if (
+            time.monotonic() - self._checked_at
+            >= settings.REPLICA_LAG_CHECK_INTERVAL_SECONDS
+        ):
+            async with self._lock:
+                if (
+                    time.monotonic() - self._checked_at
+                    >= settings.REPLICA_LAG_CHECK_INTERVAL_SECONDS
+                ):
+                    await self._check_lag()
+        return self.lag_seconds <= settings.REPLICA_MAX_LAG_SECONDS
+
+    async def _check_lag(self) -> None:
+        try:
+            async with self.engine.connect() as connection:
+                lag_seconds = (await connection.execute(self.LAG_SQL)).scalar_one()
+            self.lag_seconds = math.inf if lag_seconds is None else float(lag_seconds)
+        except Exception:
+            logger.exception("could not check the replication lag of %s", self.name)
+            self.lag_seconds = math.inf
+        self._checked_at = time.monotonic()
+        DB_REPLICA_LAG_SECONDS.set(self.lag_seconds, replica=self.name)
+
+
+replicas = [Replica(str(uri)) for uri in settings.DATABASE_REPLICA_URIS]
+_next_replicas = itertools.cycle(replicas)
+
+
+async def _read_engine() -> AsyncEngine:
+    """A fresh replica in round-robin order, the primary when the current context is
+    not routed with `route_request_reads`, already wrote or no replica is fresh"""
+    routing = _read_routing.get()
+    if routing is None or routing.wrote:
+        return engine
+    for _ in range(len(replicas)):
+        replica = next(_next_replicas)
+        if await replica.is_fresh():
+            return replica.engine
+    return engine
+
+
+def all_engines() -> list[AsyncEngine]:
+    return [engine, *(replica.engine for replica in replicas)]
+
+
+async def warm_up_pool(connections: int) -> None:
+    """Opens `connections` connections of the pool of the primary and of each replica,
+    at most their size, so the first requests of the worker don't pay for connecting
+    to the database"""
+
+    async def connect(pooled_engine: AsyncEngine):
+        connection = await pooled_engine.connect()
+        await connection.execute(text("SELECT 1"))
+        return connection
+
+    for pooled_engine in all_engines():
+        if not isinstance(pooled_engine.pool, QueuePool):
+            continue
+        # held together so each one is a distinct pooled connection
+        opened = await asyncio.gather(
+            *(
+                connect(pooled_engine)
+                for _ in range(min(connections, pooled_engine.pool.size()))
+            )
+        )
+        for connection in opened:
+            await connection.close()
+
+
+async def dispose_engines() -> None:
+    for pooled_engine in {*all_engines(), direct_engine}:
+        await pooled_engine.dispose()
+
+
 async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
     async_session = sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
     async with async_session() as session:
@@ -20,3 +267,18 @@ async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
         finally:
             print("closing db connection")
             await session.close()
+
+
+async def get_read_session(
+    session: AsyncSession | None = None,
+) -> AsyncGenerator[AsyncSession, None]:
+    """Yields `session` when given, otherwise a session of a replica picked by
+    `_read_engine`, for the read-only queries"""
+    if session is not None:
+        yield session
+        return
+    async_session = sessionmaker(
+        await _read_engine(), expire_on_commit=False, class_=AsyncSession
+    )
+    async with async_session() as session:
+        yield session
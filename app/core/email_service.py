@@ -1,17 +1,77 @@
+import time
+from email.message import EmailMessage
+from email.utils import formataddr, formatdate, make_msgid
+from functools import cache
 from typing import Any
 
 from fastapi_mail import FastMail, MessageSchema, MessageType
-from jinja2 import Template
+from fastapi_mail.connection import Connection
+from fastapi_mail.fastmail import email_dispatched
+from jinja2 import Environment, FileSystemLoader, Template
 from pydantic import EmailStr
 
 from app.core.config import settings
+from app.core.metrics import EMAIL_SEND_DURATION_SECONDS
+
+
+@cache
+def template_environment() -> Environment:
+    """The environment of the email templates shared by the worker, each template is
+    compiled once instead of on every email as `FastMail` does with a new environment
+    per message. Templates are not reloaded when edited, restart the app instead"""
+    return Environment(
+        loader=FileSystemLoader(settings.MAIL_TEMPLATES_DIR), auto_reload=False
+    )
+
+
+@cache
+def subject_template(subject: str) -> Template:
+    return template_environment().from_string(subject)
+
+
+def build_message(
+    recipient: EmailStr, subject: str, template_name: str, context: dict[str, Any]
+) -> EmailMessage:
+    """Renders the html email to `recipient` with the headers `FastMail` sets"""
+    html = template_environment().get_template(template_name).render(context)
+    message = EmailMessage()
+    message["Date"] = formatdate(localtime=True)
+    message["Message-ID"] = make_msgid()
+    message["To"] = recipient
+    message["From"] = formataddr((settings.MAIL_FROM_NAME, settings.MAIL_FROM))
+    message["Subject"] = subject
+    message.set_content(html, subtype="html")
+    return message
+
+
+def warm_up_templates() -> None:
+    """Compiles every email template ahead of the first email"""
+    environment = template_environment()
+    for template_name in environment.list_templates():
+        environment.get_template(template_name)
+
+
+class _FastMail(FastMail):
+    async def get_mail_template(
+        self, env_path: Environment, template_name: str
+    ) -> Template:
+        return template_environment().get_template(template_name)
+
+    async def send_messages(self, messages: list[EmailMessage]) -> None:
+        """Sends the messages over a single connection to the SMTP server, instead of
+        one connection per message with `send_message`"""
+        async with Connection(self.config) as session:
+            for message in messages:
+                if not self.config.SUPPRESS_SEND:
+                    await session.session.send_message(message)
+                email_dispatched.send(message)
 
 
 class EmailService:
     """Service for handling email operations."""
 
     def __init__(self):
-        self.fast_mail = FastMail(settings.MAIL_CONNECTION_CONFIG)
+        self.fast_mail = _FastMail(settings.MAIL_CONNECTION_CONFIG)
 
     async def send_mail(
         self,
@@ -32,8 +92,7 @@ class EmailService:
             subject_context: The subject context data
         """
         if subject_context:
-            template = Template(subject)
-            subject = template.render(subject_context)
+            subject = subject_template(subject).render(subject_context)
 
         message = MessageSchema(
             subject=subject,
@@ -41,7 +100,15 @@ class EmailService:
             template_body=context,
             subtype=MessageType.html,
         )
-        await self.fast_mail.send_message(message, template_name)
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            await self.fast_mail.send_message(message, template_name)
+            outcome = "sent"
+        finally:
+            EMAIL_SEND_DURATION_SECONDS.observe(
+                time.perf_counter() - started, template=template_name, outcome=outcome
+            )
 
     async def send_verification_email(
         self, email: EmailStr, name: str, otp: str
@@ -56,3 +123,53 @@ class EmailService:
             context=context,
             subject_context=subject_context,
         )
+
+    async def send_bulk_mail(
+        self,
+        messages: list[tuple[EmailStr, dict[str, Any]]],
+        subject: str,
+        template_name: str,
+        subject_context: dict[str, Any] | None = None,
+    ):
+        """Renders an email per recipient and sends them all over one SMTP connection.
+
+        Args:
+            messages: The recipient of each email and the context data used to render it
+            subject: The subject of the emails, see `send_mail`
+            template_name: The name of the html template located in the `MAIL_TEMPLATES_DIR`
+            subject_context: The subject context data
+        """
+        if subject_context:
+            subject = subject_template(subject).render(subject_context)
+
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            await self.fast_mail.send_messages(
+                [
+                    build_message(recipient, subject, template_name, context)
+                    for recipient, context in messages
+                ]
+            )
+            outcome = "sent"
+        finally:
+            EMAIL_SEND_DURATION_SECONDS.observe(
+                time.perf_counter() - started, template=template_name, outcome=outcome
+            )
+
+    async def send_organization_invites(
+        self, organization_name: str, invite_urls: dict[EmailStr, str]
+    ) -> None:
+        """Send the invitation emails of an organization, in a single batch."""
+        await self.send_bulk_mail(
+            messages=[
+                (email, {"organization_name": organization_name, "invite_url": url})
+                for email, url in invite_urls.items()
+            ],
+            subject="You're invited to join {{ organization_name }} - {{ project_name }}",
+            template_name="organization-invite.html",
+            subject_context={
+                "organization_name": organization_name,
+                "project_name": settings.PROJECT_NAME,
+            },
+        )
@@ -0,0 +1,381 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from bisect import bisect_left
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.075,
+    0.1,
+    0.25,
+    0.5,
+    0.75,
+    1.0,
+    2.5,
+    5.0,
+    7.5,
+    10.0,
+)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\""),
+        )
+        for name, value in zip(names, values, strict=True)
+    )
+    return "{" + pairs + "}"
+
+
+class Metric:
+    """Base of the metric types, a metric holds one value per combination of label
+    values and is rendered in the prometheus text exposition format"""
+
+    type: str
+    # the values of the workers are summed when merged, otherwise they are kept apart
+    # with a `worker` label
+    summed_over_workers = True
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values: dict[tuple[str, ...], Any] = {}
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def dump(self) -> list[list]:
+        """The values of this process, JSON serializable"""
+        return [[list(key), value] for key, value in self._values.items()]
+
+    def _add(self, value: Any, other: Any) -> Any:
+        return value + other
+
+    def samples(
+        self, label_names: Sequence[str], values: dict[tuple[str, ...], Any]
+    ) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(label_names, key)} {_format_value(value)}"
+            for key, value in values.items()
+        ]
+
+    def render(self, workers: dict[str, list[list]], by_worker: bool) -> str:
+        """Renders the dumped values of the `workers`, labelled with their worker or
+        summed"""
+        values: dict[tuple[str, ...], Any] = {}
+        for worker, dumped in workers.items():
+            for key, value in dumped:
+                key = (worker, *key) if by_worker else tuple(key)
+                values[key] = self._add(values[key], value) if key in values else value
+        label_names = ("worker", *self.label_names) if by_worker else self.label_names
+        header = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        return "\n".join(header + self.samples(label_names, values))
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+    summed_over_workers = False
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> (count per bucket, sum of the observations)
+        self._values: dict[tuple[str, ...], tuple[list[int], float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        counts, total = self._values.get(key) or ([0] * len(self.buckets), 0.0)
+        counts[bisect_left(self.buckets, value)] += 1
+        self._values[key] = (counts, total + value)
+
+    def dump(self) -> list[list]:
+        # the counts are updated in place
+        return [
+            [list(key), [list(counts), total]]
+            for key, (counts, total) in self._values.items()
+        ]
+
+    def _add(self, value: Any, other: Any) -> Any:
+        (counts, total), (other_counts, other_total) = value, other
+        return (
+            [count + other for count, other in zip(counts, other_counts, strict=True)],
+            total + other_total,
+        )
+
+    def samples(
+        self, label_names: Sequence[str], values: dict[tuple[str, ...], Any]
+    ) -> list[str]:
+        samples = []
+        bucket_label_names = (*label_names, "le")
+        for key, (counts, total) in values.items():
+            cumulative_count = 0
+            for bound, count in zip(self.buckets, counts, strict=True):
+                cumulative_count += count
+                labels = _format_labels(
+                    bucket_label_names, (*key, _format_value(bound))
+                )
+                samples.append(f"{self.name}_bucket{labels} {cumulative_count}")
+            labels = _format_labels(label_names, key)
+            samples.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            samples.append(f"{self.name}_count{labels} {cumulative_count}")
+        return samples
+
+
+class MetricsRegistry:
+    """The metrics of the process.
+
+    Each app worker has its own registry. Without `METRICS_MULTIPROCESS_DIR` a scrape
+    gets the metrics of the worker serving it, labelled with its pid. With it, every
+    worker writes its metrics to a file of the directory every
+    `METRICS_WRITE_INTERVAL_SECONDS` and a scrape merges the files of all the workers:
+    counters and histograms are summed, gauges are labelled with their worker. The
+    gauges of the workers that stopped writing are dropped, their counters are kept
+    so the sums do not go back.
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+        self._write_task: asyncio.Task | None = None
+
+    def register[M: Metric](self, metric: M) -> M:
+        if metric.name in self._metrics:
+            raise ValueError(f"metric `{metric.name}` is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def dump(self) -> dict[str, list[list]]:
+        return {name: metric.dump() for name, metric in self._metrics.items()}
+
+    def render(self, workers: dict[str, dict[str, list[list]]] | None = None) -> str:
+        """The metrics of this worker, or merged from the dumped metrics of `workers`"""
+        by_worker = workers is None
+        if workers is None:
+            workers = {str(os.getpid()): self.dump()}
+        return (
+            "\n".join(
+                metric.render(
+                    {
+                        worker: dumped.get(name, [])
+                        for worker, dumped in workers.items()
+                    },
+                    by_worker or not metric.summed_over_workers,
+                )
+                for name, metric in self._metrics.items()
+            )
+            + "\n"
+        )
+
+    async def render_workers(self) -> str:
+        """The metrics of all the workers sharing `METRICS_MULTIPROCESS_DIR`, including
+        the current ones of this worker"""
+        await self.write()
+        return self.render(await asyncio.to_thread(self._read_workers))
+
+    async def write(self) -> None:
+        """Writes the metrics of this worker to its file of `METRICS_MULTIPROCESS_DIR`"""
+        content = json.dumps(self.dump())
+        await asyncio.to_thread(self._write_file, content)
+
+    def _write_file(self, content: str) -> None:
+        directory = Path(settings.METRICS_MULTIPROCESS_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{os.getpid()}.json"
+        temporary_path = path.with_suffix(".tmp")
+        temporary_path.write_text(content)
+        # the readers never see a partially written file
+        temporary_path.replace(path)
+
+    def _read_workers(self) -> dict[str, dict[str, list[list]]]:
+        workers = {}
+        stale_before = time.time() - 3 * settings.METRICS_WRITE_INTERVAL_SECONDS
+        for path in Path(settings.METRICS_MULTIPROCESS_DIR).glob("*.json"):
+            try:
+                is_stale = path.stat().st_mtime < stale_before
+                dumped = json.loads(path.read_text())
+            except (OSError, ValueError):
+                logger.exception("could not read the metrics file %s", path)
+                continue
+            if is_stale:
+                dumped = {
+                    name: values
+                    for name, values in dumped.items()
+                    if name in self._metrics and self._metrics[name].summed_over_workers
+                }
+            workers[path.stem] = dumped
+        return workers
+
+    def start_writing(self) -> None:
+        """Starts writing the metrics of this worker periodically, when they are shared
+        with the other workers through `METRICS_MULTIPROCESS_DIR`"""
+        if settings.METRICS_MULTIPROCESS_DIR and self._write_task is None:
+            self._write_task = asyncio.create_task(
+                self._write_periodically(), name="metrics_writer"
+            )
+
+    async def stop_writing(self) -> None:
+        if self._write_task is not None:
+            self._write_task.cancel()
+            try:
+                await self._write_task
+            except asyncio.CancelledError:
+                pass
+            self._write_task = None
+            # the counts since the last write
+            await self.write()
+
+    async def _write_periodically(self) -> None:
+        while True:
+            try:
+                await self.write()
+            except Exception:
+                logger.exception("could not write the metrics of the worker")
+            await asyncio.sleep(settings.METRICS_WRITE_INTERVAL_SECONDS)
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUESTS_IN_FLIGHT = registry.register(
+    Gauge("http_requests_in_flight", "HTTP requests being processed")
+)
+HTTP_REQUEST_DURATION_SECONDS = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Time from receiving an HTTP request to sending the last byte of its response",
+        labels=("route", "method", "status"),
+    )
+)
+DB_POOL_CONNECTIONS_CHECKED_OUT = registry.register(
+    Gauge(
+        "db_pool_connections_checked_out",
+        "Database connections currently checked out of the pool",
+        labels=("engine",),
+    )
+)
+DB_POOL_WAIT_SECONDS = registry.register(
+    Histogram(
+        "db_pool_wait_seconds",
+        "Time spent waiting to check a connection out of the pool",
+        labels=("engine",),
+        buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+    )
+)
+DB_POOL_CHECKOUT_SECONDS = registry.register(
+    Histogram(
+        "db_pool_checkout_seconds",
+        "Time a connection is held before being returned to the pool",
+        labels=("engine",),
+    )
+)
+DB_REPLICA_LAG_SECONDS = registry.register(
+    Gauge(
+        "db_replica_lag_seconds",
+        "Replication lag of the read replicas at their last check, +Inf when unreachable",
+        labels=("replica",),
+    )
+)
+MANAGER_CALL_DURATION_SECONDS = registry.register(
+    Histogram(
+        "manager_call_duration_seconds",
+        "Duration of the model manager method calls",
+        labels=("model", "method"),
+    )
+)
+MANAGER_QUERIES_TOTAL = registry.register(
+    Counter(
+        "manager_queries_total",
+        "SQL statements executed by the model manager method calls",
+        labels=("model", "method"),
+    )
+)
+EMAIL_SEND_DURATION_SECONDS = registry.register(
+    Histogram(
+        "email_send_duration_seconds",
+        "Time to render and send an email",
+        labels=("template", "outcome"),
+        buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+    )
+)
+APP_STARTUP_DURATION_SECONDS = registry.register(
+    Gauge(
+        "app_startup_duration_seconds",
+        "Time the worker took to start, by phase: importing the app and warming it up",
+        labels=("phase",),
+    )
+)
+SCHEDULER_JOB_RUNS_TOTAL = registry.register(
+    Counter(
+        "scheduler_job_runs_total",
+        "Runs of the scheduled jobs by the scheduler leader",
+        labels=("job", "outcome"),
+    )
+)
+SCHEDULER_JOB_DURATION_SECONDS = registry.register(
+    Histogram(
+        "scheduler_job_duration_seconds",
+        "Duration of the scheduled job runs",
+        labels=("job",),
+        buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+    )
+)
+SCHEDULER_JOB_ROWS_AFFECTED_TOTAL = registry.register(
+    Counter(
+        "scheduler_job_rows_affected_total",
+        "Rows affected by the successful scheduled job runs",
+        labels=("job",),
+    )
+)
@@ -0,0 +1,143 @@
+import logging
+import re
+import time
+from uuid import uuid4
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.db import route_request_reads
+from app.core.metrics import HTTP_REQUEST_DURATION_SECONDS, HTTP_REQUESTS_IN_FLIGHT
+from app.core.profiling import PROFILE_TOKEN_HEADER, RequestProfile, should_profile
+from app.core.query_stats import current_request_id, track_request_queries
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+_VALID_REQUEST_ID = re.compile(r"[\w.:-]{1,64}")
+
+
+def route_name(scope: Scope) -> str:
+    """The unique id of the matched route (see `custom_generate_unique_id`), requests
+    matching no route share one name so unknown paths don't create new label values"""
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    return getattr(route, "unique_id", None) or getattr(route, "name", "unmatched")
+
+
+class MetricsMiddleware:
+    """Records the number of in-flight requests and the latency of each request by
+    route, method and status.
+
+    The latency stops when the last chunk of the response body is sent, background
+    tasks which run after it (e.g. sending emails) are not included.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+        finished = False
+
+        def observe() -> None:
+            nonlocal finished
+            if finished:
+                return
+            finished = True
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            HTTP_REQUEST_DURATION_SECONDS.observe(
+                time.perf_counter() - started,
+                route=route_name(scope),
+                method=scope["method"],
+                status=str(status_code),
+            )
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get(
+                "more_body", False
+            ):
+                observe()
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            observe()
+
+
+class RequestContextMiddleware:
+    """Assigns each request an id, records the SQL statements it executes and routes
+    its reads to the replicas until it writes (see `route_request_reads`).
+
+    The id is taken from the `X-Request-ID` header when a proxy already set one,
+    it is returned in the same header and attached to the query logs of the request.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = dict(scope["headers"]).get(REQUEST_ID_HEADER.lower().encode(), b"")
+        request_id = request_id.decode("latin-1")
+        if not _VALID_REQUEST_ID.fullmatch(request_id):
+            request_id = uuid4().hex
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[REQUEST_ID_HEADER] = request_id
+            await send(message)
+
+        with track_request_queries(request_id), route_request_reads():
+            await self.app(scope, receive, send_wrapper)
+
+
+class ProfilingMiddleware:
+    """Profiles the requests sending a valid `X-Profile-Token` header (see
+    `app.core.profiling`) and a random `PROFILING_SAMPLE_RATE` share of the others.
+
+    The profiles are saved under `PROFILING_OUTPUT_DIR`, named after the request id.
+    Only one request is profiled at a time, the middleware is only installed when
+    `PROFILING_ENABLED` is set.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._is_profiling = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self._is_profiling:
+            await self.app(scope, receive, send)
+            return
+
+        token = dict(scope["headers"]).get(PROFILE_TOKEN_HEADER.lower().encode())
+        if not should_profile(token.decode("latin-1") if token else None):
+            await self.app(scope, receive, send)
+            return
+
+        self._is_profiling = True
+        profile = RequestProfile()
+        profile.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profile.stop()
+            self._is_profiling = False
+            request_id = current_request_id() or uuid4().hex
+            directory = await run_in_threadpool(profile.save, request_id)
+            logger.info("profile of request %s saved to %s", request_id, directory)
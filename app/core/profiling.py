@@ -0,0 +1,126 @@
+"""On-demand profiling of single requests, see `ProfilingMiddleware`.
+
+A token for the `X-Profile-Token` header is printed by:
+    python -m app.core.profiling [--ttl SECONDS]
+"""
+
+import argparse
+import cProfile
+import hashlib
+import hmac
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+
+from app.core.config import settings
+
+PROFILE_TOKEN_HEADER = "X-Profile-Token"
+
+
+def _token_signature(expires_at: int) -> str:
+    message = f"profile:{expires_at}".encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+def sign_profile_token(ttl_seconds: int = 60 * 5) -> str:
+    """Returns a token requesting the profiling of the requests sending it until it expires"""
+    expires_at = int(time.time()) + ttl_seconds
+    return f"{expires_at}.{_token_signature(expires_at)}"
+
+
+def is_valid_profile_token(token: str) -> bool:
+    expires_at, _, signature = token.partition(".")
+    if not expires_at.isdigit() or int(expires_at) < time.time():
+        return False
+    return hmac.compare_digest(signature, _token_signature(int(expires_at)))
+
+
+def should_profile(token: str | None) -> bool:
+    if token is not None and is_valid_profile_token(token):
+        return True
+    return random.random() < settings.PROFILING_SAMPLE_RATE
+
+
+def profiles_dir() -> Path:
+    return settings.PROFILING_OUTPUT_DIR or settings.BASE_DIR / "profiles"
+
+
+class StackSampler:
+    """Samples the call stack of a thread at a fixed interval from a background thread,
+    the samples are rendered as collapsed stacks (`frame;frame;frame count` lines)
+    which flamegraph tools render directly"""
+
+    def __init__(self, thread_id: int, interval_seconds: float):
+        self.thread_id = thread_id
+        self.interval_seconds = interval_seconds
+        self.stacks: Counter[str] = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval_seconds):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self._collapse(frame)] += 1
+
+    @staticmethod
+    def _collapse(frame: FrameType | None) -> str:
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            labels.append(f"{code.co_qualname} ({Path(code.co_filename).name})")
+            frame = frame.f_back
+        return ";".join(reversed(labels))
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+class RequestProfile:
+    """cProfile and stack sampling profiles of one request.
+
+    Both profile the whole event loop thread, so the other requests served while
+    this one is waiting on I/O show up in the profile too.
+    """
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.sampler = StackSampler(
+            threading.get_ident(), settings.PROFILING_SAMPLING_INTERVAL_MS / 1000
+        )
+
+    def start(self) -> None:
+        self.sampler.start()
+        self.profiler.enable()
+
+    def stop(self) -> None:
+        self.profiler.disable()
+        self.sampler.stop()
+
+    def save(self, request_id: str) -> Path:
+        """Writes `<request_id>.pstats` and `<request_id>.collapsed.txt` to the
+        profiles directory"""
+        directory = profiles_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        self.profiler.dump_stats(directory / f"{request_id}.pstats")
+        (directory / f"{request_id}.collapsed.txt").write_text(self.sampler.collapsed())
+        return directory
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print a profile token")
+    parser.add_argument("--ttl", type=int, default=60 * 5, help="validity in seconds")
+    print(sign_profile_token(parser.parse_args().ttl))
@@ -0,0 +1,150 @@
+import logging
+import re
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_LITERAL = re.compile(r"%\(\w+\)s|%s|'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LIST = re.compile(r"\(\?(?:, \?)+\)")
+
+
+def fingerprint(statement: str) -> str:
+    """Normalizes a statement by replacing its parameters and literals with `?` and
+    collapsing lists of them, statements differing only by their values share a
+    fingerprint, e.g. `SELECT ... WHERE users.id = %(id_1)s` and the same query for
+    another id"""
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    return _LIST.sub("(?)", _LITERAL.sub("?", statement))
+
+
+@dataclass
+class QueryStats:
+    request_id: str | None = None
+    queries: int = 0
+    duration_seconds: float = 0.0
+    fingerprints: Counter[str] = field(default_factory=Counter)
+
+    def record(self, statement_fingerprint: str, duration_seconds: float) -> None:
+        self.queries += 1
+        self.duration_seconds += duration_seconds
+        self.fingerprints[statement_fingerprint] += 1
+
+    def repeated_fingerprints(self, threshold: int) -> list[tuple[str, int]]:
+        """The fingerprints executed at least `threshold` times, the usual sign of a
+        query run once per item of a list (N+1)"""
+        return [
+            (statement_fingerprint, count)
+            for statement_fingerprint, count in self.fingerprints.most_common()
+            if count >= threshold
+        ]
+
+    def summary(self, limit: int = 10) -> str:
+        lines = [f"{self.queries} queries in {self.duration_seconds * 1000:.1f}ms"]
+        lines.extend(
+            f"  {count} x {statement_fingerprint}"
+            for statement_fingerprint, count in self.fingerprints.most_common(limit)
+        )
+        return "\n".join(lines)
+
+
+_request_query_stats: ContextVar[QueryStats | None] = ContextVar(
+    "request_query_stats", default=None
+)
+# stats recording every statement of the engine whatever the context, see `collect_queries`
+_collectors: list[QueryStats] = []
+
+
+def current_request_id() -> str | None:
+    stats = _request_query_stats.get()
+    return stats.request_id if stats else None
+
+
+@contextmanager
+def track_request_queries(request_id: str) -> Iterator[QueryStats]:
+    """Records the statements executed in the current context, i.e. by the request"""
+    stats = QueryStats(request_id=request_id)
+    context_token = _request_query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _request_query_stats.reset(context_token)
+        report_request_queries(stats)
+
+
+@contextmanager
+def collect_queries() -> Iterator[QueryStats]:
+    """Records every statement executed by the engine while the block runs, including
+    the ones of other tasks and threads (e.g. the app served by a test client)"""
+    stats = QueryStats()
+    _collectors.append(stats)
+    try:
+        yield stats
+    finally:
+        _collectors.remove(stats)
+
+
+def report_request_queries(stats: QueryStats) -> None:
+    if stats.queries > settings.REQUEST_QUERY_COUNT_THRESHOLD:
+        logger.warning(
+            "request %s ran %s",
+            stats.request_id,
+            stats.summary(),
+            extra={"request_id": stats.request_id},
+        )
+        return
+    for statement_fingerprint, count in stats.repeated_fingerprints(
+        settings.REPEATED_QUERY_THRESHOLD
+    ):
+        logger.warning(
+            "request %s ran the same query %d times, possible N+1: %s",
+            stats.request_id,
+            count,
+            statement_fingerprint,
+            extra={"request_id": stats.request_id},
+        )
+
+
+def _before_cursor_execute(connection, *_):
+    connection.info["query_started_at"] = time.perf_counter()
+
+
+def _after_cursor_execute(connection, _cursor, statement, *_):
+    started = connection.info.pop("query_started_at", None)
+    if started is None:
+        return
+    duration_seconds = time.perf_counter() - started
+    is_slow = duration_seconds * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS
+    stats = _request_query_stats.get()
+    if stats is None and not _collectors and not is_slow:
+        return
+    statement_fingerprint = fingerprint(statement)
+    if stats is not None:
+        stats.record(statement_fingerprint, duration_seconds)
+    for collector in _collectors:
+        collector.record(statement_fingerprint, duration_seconds)
+    if is_slow:
+        request_id = stats.request_id if stats else None
+        logger.warning(
+            "slow query in request %s, %.1fms: %s",
+            request_id,
+            duration_seconds * 1000,
+            statement_fingerprint,
+            extra={"request_id": request_id},
+        )
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Times every statement executed by the engine, see `track_request_queries`"""
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
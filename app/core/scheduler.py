@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.core.config import settings
+from app.core.db import direct_engine
+from app.core.metrics import (
+    SCHEDULER_JOB_DURATION_SECONDS,
+    SCHEDULER_JOB_ROWS_AFFECTED_TOTAL,
+    SCHEDULER_JOB_RUNS_TOTAL,
+)
+from app.core.utils import aware_datetime_now
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class JobRunStats:
+    runs: int = 0
+    failures: int = 0
+    rows_affected: int = 0
+    last_started_at: datetime | None = None
+    last_duration_seconds: float | None = None
+    last_rows_affected: int | None = None
+    last_error: str | None = None
+
+
+@dataclass
+class ScheduledJob:
+    name: str
+    func: Callable[[], Awaitable[int | None]]
+    interval_seconds: float
+    stats: JobRunStats = field(default_factory=JobRunStats)
+    next_run_at: float = 0.0
+
+
+class Scheduler:
+    """In-app runner for periodic maintenance jobs.
+
+    Every worker process starts a scheduler but only the one holding the postgres
+    advisory lock `SCHEDULER_LOCK_KEY` (the leader) runs the jobs, the others retry
+    taking the lock every `SCHEDULER_LEADER_RETRY_SECONDS` so a new leader is elected
+    when the current one exits. Jobs are coroutines returning the number of rows
+    they affected, which is recorded with the duration of each run in `job.stats`
+    and the `scheduler_job_*` metrics.
+    """
+
+    def __init__(self):
+        self.jobs: dict[str, ScheduledJob] = {}
+        self._task: asyncio.Task | None = None
+        self._lock_connection: AsyncConnection | None = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._lock_connection is not None
+
+    def add_job(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[int | None]],
+        interval_seconds: float,
+    ) -> None:
+        self.jobs[name] = ScheduledJob(
+            name=name, func=func, interval_seconds=interval_seconds
+        )
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="scheduler")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._release_leadership()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if await self._ensure_leadership():
+                    await self._run_due_jobs()
+            except Exception:
+                logger.exception("scheduler tick failed, giving up leadership")
+                await self._release_leadership()
+            await asyncio.sleep(self._seconds_until_next_tick())
+
+    async def _run_due_jobs(self) -> None:
+        for job in self.jobs.values():
+            if time.monotonic() < job.next_run_at:
+                continue
+            job.next_run_at = time.monotonic() + job.interval_seconds
+            await self._run_job(job)
+
+    async def _run_job(self, job: ScheduledJob) -> None:
+        stats = job.stats
+        stats.runs += 1
+        stats.last_started_at = aware_datetime_now()
+        started = time.perf_counter()
+        try:
+            rows_affected = await job.func() or 0
+        except Exception as error:
+            stats.failures += 1
+            stats.last_error = repr(error)
+            stats.last_rows_affected = None
+            logger.exception("scheduled job %s failed", job.name)
+            SCHEDULER_JOB_RUNS_TOTAL.inc(job=job.name, outcome="error")
+        else:
+            stats.rows_affected += rows_affected
+            stats.last_rows_affected = rows_affected
+            stats.last_error = None
+            SCHEDULER_JOB_RUNS_TOTAL.inc(job=job.name, outcome="success")
+            SCHEDULER_JOB_ROWS_AFFECTED_TOTAL.inc(rows_affected, job=job.name)
+        stats.last_duration_seconds = time.perf_counter() - started
+        SCHEDULER_JOB_DURATION_SECONDS.observe(
+            stats.last_duration_seconds, job=job.name
+        )
+        logger.info(
+            "scheduled job %s ran in %.3fs, rows affected: %s",
+            job.name,
+            stats.last_duration_seconds,
+            stats.last_rows_affected,
+        )
+
+    def _seconds_until_next_tick(self) -> float:
+        if not self.is_leader or not self.jobs:
+            return settings.SCHEDULER_LEADER_RETRY_SECONDS
+        next_run_at = min(job.next_run_at for job in self.jobs.values())
+        return min(
+            max(next_run_at - time.monotonic(), 0.0),
+            settings.SCHEDULER_LEADER_RETRY_SECONDS,
+        )
+
+    async def _ensure_leadership(self) -> bool:
+        """Takes the advisory lock if it is free, or checks that the session holding it
+        is still alive. the lock is released by postgres if the connection drops"""
+        if self._lock_connection is not None:
+            await self._lock_connection.execute(text("SELECT 1"))
+            await self._lock_connection.commit()
+            return True
+        connection = await direct_engine.connect()
+        try:
+            acquired = (
+                await connection.execute(
+                    text("SELECT pg_try_advisory_lock(:key)"),
+                    {"key": settings.SCHEDULER_LOCK_KEY},
+                )
+            ).scalar_one()
+            await connection.commit()
+        except Exception:
+            await connection.close()
+            raise
+        if not acquired:
+            await connection.close()
+            return False
+        logger.info("scheduler leadership acquired")
+        self._lock_connection = connection
+        return True
+
+    async def _release_leadership(self) -> None:
+        connection, self._lock_connection = self._lock_connection, None
+        if connection is None:
+            return
+        try:
+            await connection.execute(
+                text("SELECT pg_advisory_unlock(:key)"),
+                {"key": settings.SCHEDULER_LOCK_KEY},
+            )
+            await connection.commit()
+        except Exception:
+            logger.exception("failed to release the scheduler advisory lock")
+        finally:
+            await connection.close()
+
+
+scheduler = Scheduler()
@@ -1,11 +1,17 @@
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
 from datetime import UTC, datetime, timedelta
 from enum import Enum
-from typing import TYPE_CHECKING
+from functools import cache
+from typing import TYPE_CHECKING, NamedTuple
+from uuid import UUID, uuid4
 
 import bcrypt
 import jwt
+from jwt.algorithms import HMACAlgorithm
 from passlib.context import CryptContext
+from pydantic import TypeAdapter
 
 from app.core.config import settings
 
@@ -27,11 +33,81 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 ALGORITHM = "HS256"
 
+# the key bytes are validated and encoded once instead of on every encode and decode
+SIGNING_KEY = HMACAlgorithm(HMACAlgorithm.SHA256).prepare_key(settings.SECRET_KEY)
+
+
+@cache
+def token_subject_adapter() -> TypeAdapter["TokenSubject"]:
+    from app.models.schemas.api import TokenSubject
+
+    return TypeAdapter(TokenSubject)
+
+
+class TokenClaims(NamedTuple):
+    subject: "TokenSubject"
+    jti: str | None
+    issued_at: float | None
+    expires_at: int
+
+
+class VerifiedToken(NamedTuple):
+    token: str
+    claims: TokenClaims
+    valid_until: float
+
+
+class VerifiedTokenCache:
+    """Bounded LRU cache of the subjects of tokens that passed verification.
+
+    Entries are keyed by the token signature and only served for the exact same token,
+    they are valid for `TOKEN_CACHE_TTL_SECONDS` but never past the token's `exp`.
+    Revocation is checked after decoding, a cached token can still be rejected.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, VerifiedToken] = OrderedDict()
+
+    def get(self, token: str) -> TokenClaims | None:
+        signature = token.rpartition(".")[2]
+        entry = self._entries.get(signature)
+        if entry is None or entry.token != token:
+            return None
+        if time.time() >= entry.valid_until:
+            del self._entries[signature]
+            return None
+        self._entries.move_to_end(signature)
+        return entry.claims
+
+    def set(self, token: str, claims: TokenClaims) -> None:
+        valid_until = min(claims.expires_at, time.time() + self.ttl_seconds)
+        self._entries[token.rpartition(".")[2]] = VerifiedToken(
+            token, claims, valid_until
+        )
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+verified_tokens = VerifiedTokenCache(
+    max_size=settings.TOKEN_CACHE_MAX_SIZE, ttl_seconds=settings.TOKEN_CACHE_TTL_SECONDS
+)
+
 
 def create_access_token(subject: "TokenSubject", expires_delta: timedelta) -> str:
-    expire = datetime.now(UTC) + expires_delta
-    to_encode = {"exp": expire, "sub": subject.model_dump_json()}
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
+    now = datetime.now(UTC)
+    to_encode = {
+        "exp": now + expires_delta,
+        # sub-second, `tokens_valid_after` can fall in the second the token was issued
+        "iat": now.timestamp(),
+        "jti": uuid4().hex,
+        "sub": token_subject_adapter().dump_json(subject).decode(),
+    }
+    encoded_jwt = jwt.encode(to_encode, SIGNING_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
@@ -43,16 +119,56 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def decode_jwt(token: str) -> TokenClaims:
+    """Decodes a jwt token and returns its claims.
+
+    Recently verified tokens are served from `verified_tokens` without decoding.
+
+    Raises:
+        InvalidTokenError: If it fails to decode the jwt token, or it has expired
+    """
+    claims = verified_tokens.get(token)
+    if claims is None:
+        payload = jwt.decode(token, SIGNING_KEY, algorithms=[ALGORITHM])
+        claims = TokenClaims(
+            subject=token_subject_adapter().validate_json(payload["sub"]),
+            jti=payload.get("jti"),
+            issued_at=payload.get("iat"),
+            expires_at=payload["exp"],
+        )
+        verified_tokens.set(token, claims)
+    return claims
+
+
 def decode_jwt_subject(token: str) -> "TokenSubject":
     """Decodes a jwt token and returns the subject.
 
     Raises:
         InvalidTokenError: If it fails to decode the jwt token, or it has expired
     """
-    from app.models.schemas.api import TokenSubject
+    return decode_jwt(token).subject
 
-    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
-    return TokenSubject.model_validate_json(payload["sub"])
+
+INVITE_TOKEN_AUDIENCE = "organization_invite"
+
+
+def create_invite_token(invite_id: UUID, expires_at: datetime) -> str:
+    """Signs the id of an organization invite, the audience claim keeps the token from
+    being accepted as an access token"""
+    to_encode = {"exp": expires_at, "aud": INVITE_TOKEN_AUDIENCE, "sub": str(invite_id)}
+    return jwt.encode(to_encode, SIGNING_KEY, algorithm=ALGORITHM)
+
+
+def decode_invite_token(token: str) -> UUID:
+    """Returns the id of the organization invite signed by the token.
+
+    Raises:
+        InvalidTokenError: If it fails to decode the jwt token, or it has expired
+    """
+    payload = jwt.decode(
+        token, SIGNING_KEY, algorithms=[ALGORITHM], audience=INVITE_TOKEN_AUDIENCE
+    )
+    return UUID(payload["sub"])
 
 
 class APIScope(str, Enum):
@@ -1,4 +1,9 @@
+import base64
+import os
+import threading
+import time
 from datetime import datetime
+from uuid import UUID
 from zoneinfo import ZoneInfo
 
 from fastapi import HTTPException, status
@@ -11,6 +16,60 @@ def aware_datetime_now() -> datetime:
     return datetime.now(tz=ZoneInfo(settings.TIMEZONE))
 
 
+_uuid7_lock = threading.Lock()
+# the timestamp and the random bits of the last uuid7
+_last_uuid7 = (0, 0)
+
+
+def uuid7() -> UUID:
+    """Returns a time-ordered UUID (version 7 of RFC 9562): a 48 bits unix timestamp in
+    milliseconds followed by 74 random bits.
+
+    Ids generated later sort after the earlier ones, so primary key inserts append to
+    the right-most page of the index instead of a random page as with `uuid4`. The ids
+    of the same millisecond, or generated while the clock went back, are monotonic too:
+    the random bits of the last id are increased by a random amount.
+    """
+    global _last_uuid7
+    timestamp = time.time_ns() // 1_000_000
+    random_bits = int.from_bytes(os.urandom(10)) >> 6
+    with _uuid7_lock:
+        last_timestamp, last_random_bits = _last_uuid7
+        if timestamp <= last_timestamp:
+            timestamp = last_timestamp
+            random_bits = last_random_bits + 1 + (random_bits >> 42)
+            if random_bits >> 74:
+                timestamp, random_bits = timestamp + 1, random_bits & (1 << 74) - 1
+        _last_uuid7 = timestamp, random_bits
+    value = (
+        timestamp << 80
+        | 0x7 << 76  # version
+        | (random_bits >> 62) << 64
+        | 0x2 << 62  # variant
+        | random_bits & (1 << 62) - 1
+    )
+    return UUID(int=value)
+
+
+def encode_cursor(created_at: datetime, id: UUID) -> str:
+    """Encodes the position of a row in a keyset pagination ordered by
+    `(created_at, id)` as an opaque cursor"""
+    position = f"{created_at.isoformat()}|{id}"
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """
+    Raises:
+        ValueError: If the cursor was not encoded by `encode_cursor`
+    """
+    try:
+        created_at, _, id = base64.urlsafe_b64decode(cursor).decode().partition("|")
+        return datetime.fromisoformat(created_at), UUID(id)
+    except (ValueError, UnicodeDecodeError) as error:
+        raise ValueError("invalid cursor") from error
+
+
 ENDPOINT_NOT_IMPLEMENTED = HTTPException(
     status_code=status.HTTP_501_NOT_IMPLEMENTED,
     detail="endpoint has not been implemented yet",
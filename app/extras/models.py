@@ -9,7 +9,7 @@ from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.mutable import Mutable
 from sqlmodel import TIMESTAMP, Field, SQLModel
 
-from app.core.utils import aware_datetime_now
+from app.core.utils import aware_datetime_now, uuid7
 from app.models.managers.base_manager import BaseModelManager
 
 
@@ -23,6 +23,23 @@ class BaseDBModel(SQLModel):
     objects: ClassVar[BaseModelManager] = BaseModelManager()
 
 
+class TimeOrderedDBModel(BaseDBModel):
+    """`BaseDBModel` with time-ordered (UUIDv7) ids, for tables with a high insert rate.
+
+    Random `uuid4` ids spread the inserts over every page of the primary key index,
+    time-ordered ids append them to its right-most page which stays in the cache and
+    keeps the index compact. The creation time of the rows can be read from their id.
+
+    Switching an existing table is a change of the default only, no migration is needed:
+    both versions share the column type and the existing `uuid4` ids are kept. The new
+    ids all fall in the narrow key range of the current time, so their inserts stay on
+    the few pages of that range among the old ids, `REINDEX` the primary key once most
+    of the rows are new to compact the pages left half full by the random inserts.
+    """
+
+    id: UUID = Field(default_factory=uuid7, primary_key=True)
+
+
 class JSONBPydanticField(types.TypeDecorator):
     """This is a custom SQLAlchemy field that allows easy serialization between database JSONB types and Pydantic models"""
 
@@ -1,22 +1,98 @@
+import logging
+import time
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from fastapi.responses import RedirectResponse
+from fastapi.responses import PlainTextResponse, RedirectResponse
 from fastapi.routing import APIRoute
 from fastapi_pagination import add_pagination
 from starlette.middleware.cors import CORSMiddleware
 
+from app import IMPORT_STARTED_AT
 from app.api.main import api_router
 from app.core.config import settings
+from app.core.db import dispose_engines, warm_up_pool
+from app.core.email_service import warm_up_templates
+from app.core.metrics import APP_STARTUP_DURATION_SECONDS, registry
+from app.core.middleware import (
+    MetricsMiddleware,
+    ProfilingMiddleware,
+    RequestContextMiddleware,
+)
+from app.core.scheduler import scheduler
+from app.core.security import token_subject_adapter
+from app.models import Event, OTPRecord, RateLimitWindow, RevokedToken
+
+logger = logging.getLogger(__name__)
 
 
 def custom_generate_unique_id(route: APIRoute) -> str:
     return f"{route.tags[0]}-{route.name}"
 
 
+async def warm_up(app: FastAPI) -> None:
+    """Does the work deferred to the first requests of the worker ahead of them, so
+    the requests after a deploy or a scale up are as fast as the steady state ones"""
+    try:
+        await warm_up_pool(settings.DB_POOL_WARMUP_CONNECTIONS)
+    except Exception:
+        logger.exception("could not warm up the database connection pool")
+    warm_up_templates()
+    token_subject_adapter()
+    app.openapi()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    APP_STARTUP_DURATION_SECONDS.set(started - IMPORT_STARTED_AT, phase="import")
+    await warm_up(app)
+    APP_STARTUP_DURATION_SECONDS.set(time.perf_counter() - started, phase="warmup")
+    # every worker keeps its own filter, unlike the jobs it is not run by the leader
+    RevokedToken.objects.start_filter_refresh()
+    if settings.METRICS_ENABLED:
+        registry.start_writing()
+    if settings.SCHEDULER_ENABLED:
+        scheduler.add_job(
+            "close_ended_events",
+            Event.objects.close_ended_events,
+            interval_seconds=settings.EVENT_STATUS_JOB_INTERVAL_SECONDS,
+        )
+        scheduler.add_job(
+            "archive_closed_events",
+            Event.objects.archive_closed_events,
+            interval_seconds=settings.EVENT_STATUS_JOB_INTERVAL_SECONDS,
+        )
+        scheduler.add_job(
+            "delete_expired_otps",
+            OTPRecord.objects.delete_expired,
+            interval_seconds=settings.OTP_PURGE_INTERVAL_SECONDS,
+        )
+        scheduler.add_job(
+            "delete_expired_revoked_tokens",
+            RevokedToken.objects.delete_expired,
+            interval_seconds=settings.OTP_PURGE_INTERVAL_SECONDS,
+        )
+        if settings.RATE_LIMIT_STORE == "database":
+            scheduler.add_job(
+                "delete_expired_rate_limit_windows",
+                RateLimitWindow.objects.delete_expired,
+                interval_seconds=settings.OTP_PURGE_INTERVAL_SECONDS,
+            )
+        scheduler.start()
+    yield
+    await scheduler.stop()
+    await RevokedToken.objects.stop_filter_refresh()
+    await registry.stop_writing()
+    await dispose_engines()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     generate_unique_id_function=custom_generate_unique_id,
     description=settings.DESCRIPTION,
+    lifespan=lifespan,
 )
 
 # Set all CORS enabled origins
@@ -29,6 +105,12 @@ if settings.all_cors_origins:
         allow_headers=["*"],
     )
 
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+app.add_middleware(RequestContextMiddleware)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
 add_pagination(app)
 
@@ -36,3 +118,20 @@ add_pagination(app)
 @app.get("/", tags=["docs"])
 async def redirect_to_docs():
     return RedirectResponse("/docs")
+
+
+async def metrics():
+    """Metrics of the workers in the prometheus text exposition format, only the ones
+    of the worker serving the request without `METRICS_MULTIPROCESS_DIR`"""
+    content = (
+        await registry.render_workers()
+        if settings.METRICS_MULTIPROCESS_DIR
+        else registry.render()
+    )
+    return PlainTextResponse(
+        content, media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+if settings.METRICS_ENABLED:
+    app.add_api_route("/metrics", metrics, tags=["metrics"], include_in_schema=False)
@@ -0,0 +1,44 @@
+"""Rate limit windows
+
+Revision ID: 4431be7fc85e
+Revises: cfe7f2be9406
+Create Date: 2026-10-19 11:27:04.118342
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "4431be7fc85e"
+down_revision: str | None = "cfe7f2be9406"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "rate_limit_windows",
+        sa.Column("key", sqlmodel.sql.sqltypes.AutoString(length=384), nullable=False),
+        sa.Column("window", sa.BigInteger(), nullable=False),
+        sa.Column("hits", sa.Integer(), nullable=False),
+        sa.Column("expires_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("key", "window"),
+        prefixes=["UNLOGGED"],
+    )
+    op.create_index(
+        op.f("ix_rate_limit_windows_expires_at"),
+        "rate_limit_windows",
+        ["expires_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        op.f("ix_rate_limit_windows_expires_at"), table_name="rate_limit_windows"
+    )
+    op.drop_table("rate_limit_windows")
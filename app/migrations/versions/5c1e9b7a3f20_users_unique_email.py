@@ -0,0 +1,25 @@
+"""Users unique email
+
+Revision ID: 5c1e9b7a3f20
+Revises: a50688ffb268
+Create Date: 2026-10-19 17:02:11.482913
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5c1e9b7a3f20"
+down_revision: str | None = "a50688ffb268"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f("ix_users_email"), "users", ["email"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_users_email"), table_name="users")
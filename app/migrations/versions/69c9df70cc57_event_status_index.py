@@ -0,0 +1,31 @@
+"""Event status index
+
+Revision ID: 69c9df70cc57
+Revises: cbdf5ca0a1d1
+Create Date: 2026-10-19 10:03:17.284519
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "69c9df70cc57"
+down_revision: str | None = "cbdf5ca0a1d1"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_events_status_ends_at",
+        "events",
+        ["status", sa.text("coalesce(ends_at, starts_at)")],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_events_status_ends_at", table_name="events")
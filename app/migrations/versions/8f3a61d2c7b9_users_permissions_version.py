@@ -0,0 +1,31 @@
+"""Users permissions version
+
+Revision ID: 8f3a61d2c7b9
+Revises: 4431be7fc85e
+Create Date: 2026-10-19 14:12:37.518204
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8f3a61d2c7b9"
+down_revision: str | None = "4431be7fc85e"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "users",
+        sa.Column(
+            "permissions_version", sa.Integer(), server_default="0", nullable=False
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("users", "permissions_version")
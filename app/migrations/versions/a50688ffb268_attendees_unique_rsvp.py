@@ -0,0 +1,42 @@
+"""Attendees unique RSVP
+
+Revision ID: a50688ffb268
+Revises: d2b7e05a91c4
+Create Date: 2026-10-19 16:23:56.868274
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a50688ffb268"
+down_revision: str | None = "d2b7e05a91c4"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+# the RSVPs repeated before the constraint are removed, keeping the one marked as
+# attended or else the earliest
+DELETE_DUPLICATE_ATTENDEES_SQL = """
+DELETE FROM attendees a
+USING (
+    SELECT id, row_number() OVER (
+        PARTITION BY event_id, email ORDER BY attended_event DESC, created_at, id
+    ) AS position
+    FROM attendees
+) ranked
+WHERE a.id = ranked.id AND ranked.position > 1
+"""
+
+
+def upgrade() -> None:
+    op.execute(DELETE_DUPLICATE_ATTENDEES_SQL)
+    op.create_unique_constraint(
+        "uq_attendees_event_id_email", "attendees", ["event_id", "email"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_attendees_event_id_email", "attendees", type_="unique")
@@ -0,0 +1,34 @@
+"""Event calendar feeds
+
+Revision ID: a9c4e7f1b3d2
+Revises: f7a41c9d2e58
+Create Date: 2026-10-19 21:12:40.518274
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a9c4e7f1b3d2"
+down_revision: str | None = "f7a41c9d2e58"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_events_last_updated_at", "events", ["last_updated_at"], unique=False
+    )
+    op.create_index(
+        "ix_events_organization_id_last_updated_at",
+        "events",
+        ["organization_id", "last_updated_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_events_organization_id_last_updated_at", table_name="events")
+    op.drop_index("ix_events_last_updated_at", table_name="events")
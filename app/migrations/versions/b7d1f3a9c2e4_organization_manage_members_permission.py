@@ -0,0 +1,80 @@
+"""Organization manage members permission
+
+Revision ID: b7d1f3a9c2e4
+Revises: d4b8e2f6a3c1
+Create Date: 2026-10-20 09:12:37.514820
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b7d1f3a9c2e4"
+down_revision: str | None = "d4b8e2f6a3c1"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# the owners have every permission, the permission claims of their tokens are stale
+GRANT_OWNERS_SQL = """
+WITH granted AS (
+    UPDATE organizations o
+    SET members = (
+        SELECT jsonb_agg(
+            CASE WHEN m.value ->> 'id' = o.owner_id::text
+                THEN jsonb_set(
+                    m.value, '{permissions}',
+                    (m.value -> 'permissions') || '["MEMBERS:MANAGE"]'::jsonb
+                )
+                ELSE m.value END
+            ORDER BY m.position
+        )
+        FROM jsonb_array_elements(o.members) WITH ORDINALITY AS m(value, position)
+    )
+    WHERE EXISTS (
+        SELECT 1 FROM jsonb_array_elements(o.members) AS m(value)
+        WHERE m.value ->> 'id' = o.owner_id::text
+            AND NOT m.value -> 'permissions' ? 'MEMBERS:MANAGE'
+    )
+    RETURNING o.owner_id
+)
+UPDATE users SET permissions_version = permissions_version + 1
+WHERE id IN (SELECT owner_id FROM granted)
+"""
+
+# the sibling statements of a data modifying CTE see the members before the update
+REVOKE_MEMBERS_SQL = """
+WITH revoked AS (
+    SELECT DISTINCT (m.value ->> 'id')::uuid AS id
+    FROM organizations o, jsonb_array_elements(o.members) AS m(value)
+    WHERE m.value -> 'permissions' ? 'MEMBERS:MANAGE'
+), updated AS (
+    UPDATE organizations o
+    SET members = (
+        SELECT jsonb_agg(
+            jsonb_set(
+                m.value, '{permissions}', (m.value -> 'permissions') - 'MEMBERS:MANAGE'
+            )
+            ORDER BY m.position
+        )
+        FROM jsonb_array_elements(o.members) WITH ORDINALITY AS m(value, position)
+    )
+    WHERE o.members @> '[{"permissions": ["MEMBERS:MANAGE"]}]'
+)
+UPDATE users SET permissions_version = permissions_version + 1
+WHERE id IN (SELECT id FROM revoked)
+"""
+
+
+def upgrade() -> None:
+    op.execute(GRANT_OWNERS_SQL)
+
+
+def downgrade() -> None:
+    op.execute(REVOKE_MEMBERS_SQL)
+    op.execute(
+        "UPDATE organization_invites"
+        " SET permissions = permissions - 'MEMBERS:MANAGE'"
+        " WHERE permissions ? 'MEMBERS:MANAGE'"
+    )
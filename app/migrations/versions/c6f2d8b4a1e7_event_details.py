@@ -0,0 +1,295 @@
+"""Event details
+
+Revision ID: c6f2d8b4a1e7
+Revises: a9c4e7f1b3d2
+Create Date: 2026-10-19 22:26:09.731846
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "c6f2d8b4a1e7"
+down_revision: str | None = "a9c4e7f1b3d2"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# the counts are only computed for new rows, the attendees triggers keep them after
+REFRESH_EVENT_DETAILS_SQL = """
+CREATE FUNCTION refresh_event_details(event_ids uuid[]) RETURNS void
+LANGUAGE sql AS $$
+INSERT INTO event_details (
+    event_id, snapshot, attendee_count, attended_count, last_updated_at
+)
+SELECT
+    e.id,
+    jsonb_build_object(
+        'id', e.id,
+        'source', e.source,
+        'status', e.status,
+        'mode_of_attending', e.mode_of_attending,
+        'title', e.title,
+        'theme', e.theme,
+        'description', e.description,
+        'fee', e.fee,
+        'starts_at', e.starts_at,
+        'ends_at', e.ends_at,
+        'location', e.location,
+        'link', e.link,
+        'passcode', e.passcode,
+        'attendee_questionnaire', e.attendee_questionnaire,
+        'organization', CASE WHEN o.id IS NOT NULL THEN jsonb_build_object(
+            'id', o.id,
+            'name', o.name,
+            'is_verified', o.is_verified,
+            'logo_url', o.logo_url,
+            'about', o.about
+        ) END,
+        'tags', coalesce((
+            SELECT jsonb_agg(
+                jsonb_build_object('id', t.id, 'value', t.value) ORDER BY t.value
+            )
+            FROM eventtags et JOIN tags t ON t.id = et.tag_id
+            WHERE et.event_id = e.id
+        ), '[]'),
+        'officials', coalesce((
+            SELECT jsonb_agg(
+                jsonb_build_object(
+                    'id', eo.id,
+                    'type', eo.type,
+                    'first_name', eo.first_name,
+                    'last_name', eo.last_name,
+                    'role', eo.role,
+                    'contact_information', eo.contact_information
+                ) ORDER BY eo.created_at, eo.id
+            )
+            FROM event_officials eo
+            WHERE eo.event_id = e.id
+        ), '[]')
+    ),
+    CASE WHEN d.event_id IS NULL THEN (
+        SELECT count(*) FROM attendees a WHERE a.event_id = e.id
+    ) ELSE 0 END,
+    CASE WHEN d.event_id IS NULL THEN (
+        SELECT count(*) FROM attendees a WHERE a.event_id = e.id AND a.attended_event
+    ) ELSE 0 END,
+    now()
+FROM events e
+LEFT JOIN organizations o ON o.id = e.organization_id
+LEFT JOIN event_details d ON d.event_id = e.id
+WHERE e.id = ANY(event_ids)
+ON CONFLICT (event_id) DO UPDATE
+SET snapshot = EXCLUDED.snapshot, last_updated_at = EXCLUDED.last_updated_at
+$$
+"""
+
+# statement level, the argument is the column of the changed rows holding the event id
+EVENT_DETAILS_REFRESH_TRIGGER_SQL = """
+CREATE FUNCTION event_details_refresh() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM refresh_event_details(ARRAY(
+            SELECT DISTINCT (to_jsonb(n) ->> TG_ARGV[0])::uuid FROM new_rows n
+        ));
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') AND TG_ARGV[0] <> 'id' THEN
+        PERFORM refresh_event_details(ARRAY(
+            SELECT DISTINCT (to_jsonb(o) ->> TG_ARGV[0])::uuid FROM old_rows o
+        ));
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+EVENT_DETAILS_COUNT_ATTENDEES_TRIGGER_SQL = """
+CREATE FUNCTION event_details_count_attendees() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE event_details d
+        SET attendee_count = d.attendee_count + c.attendees,
+            attended_count = d.attended_count + c.attended
+        FROM (
+            SELECT event_id, count(*) AS attendees,
+                count(*) FILTER (WHERE attended_event) AS attended
+            FROM new_rows GROUP BY event_id
+        ) c
+        WHERE d.event_id = c.event_id;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE event_details d
+        SET attendee_count = d.attendee_count - c.attendees,
+            attended_count = d.attended_count - c.attended
+        FROM (
+            SELECT event_id, count(*) AS attendees,
+                count(*) FILTER (WHERE attended_event) AS attended
+            FROM old_rows GROUP BY event_id
+        ) c
+        WHERE d.event_id = c.event_id;
+    ELSE
+        UPDATE event_details d
+        SET attendee_count = d.attendee_count + c.attendees,
+            attended_count = d.attended_count + c.attended
+        FROM (
+            SELECT event_id, sum(sign) AS attendees,
+                coalesce(sum(sign) FILTER (WHERE attended_event), 0) AS attended
+            FROM (
+                SELECT event_id, attended_event, 1 AS sign FROM new_rows
+                UNION ALL
+                SELECT event_id, attended_event, -1 AS sign FROM old_rows
+            ) changes
+            GROUP BY event_id
+        ) c
+        WHERE d.event_id = c.event_id AND (c.attendees <> 0 OR c.attended <> 0);
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+# row level, the changes of a tag value or an organization are rare but fan out to
+# all of its events
+EVENT_DETAILS_REFRESH_TAG_TRIGGER_SQL = """
+CREATE FUNCTION event_details_refresh_tag() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM refresh_event_details(ARRAY(
+        SELECT event_id FROM eventtags WHERE tag_id = NEW.id
+    ));
+    RETURN NULL;
+END
+$$
+"""
+
+EVENT_DETAILS_REFRESH_ORGANIZATION_TRIGGER_SQL = """
+CREATE FUNCTION event_details_refresh_organization() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM refresh_event_details(ARRAY(
+        SELECT id FROM events WHERE organization_id = NEW.id
+    ));
+    RETURN NULL;
+END
+$$
+"""
+
+# (name, table, event, transition tables, function and argument)
+STATEMENT_TRIGGERS = [
+    ("events_insert", "events", "INSERT", "NEW TABLE AS new_rows", "refresh('id')"),
+    ("events_update", "events", "UPDATE", "NEW TABLE AS new_rows", "refresh('id')"),
+    (
+        "eventtags_insert",
+        "eventtags",
+        "INSERT",
+        "NEW TABLE AS new_rows",
+        "refresh('event_id')",
+    ),
+    (
+        "eventtags_delete",
+        "eventtags",
+        "DELETE",
+        "OLD TABLE AS old_rows",
+        "refresh('event_id')",
+    ),
+    (
+        "event_officials_insert",
+        "event_officials",
+        "INSERT",
+        "NEW TABLE AS new_rows",
+        "refresh('event_id')",
+    ),
+    (
+        "event_officials_update",
+        "event_officials",
+        "UPDATE",
+        "NEW TABLE AS new_rows OLD TABLE AS old_rows",
+        "refresh('event_id')",
+    ),
+    (
+        "event_officials_delete",
+        "event_officials",
+        "DELETE",
+        "OLD TABLE AS old_rows",
+        "refresh('event_id')",
+    ),
+    (
+        "attendees_insert",
+        "attendees",
+        "INSERT",
+        "NEW TABLE AS new_rows",
+        "count_attendees()",
+    ),
+    (
+        "attendees_update",
+        "attendees",
+        "UPDATE",
+        "NEW TABLE AS new_rows OLD TABLE AS old_rows",
+        "count_attendees()",
+    ),
+    (
+        "attendees_delete",
+        "attendees",
+        "DELETE",
+        "OLD TABLE AS old_rows",
+        "count_attendees()",
+    ),
+]
+
+ROW_TRIGGERS = [
+    ("tags_update", "tags", "UPDATE OF value", "OLD.value", "refresh_tag()"),
+    (
+        "organizations_update",
+        "organizations",
+        "UPDATE OF name, is_verified, logo_url, about",
+        "(OLD.name, OLD.is_verified, OLD.logo_url, OLD.about)",
+        "refresh_organization()",
+    ),
+]
+
+
+def upgrade() -> None:
+    op.create_table(
+        "event_details",
+        sa.Column("event_id", sa.Uuid(), nullable=False),
+        sa.Column("snapshot", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("attendee_count", sa.Integer(), nullable=False),
+        sa.Column("attended_count", sa.Integer(), nullable=False),
+        sa.Column("last_updated_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(["event_id"], ["events.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("event_id"),
+    )
+    op.execute(REFRESH_EVENT_DETAILS_SQL)
+    op.execute(EVENT_DETAILS_REFRESH_TRIGGER_SQL)
+    op.execute(EVENT_DETAILS_COUNT_ATTENDEES_TRIGGER_SQL)
+    op.execute(EVENT_DETAILS_REFRESH_TAG_TRIGGER_SQL)
+    op.execute(EVENT_DETAILS_REFRESH_ORGANIZATION_TRIGGER_SQL)
+    for name, table, trigger_event, transition_tables, function in STATEMENT_TRIGGERS:
+        op.execute(
+            f"CREATE TRIGGER event_details_{name} AFTER {trigger_event} ON {table}"
+            f" REFERENCING {transition_tables} FOR EACH STATEMENT"
+            f" EXECUTE FUNCTION event_details_{function}"
+        )
+    for name, table, trigger_event, old_values, function in ROW_TRIGGERS:
+        new_values = old_values.replace("OLD.", "NEW.")
+        op.execute(
+            f"CREATE TRIGGER event_details_{name} AFTER {trigger_event} ON {table}"
+            f" FOR EACH ROW WHEN ({old_values} IS DISTINCT FROM {new_values})"
+            f" EXECUTE FUNCTION event_details_{function}"
+        )
+    op.execute("SELECT refresh_event_details(ARRAY(SELECT id FROM events))")
+
+
+def downgrade() -> None:
+    for name, table, *_ in [*STATEMENT_TRIGGERS, *ROW_TRIGGERS]:
+        op.execute(f"DROP TRIGGER event_details_{name} ON {table}")
+    op.execute("DROP FUNCTION event_details_refresh_organization()")
+    op.execute("DROP FUNCTION event_details_refresh_tag()")
+    op.execute("DROP FUNCTION event_details_count_attendees()")
+    op.execute("DROP FUNCTION event_details_refresh()")
+    op.execute("DROP FUNCTION refresh_event_details(uuid[])")
+    op.drop_table("event_details")
@@ -0,0 +1,45 @@
+"""Tag autocomplete
+
+Revision ID: cbdf5ca0a1d1
+Revises: b44971dc8be4
+Create Date: 2026-10-19 09:12:41.530211
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "cbdf5ca0a1d1"
+down_revision: str | None = "b44971dc8be4"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "tags",
+        sa.Column("usage_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.execute(
+        """
+        UPDATE tags SET usage_count = counts.usage_count
+        FROM (
+            SELECT tag_id, count(*) AS usage_count FROM eventtags GROUP BY tag_id
+        ) AS counts
+        WHERE tags.id = counts.tag_id
+        """
+    )
+    op.create_index(
+        "ix_tags_value_prefix",
+        "tags",
+        [sa.text("lower(value) text_pattern_ops")],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_tags_value_prefix", table_name="tags")
+    op.drop_column("tags", "usage_count")
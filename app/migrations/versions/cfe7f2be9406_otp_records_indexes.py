@@ -0,0 +1,34 @@
+"""OTP records indexes
+
+Revision ID: cfe7f2be9406
+Revises: 69c9df70cc57
+Create Date: 2026-10-19 10:41:52.906133
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "cfe7f2be9406"
+down_revision: str | None = "69c9df70cc57"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        op.f("ix_otp_records_expires_at"), "otp_records", ["expires_at"], unique=False
+    )
+    op.create_index(
+        "ix_otp_records_user_id_purpose",
+        "otp_records",
+        ["user_id", "purpose"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_otp_records_user_id_purpose", table_name="otp_records")
+    op.drop_index(op.f("ix_otp_records_expires_at"), table_name="otp_records")
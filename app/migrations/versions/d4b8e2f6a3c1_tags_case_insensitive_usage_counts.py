@@ -0,0 +1,125 @@
+"""Tags case insensitive values and usage count triggers
+
+Revision ID: d4b8e2f6a3c1
+Revises: c6f2d8b4a1e7
+Create Date: 2026-10-19 23:41:52.106384
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d4b8e2f6a3c1"
+down_revision: str | None = "c6f2d8b4a1e7"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+# the rows of the tags are locked in id order first, concurrent links of the same
+# tags would otherwise update them in the order of the aggregate and may deadlock
+TAGS_COUNT_USAGE_TRIGGER_SQL = """
+CREATE FUNCTION tags_count_usage() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM 1 FROM tags WHERE id IN (SELECT tag_id FROM new_rows)
+        ORDER BY id FOR NO KEY UPDATE;
+        UPDATE tags t SET usage_count = t.usage_count + c.uses
+        FROM (SELECT tag_id, count(*) AS uses FROM new_rows GROUP BY tag_id) c
+        WHERE t.id = c.tag_id;
+    ELSE
+        PERFORM 1 FROM tags WHERE id IN (SELECT tag_id FROM old_rows)
+        ORDER BY id FOR NO KEY UPDATE;
+        UPDATE tags t SET usage_count = t.usage_count - c.uses
+        FROM (SELECT tag_id, count(*) AS uses FROM old_rows GROUP BY tag_id) c
+        WHERE t.id = c.tag_id;
+    END IF;
+    RETURN NULL;
+END
+$$
+"""
+
+# the most used tag of each set of values differing only by case is kept, the events
+# of the others are linked to it
+MERGE_DUPLICATE_TAGS_SQL = [
+    """
+    CREATE TEMPORARY TABLE duplicate_tags ON COMMIT DROP AS
+    SELECT id, kept_id FROM (
+        SELECT id, first_value(id) OVER (
+            PARTITION BY lower(value) ORDER BY usage_count DESC, created_at, id
+        ) AS kept_id
+        FROM tags
+    ) ranked
+    WHERE id <> kept_id
+    """,
+    """
+    INSERT INTO eventtags (tag_id, event_id)
+    SELECT d.kept_id, et.event_id
+    FROM eventtags et JOIN duplicate_tags d ON d.id = et.tag_id
+    ON CONFLICT DO NOTHING
+    """,
+    "DELETE FROM eventtags USING duplicate_tags d WHERE eventtags.tag_id = d.id",
+    "DELETE FROM tags USING duplicate_tags d WHERE tags.id = d.id",
+]
+
+
+def upgrade() -> None:
+    for statement in MERGE_DUPLICATE_TAGS_SQL:
+        op.execute(statement)
+    # deleting an event unlinks its tags
+    op.drop_constraint("eventtags_event_id_fkey", "eventtags", type_="foreignkey")
+    op.create_foreign_key(
+        "eventtags_event_id_fkey",
+        "eventtags",
+        "events",
+        ["event_id"],
+        ["id"],
+        ondelete="CASCADE",
+    )
+    op.drop_index("ix_tags_value_prefix", table_name="tags")
+    op.create_index(
+        "uq_tags_value_lower",
+        "tags",
+        [sa.text("lower(value) text_pattern_ops")],
+        unique=True,
+    )
+    op.execute(TAGS_COUNT_USAGE_TRIGGER_SQL)
+    op.execute(
+        "CREATE TRIGGER tags_count_usage_insert AFTER INSERT ON eventtags"
+        " REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT"
+        " EXECUTE FUNCTION tags_count_usage()"
+    )
+    op.execute(
+        "CREATE TRIGGER tags_count_usage_delete AFTER DELETE ON eventtags"
+        " REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT"
+        " EXECUTE FUNCTION tags_count_usage()"
+    )
+    # the counts were only ever incremented
+    op.execute(
+        """
+        UPDATE tags SET usage_count = coalesce(counts.usage_count, 0)
+        FROM tags t LEFT JOIN (
+            SELECT tag_id, count(*) AS usage_count FROM eventtags GROUP BY tag_id
+        ) counts ON counts.tag_id = t.id
+        WHERE tags.id = t.id AND tags.usage_count <> coalesce(counts.usage_count, 0)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER tags_count_usage_delete ON eventtags")
+    op.execute("DROP TRIGGER tags_count_usage_insert ON eventtags")
+    op.execute("DROP FUNCTION tags_count_usage()")
+    op.drop_index("uq_tags_value_lower", table_name="tags")
+    op.create_index(
+        "ix_tags_value_prefix",
+        "tags",
+        [sa.text("lower(value) text_pattern_ops")],
+        unique=False,
+    )
+    op.drop_constraint("eventtags_event_id_fkey", "eventtags", type_="foreignkey")
+    op.create_foreign_key(
+        "eventtags_event_id_fkey", "eventtags", "events", ["event_id"], ["id"]
+    )
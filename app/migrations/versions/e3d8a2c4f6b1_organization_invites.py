@@ -0,0 +1,64 @@
+"""Organization invites
+
+Revision ID: e3d8a2c4f6b1
+Revises: 5c1e9b7a3f20
+Create Date: 2026-10-19 19:12:40.318256
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "e3d8a2c4f6b1"
+down_revision: str | None = "5c1e9b7a3f20"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "organization_invites",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("last_updated_at", sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column("organization_id", sa.Uuid(), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum(
+                "PENDING",
+                "ACCEPTED",
+                "DECLINED",
+                "EXPIRED",
+                name="organizationinvitestatus",
+            ),
+            nullable=False,
+        ),
+        sa.Column(
+            "email", sqlmodel.sql.sqltypes.AutoString(length=320), nullable=False
+        ),
+        sa.Column(
+            "permissions", postgresql.JSONB(astext_type=sa.Text()), nullable=False
+        ),
+        sa.Column("invited_by_id", sa.Uuid(), nullable=True),
+        sa.Column("expires_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["organization_id"], ["organizations.id"], ondelete="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(["invited_by_id"], ["users.id"], ondelete="SET NULL"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "organization_id",
+            "email",
+            name="uq_organization_invites_organization_id_email",
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("organization_invites")
+    sa.Enum(name="organizationinvitestatus").drop(op.get_bind())
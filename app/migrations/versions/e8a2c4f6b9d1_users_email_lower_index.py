@@ -0,0 +1,28 @@
+"""Users email lower index
+
+Revision ID: e8a2c4f6b9d1
+Revises: b7d1f3a9c2e4
+Create Date: 2026-10-20 10:04:51.273916
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e8a2c4f6b9d1"
+down_revision: str | None = "b7d1f3a9c2e4"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_users_email_lower", "users", [sa.text("lower(email)")], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_email_lower", table_name="users")
@@ -0,0 +1,111 @@
+"""Event details refresh locks the events
+
+Revision ID: f3c9e1a7b5d2
+Revises: e8a2c4f6b9d1
+Create Date: 2026-10-20 11:27:08.649153
+
+"""
+
+import textwrap
+from collections.abc import Sequence
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f3c9e1a7b5d2"
+down_revision: str | None = "e8a2c4f6b9d1"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+UPSERT_EVENT_DETAILS_SQL = """
+INSERT INTO event_details (
+    event_id, snapshot, attendee_count, attended_count, last_updated_at
+)
+SELECT
+    e.id,
+    jsonb_build_object(
+        'id', e.id,
+        'source', e.source,
+        'status', e.status,
+        'mode_of_attending', e.mode_of_attending,
+        'title', e.title,
+        'theme', e.theme,
+        'description', e.description,
+        'fee', e.fee,
+        'starts_at', e.starts_at,
+        'ends_at', e.ends_at,
+        'location', e.location,
+        'link', e.link,
+        'passcode', e.passcode,
+        'attendee_questionnaire', e.attendee_questionnaire,
+        'organization', CASE WHEN o.id IS NOT NULL THEN jsonb_build_object(
+            'id', o.id,
+            'name', o.name,
+            'is_verified', o.is_verified,
+            'logo_url', o.logo_url,
+            'about', o.about
+        ) END,
+        'tags', coalesce((
+            SELECT jsonb_agg(
+                jsonb_build_object('id', t.id, 'value', t.value) ORDER BY t.value
+            )
+            FROM eventtags et JOIN tags t ON t.id = et.tag_id
+            WHERE et.event_id = e.id
+        ), '[]'),
+        'officials', coalesce((
+            SELECT jsonb_agg(
+                jsonb_build_object(
+                    'id', eo.id,
+                    'type', eo.type,
+                    'first_name', eo.first_name,
+                    'last_name', eo.last_name,
+                    'role', eo.role,
+                    'contact_information', eo.contact_information
+                ) ORDER BY eo.created_at, eo.id
+            )
+            FROM event_officials eo
+            WHERE eo.event_id = e.id
+        ), '[]')
+    ),
+    CASE WHEN d.event_id IS NULL THEN (
+        SELECT count(*) FROM attendees a WHERE a.event_id = e.id
+    ) ELSE 0 END,
+    CASE WHEN d.event_id IS NULL THEN (
+        SELECT count(*) FROM attendees a WHERE a.event_id = e.id AND a.attended_event
+    ) ELSE 0 END,
+    now()
+FROM events e
+LEFT JOIN organizations o ON o.id = e.organization_id
+LEFT JOIN event_details d ON d.event_id = e.id
+WHERE e.id = ANY(event_ids)
+ON CONFLICT (event_id) DO UPDATE
+SET snapshot = EXCLUDED.snapshot, last_updated_at = EXCLUDED.last_updated_at
+"""
+
+# concurrent refreshes of an event are serialized on its row, locked in id order, the
+# insert then reads the changes committed by the transaction waited for. The lock does
+# not block the foreign key checks of the inserted attendees, tags and officials
+REFRESH_EVENT_DETAILS_SQL = f"""
+CREATE OR REPLACE FUNCTION refresh_event_details(event_ids uuid[]) RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM 1 FROM events WHERE id = ANY(event_ids) ORDER BY id FOR NO KEY UPDATE;
+{textwrap.indent(UPSERT_EVENT_DETAILS_SQL.strip(), "    ")};
+END
+$$
+"""
+
+PREVIOUS_REFRESH_EVENT_DETAILS_SQL = f"""
+CREATE OR REPLACE FUNCTION refresh_event_details(event_ids uuid[]) RETURNS void
+LANGUAGE sql AS $$
+{UPSERT_EVENT_DETAILS_SQL.strip()}
+$$
+"""
+
+
+def upgrade() -> None:
+    op.execute(REFRESH_EVENT_DETAILS_SQL)
+
+
+def downgrade() -> None:
+    op.execute(PREVIOUS_REFRESH_EVENT_DETAILS_SQL)
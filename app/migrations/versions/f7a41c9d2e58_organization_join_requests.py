@@ -0,0 +1,66 @@
+"""Organization join requests
+
+Revision ID: f7a41c9d2e58
+Revises: e3d8a2c4f6b1
+Create Date: 2026-10-19 20:05:17.642810
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "f7a41c9d2e58"
+down_revision: str | None = "e3d8a2c4f6b1"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "organization_join_requests",
+        sa.Column("id", sa.Uuid(), nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("last_updated_at", sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column("organization_id", sa.Uuid(), nullable=False),
+        sa.Column(
+            "status",
+            # created with the organization_invites table
+            postgresql.ENUM(name="organizationinvitestatus", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("user_id", sa.Uuid(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["organization_id"], ["organizations.id"], ondelete="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_organization_join_requests_organization_id_status_created_at",
+        "organization_join_requests",
+        ["organization_id", "status", "created_at", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "uq_organization_join_requests_pending",
+        "organization_join_requests",
+        ["organization_id", "user_id"],
+        unique=True,
+        postgresql_where=sa.text("status = 'PENDING'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "uq_organization_join_requests_pending",
+        table_name="organization_join_requests",
+    )
+    op.drop_index(
+        "ix_organization_join_requests_organization_id_status_created_at",
+        table_name="organization_join_requests",
+    )
+    op.drop_table("organization_join_requests")
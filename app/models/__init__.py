@@ -1,7 +1,9 @@
 # ruff: noqa: F401
 from .attendees import Attendee
-from .events import Event, EventOfficial, EventTag
-from .organizations import Organization
+from .events import Event, EventDetail, EventOfficial, EventTag
+from .organizations import Organization, OrganizationInvite, OrganizationJoinRequest
 from .otp import OTPRecord
+from .rate_limits import RateLimitWindow
+from .revoked_tokens import RevokedToken
 from .tags import Tag
 from .users import User
@@ -1,17 +1,19 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, ClassVar
 from uuid import UUID
 
 from pydantic import EmailStr
+from sqlalchemy import UniqueConstraint
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlmodel import Field, Relationship
 
-from app.extras.models import BaseDBModel
+from app.extras.models import TimeOrderedDBModel
+from app.models.managers.attendees import AttendeeModelManager
 
 if TYPE_CHECKING:
     from .events import Event
 
 
-class Attendee(BaseDBModel, table=True):
+class Attendee(TimeOrderedDBModel, table=True):
     """Attendee is a representation of users that RSVP an `Event` (tech event) created by an
     `Organization` (tech communities). Even though Attendees are real word users of the platform,
     they're not `User` on Eventtrakka which is limited to admin and `Organization` members for
@@ -21,6 +23,9 @@ class Attendee(BaseDBModel, table=True):
     """
 
     __tablename__ = "attendees"
+    __table_args__ = (
+        UniqueConstraint("event_id", "email", name="uq_attendees_event_id_email"),
+    )
 
     event_id: UUID = Field(
         foreign_key="events.id",
@@ -36,3 +41,5 @@ class Attendee(BaseDBModel, table=True):
     questionnaire_submission: dict | None = Field(
         sa_type=JSONB(none_as_null=True),
     )
+
+    objects: ClassVar[AttendeeModelManager["Attendee"]] = AttendeeModelManager()
@@ -3,10 +3,12 @@ from typing import TYPE_CHECKING, ClassVar, Optional
 from uuid import UUID, uuid4
 
 from pydantic import AnyUrl, AwareDatetime, EmailStr
+from sqlalchemy import Index, column, func
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlmodel import TIMESTAMP, Column, Field, Relationship, SQLModel
 from sqlmodel import Enum as SAEnum
 
-from app.extras.models import BaseDBModel, MutableSABaseModel
+from app.extras.models import BaseDBModel, MutableSABaseModel, TimeOrderedDBModel
 
 from .managers.events import EventModelManager
 
@@ -70,7 +72,7 @@ class EventPublicationStatus(str, Enum):
     can open it to the public by updating the status of the event to `EventPublicationStatus.OPEN` and when the
     event date expires the event is automatically closed by setting the status to `EventPublicationStatus.CLOSE`.
     Only `Events` that never exceeded the `DRAFT` status may be deleted from eventtrakka. opened events are archived
-    instead of deleting them.
+    instead of deleting them, closed events are automatically archived `EVENT_ARCHIVE_AFTER_DAYS` after they end.
     """
 
     DRAFT = "DRAFT"
@@ -91,11 +93,28 @@ class EventTag(SQLModel, table=True):
     __tablename__ = "eventtags"
 
     tag_id: UUID = Field(foreign_key="tags.id", primary_key=True)
-    event_id: UUID = Field(foreign_key="events.id", primary_key=True)
+    event_id: UUID = Field(
+        foreign_key="events.id", primary_key=True, ondelete="CASCADE"
+    )
 
 
-class Event(BaseDBModel, table=True):
+class Event(TimeOrderedDBModel, table=True):
     __tablename__ = "events"
+    __table_args__ = (
+        # serves the scheduled status transitions, see `EventModelManager.close_ended_events`
+        Index(
+            "ix_events_status_ends_at",
+            "status",
+            func.coalesce(column("ends_at"), column("starts_at")),
+        ),
+        # serve the refresh of the calendar feeds, see `EventModelManager.calendar_feed`
+        Index("ix_events_last_updated_at", "last_updated_at"),
+        Index(
+            "ix_events_organization_id_last_updated_at",
+            "organization_id",
+            "last_updated_at",
+        ),
+    )
 
     source: EventSource = Field(
         EventSource.EVENTTRAKKA, description="", sa_column=Field(SAEnum(EventSource))
@@ -198,3 +217,26 @@ class EventOfficial(BaseDBModel, table=True):
     contact_information: ContactInformation | None = Field(
         sa_column=Column(ContactInformationSAType)
     )
+
+
+class EventDetail(SQLModel, table=True):
+    """Denormalized read model of an `Event` for its detail page: the event with its
+    organization, tags and officials in a single JSONB `snapshot`, and its attendee
+    counts.
+
+    The rows are maintained by the triggers of the `event_details` migration, the
+    snapshot is rebuilt by `refresh_event_details` whenever the event, its tags or
+    officials, or a tag value or the organization it shows change. The counts are
+    incremented and decremented by the attendees writes instead, an RSVP does not
+    rebuild the snapshot.
+    """
+
+    __tablename__ = "event_details"
+
+    event_id: UUID = Field(
+        foreign_key="events.id", primary_key=True, ondelete="CASCADE"
+    )
+    snapshot: dict = Field(sa_type=JSONB)
+    attendee_count: int = 0
+    attended_count: int = 0
+    last_updated_at: AwareDatetime = Field(sa_type=TIMESTAMP(timezone=True))
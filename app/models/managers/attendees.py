@@ -0,0 +1,83 @@
+from typing import TYPE_CHECKING
+
+from sqlalchemy import literal
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.core.db import get_db_session
+from app.core.utils import aware_datetime_now
+from app.models.managers.base_manager import BaseModelManager
+
+if TYPE_CHECKING:
+    from app.models.attendees import Attendee
+    from app.models.schemas.attendees import CreateAttendee
+
+
+class AttendeeModelManager[T: Attendee](BaseModelManager):
+    async def rsvp(self, data: "CreateAttendee", session: AsyncSession | None = None):
+        """Registers the attendee for the event with a single `INSERT ... SELECT`, only
+        open events accept RSVPs.
+
+        Raises:
+            Event.DoesNotExist: If the event does not exist or is not open
+            Attendee.AlreadyExist: If the email already RSVP the event
+        """
+        from app.models import Event
+        from app.models.events import EventPublicationStatus
+
+        now = aware_datetime_now()
+        attendee_id = self.model_class.model_fields["id"].default_factory()
+        attendee_columns = self.model_class.__table__.c
+        event = select(
+            literal(attendee_id, attendee_columns.id.type),
+            literal(now, attendee_columns.created_at.type),
+            literal(now, attendee_columns.last_updated_at.type),
+            Event.id,
+            literal(False),
+            literal(data.email.lower(), attendee_columns.email.type),
+            literal(
+                data.questionnaire_submission,
+                attendee_columns.questionnaire_submission.type,
+            ),
+        ).where(Event.id == data.event_id, Event.status == EventPublicationStatus.OPEN)
+        query = (
+            insert(self.model_class)
+            .from_select(
+                [
+                    "id",
+                    "created_at",
+                    "last_updated_at",
+                    "event_id",
+                    "attended_event",
+                    "email",
+                    "questionnaire_submission",
+                ],
+                event,
+            )
+            .on_conflict_do_nothing(index_elements=["event_id", "email"])
+            .returning(self.model_class.id)
+        )
+        async for s in get_db_session():
+            session = s or session
+            attendee_id = (await session.execute(query)).scalar()
+            if attendee_id is None:
+                is_attending = await session.execute(
+                    select(self.model_class.id).where(
+                        self.model_class.event_id == data.event_id,
+                        self.model_class.email == data.email.lower(),
+                    )
+                )
+                if is_attending.first() is None:
+                    raise Event.DoesNotExist("event not found or not open for RSVP")
+                raise self.model_class.AlreadyExist("this email already RSVP the event")
+            await session.commit()
+            return self.model_class(
+                id=attendee_id,
+                created_at=now,
+                last_updated_at=now,
+                event_id=data.event_id,
+                attended_event=False,
+                email=data.email.lower(),
+                questionnaire_submission=data.questionnaire_submission,
+            )
@@ -1,12 +1,21 @@
+import functools
+import inspect
+import time
+from collections.abc import Callable, Sequence
+from contextvars import ContextVar
+from dataclasses import dataclass
 from typing import TYPE_CHECKING
 from uuid import UUID
 
 from fastapi_pagination.ext.sqlmodel import paginate
+from sqlalchemy import event
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.base import ExecutableOption
 from sqlmodel import delete, select
 
-from app.core.db import get_db_session
+from app.core.db import all_engines, get_db_session, get_read_session
+from app.core.metrics import MANAGER_CALL_DURATION_SECONDS, MANAGER_QUERIES_TOTAL
 from app.core.utils import aware_datetime_now
 from app.models.exceptions import AlreadyExist, DoesNotExist
 
@@ -14,7 +23,61 @@ if TYPE_CHECKING:
     from app.extras.models import BaseDBModel
 
 
+@dataclass
+class ManagerCall:
+    queries: int = 0
+
+
+_current_manager_call: ContextVar[ManagerCall | None] = ContextVar(
+    "current_manager_call", default=None
+)
+
+
+def _count_manager_query(*_):
+    call = _current_manager_call.get()
+    if call is not None:
+        call.queries += 1
+
+
+for _engine in all_engines():
+    event.listen(_engine.sync_engine, "before_cursor_execute", _count_manager_query)
+
+
+def instrumented(method: Callable) -> Callable:
+    """Records the duration and the number of SQL statements of each call of a manager
+    method, by model and method. Statements executed by nested manager calls are
+    counted by the nested call only"""
+
+    @functools.wraps(method)
+    async def wrapper(self: "BaseModelManager", *args, **kwargs):
+        call = ManagerCall()
+        context_token = _current_manager_call.set(call)
+        started = time.perf_counter()
+        try:
+            return await method(self, *args, **kwargs)
+        finally:
+            _current_manager_call.reset(context_token)
+            labels = {"model": self.model_class.__name__, "method": method.__name__}
+            MANAGER_CALL_DURATION_SECONDS.observe(
+                time.perf_counter() - started, **labels
+            )
+            MANAGER_QUERIES_TOTAL.inc(call.queries, **labels)
+
+    return wrapper
+
+
 class BaseModelManager[T: BaseDBModel]:
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._instrument_methods()
+
+    @classmethod
+    def _instrument_methods(cls) -> None:
+        """Wraps the public coroutine methods defined by the class with `instrumented`"""
+        for name, attribute in list(vars(cls).items()):
+            if not name.startswith("_") and inspect.iscoroutinefunction(attribute):
+                setattr(cls, name, instrumented(attribute))
+
     async def create(
         self, *, creation_data: dict, session: AsyncSession | None = None
     ) -> T:
@@ -44,28 +107,46 @@ class BaseModelManager[T: BaseDBModel]:
             await session.refresh(model)
             return model
 
-    async def get(self, session: AsyncSession | None, *whereclause) -> T:
-        async for s in get_db_session():
-            session = s or session
-            query = select(self.model_class).where(*whereclause)
+    async def get(
+        self,
+        session: AsyncSession | None,
+        *whereclause,
+        options: Sequence[ExecutableOption] = (),
+    ) -> T:
+        async for s in get_read_session(session):
+            query = select(self.model_class).where(*whereclause).options(*options)
             try:
-                return (await session.execute(query)).scalar_one()
+                return (await s.execute(query)).scalar_one()
             except NoResultFound:
                 raise self.model_class.DoesNotExist(
                     f"object does not exist {whereclause}"
                 )
 
-    async def all(self, *, session: AsyncSession | None = None) -> list[T]:
-        async for s in get_db_session():
-            session = s or session
-            query = select(self.model_class)
-            return await paginate(session, query)
+    async def all(
+        self,
+        *,
+        session: AsyncSession | None = None,
+        options: Sequence[ExecutableOption] = (),
+    ) -> list[T]:
+        async for s in get_read_session(session):
+            query = select(self.model_class).options(*options)
+            return await paginate(s, query)
 
-    async def filter(self, session: AsyncSession | None, *whereclause):
-        async for s in get_db_session():
-            session = s or session
-            query = select(self.model_class).where(*whereclause)
-            return await paginate(session, query)
+    async def filter(
+        self,
+        session: AsyncSession | None,
+        *whereclause,
+        options: Sequence[ExecutableOption] = (),
+    ):
+        """Paginated select of the model objects matching `whereclause`.
+
+        `options` are loader options (e.g. `selectinload(Model.relationship)`) applied
+        to the query, relationships are not lazy loadable with async sessions so any
+        relationship read from the returned objects must be eagerly loaded here.
+        """
+        async for s in get_read_session(session):
+            query = select(self.model_class).where(*whereclause).options(*options)
+            return await paginate(s, query)
 
     async def delete(self, *, id: UUID, session: AsyncSession | None):
         async for s in get_db_session():
@@ -90,3 +171,6 @@ class BaseModelManager[T: BaseDBModel]:
         """
         self.model_class = owner
         self._bind_exceptions_to_model()
+
+
+BaseModelManager._instrument_methods()
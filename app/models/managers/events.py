@@ -1,19 +1,369 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from datetime import datetime, timedelta
 from typing import TYPE_CHECKING
+from uuid import UUID
 
+from sqlalchemy import Uuid, func, insert, literal, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, selectinload
+from sqlalchemy.sql.base import ExecutableOption
+from sqlmodel import select
 
+from app.core.calendar import render_calendar, render_event
+from app.core.config import settings
+from app.core.db import get_db_session, get_read_session
+from app.core.utils import aware_datetime_now
 from app.models.managers.base_manager import BaseModelManager
 
 if TYPE_CHECKING:
-    from app.models import Event
+    from app.models import Event, EventDetail
+    from app.models.events import EventPublicationStatus
     from app.models.schemas.events import CreateEvent
 
 
+class CalendarFeed:
+    """In-process iCalendar feed, kept as the rendered `VEVENT` of each of its events.
+
+    A refresh only fetches and renders the events updated since the last one (its
+    watermark), the calendar is joined again and given a new `etag` only when one
+    of them changed. Feeds are refreshed when invalidated by an event write in this
+    process or when older than `EVENT_FEED_REFRESH_SECONDS` (updates made by other
+    workers). Deleted events are not fetched by an incremental refresh, the ones
+    deleted by other workers or with their organization are dropped by the full
+    refresh made every `EVENT_FEED_FULL_REFRESH_EVERY` refreshes.
+    """
+
+    # events committed after a later one was read, i.e. by a longer transaction, are
+    # only missed if they were updated more than this before the watermark
+    WATERMARK_OVERLAP = timedelta(minutes=5)
+
+    def __init__(self):
+        self.name = ""
+        self.body = b""
+        self.etag = ""
+        self.last_modified: datetime | None = None
+        self.watermark: datetime | None = None
+        self._components: dict[UUID, bytes] = {}
+        self._refreshed_at: float | None = None
+        self._incremental_refreshes = 0
+        self._changed = True
+        self.lock = asyncio.Lock()
+
+    @property
+    def is_stale(self) -> bool:
+        return (
+            self._refreshed_at is None
+            or time.monotonic() - self._refreshed_at
+            > settings.EVENT_FEED_REFRESH_SECONDS
+        )
+
+    @property
+    def updated_after(self) -> datetime | None:
+        """The update time of the events fetched by the next refresh, `None` for all
+        the listed ones"""
+        if (
+            self.watermark is None
+            or self._incremental_refreshes >= settings.EVENT_FEED_FULL_REFRESH_EVERY
+        ):
+            return None
+        return self.watermark - self.WATERMARK_OVERLAP
+
+    def invalidate(self) -> None:
+        self._refreshed_at = None
+
+    def discard(self, event_id: UUID) -> None:
+        if self._components.pop(event_id, None) is not None:
+            self._changed = True
+            self.invalidate()
+
+    def apply(
+        self,
+        name: str,
+        events: list["Event"],
+        is_listed: Callable[["Event"], bool],
+        is_complete: bool = False,
+    ) -> None:
+        """Renders the fetched events, the ones not `is_listed` anymore are removed.
+        When the events are `is_complete`, i.e. all the listed ones, the events missing
+        from them are removed too"""
+        changed = self._changed or name != self.name
+        if is_complete:
+            fetched_ids = {event.id for event in events}
+            for event_id in self._components.keys() - fetched_ids:
+                del self._components[event_id]
+                changed = True
+            self._incremental_refreshes = 0
+        else:
+            self._incremental_refreshes += 1
+        for event in events:
+            if event.last_updated_at and (
+                self.watermark is None or event.last_updated_at > self.watermark
+            ):
+                self.watermark = event.last_updated_at
+            if not is_listed(event):
+                changed = self._components.pop(event.id, None) is not None or changed
+                continue
+            component = render_event(event)
+            if self._components.get(event.id) != component:
+                self._components[event.id] = component
+                changed = True
+        if changed:
+            self.name = name
+            self.body = render_calendar(name, list(self._components.values()))
+            self.etag = f'"{hashlib.blake2b(self.body, digest_size=16).hexdigest()}"'
+            self.last_modified = aware_datetime_now().replace(microsecond=0)
+            self._changed = False
+        self._refreshed_at = time.monotonic()
+
+
 class EventModelManager[T: Event](BaseModelManager):
+    # keyed by organization id, `None` is the feed of all the public events
+    calendar_feeds: OrderedDict[UUID | None, CalendarFeed] = OrderedDict()
+
+    @property
+    def listing_load_options(self) -> list[ExecutableOption]:
+        """Loader options for paginated event listings.
+
+        The tags of every event on the page are fetched with one extra
+        `SELECT ... WHERE eventtags.event_id IN (...)` instead of one query per event.
+        """
+        return [selectinload(self.model_class.tags)]
+
+    async def get_detail(
+        self, id: UUID, session: AsyncSession | None = None
+    ) -> "EventDetail":
+        """The denormalized detail of the event, a single primary key lookup of its
+        `EventDetail` however many tags, officials and attendees it has.
+
+        Raises:
+            Event.DoesNotExist: If the event does not exist or is a draft
+        """
+        from app.models import EventDetail
+        from app.models.events import EventPublicationStatus
+
+        async for s in get_read_session(session):
+            query = select(EventDetail).where(
+                EventDetail.event_id == id,
+                EventDetail.snapshot["status"].astext
+                != EventPublicationStatus.DRAFT.value,
+            )
+            detail = (await s.execute(query)).scalar_one_or_none()
+        if detail is None:
+            raise self.model_class.DoesNotExist(f"event {id} does not exist")
+        return detail
+
+    async def calendar_feed(
+        self, organization_id: UUID | None = None, session: AsyncSession | None = None
+    ) -> CalendarFeed:
+        """The iCalendar feed of the public events of the organization, or of all the
+        public events, refreshed when stale.
+
+        At most `EVENT_FEED_CACHE_SIZE` feeds are kept, the least recently used one is
+        dropped first.
+
+        Raises:
+            Organization.DoesNotExist: If the organization does not exist
+        """
+        feed = self.calendar_feeds.get(organization_id)
+        if feed is None:
+            feed = self.calendar_feeds[organization_id] = CalendarFeed()
+            while len(self.calendar_feeds) > settings.EVENT_FEED_CACHE_SIZE:
+                self.calendar_feeds.popitem(last=False)
+        self.calendar_feeds.move_to_end(organization_id)
+        if feed.is_stale:
+            async with feed.lock:
+                if feed.is_stale:
+                    try:
+                        await self._refresh_calendar_feed(
+                            feed, organization_id, session
+                        )
+                    except Exception:
+                        self.calendar_feeds.pop(organization_id, None)
+                        raise
+        return feed
+
+    def invalidate_calendar_feeds(self) -> None:
+        for feed in self.calendar_feeds.values():
+            feed.invalidate()
+
+    async def _refresh_calendar_feed(
+        self,
+        feed: CalendarFeed,
+        organization_id: UUID | None,
+        session: AsyncSession | None,
+    ) -> None:
+        """Fetches the events updated since the last refresh of the feed, all of its
+        events on the first one and on the periodic full refreshes"""
+        from app.models import Organization
+        from app.models.events import EventPublicationStatus
+
+        listed_statuses = (EventPublicationStatus.OPEN, EventPublicationStatus.CLOSE)
+        query = select(self.model_class).options(
+            load_only(
+                self.model_class.status,
+                self.model_class.title,
+                self.model_class.description,
+                self.model_class.starts_at,
+                self.model_class.ends_at,
+                self.model_class.location,
+                self.model_class.link,
+                self.model_class.created_at,
+                self.model_class.last_updated_at,
+            )
+        )
+        if organization_id is not None:
+            query = query.where(self.model_class.organization_id == organization_id)
+        updated_after = feed.updated_after
+        if updated_after is None:
+            query = query.where(self.model_class.status.in_(listed_statuses))
+        else:
+            query = query.where(self.model_class.last_updated_at >= updated_after)
+        async for s in get_read_session(session):
+            if organization_id is None:
+                name = f"{settings.PROJECT_NAME} public events"
+            else:
+                name = (
+                    await s.execute(
+                        select(Organization.name).where(
+                            Organization.id == organization_id
+                        )
+                    )
+                ).scalar_one_or_none()
+                if name is None:
+                    raise Organization.DoesNotExist(
+                        f"organization {organization_id} does not exist"
+                    )
+            events = list((await s.execute(query)).scalars())
+        feed.apply(
+            name,
+            events,
+            lambda event: event.status in listed_statuses,
+            is_complete=updated_after is None,
+        )
+
+    async def update(
+        self, *, id: UUID, update_data: dict, session: AsyncSession | None = None
+    ) -> T:
+        event = await super().update(id=id, update_data=update_data, session=session)
+        self.invalidate_calendar_feeds()
+        return event
+
+    async def delete(self, *, id: UUID, session: AsyncSession | None):
+        await super().delete(id=id, session=session)
+        # a deleted event is not fetched by the refresh of the feeds
+        for feed in self.calendar_feeds.values():
+            feed.discard(id)
+
     async def create_event(
         self, data: "CreateEvent", session: AsyncSession | None = None
     ):
+        """Creates the event and links its tags in a single transaction.
+
+        Tags passed by value are created when missing, creating an event costs the
+        same number of round trips however many tags it has.
+        """
+        from app.models import Tag
+
         creation_data = data.model_dump()
-        if data.tags:
-            tags = creation_data.pop("tags")
-        return await self.create(creation_data=creation_data, session=session)
+        tag_ids = set(creation_data.pop("tags", None) or [])
+        tag_values = creation_data.pop("tag_values", None) or []
+        async for s in get_db_session():
+            session = s or session
+            creation_data["last_updated_at"] = aware_datetime_now()
+            event = self.model_class.model_validate(creation_data)
+            session.add(event)
+            await session.flush()
+            if tag_values:
+                tag_ids.update(await Tag.objects.upsert_values(session, tag_values))
+            if tag_ids:
+                await self._link_tags(session, event.id, tag_ids)
+            await session.commit()
+            if tag_ids:
+                Tag.objects.invalidate_prefix_index()
+            self.invalidate_calendar_feeds()
+            await session.refresh(event)
+            return event
+
+    async def _link_tags(
+        self, session: AsyncSession, event_id: UUID, tag_ids: set[UUID]
+    ) -> None:
+        """Links the tags to the event with a single `INSERT INTO eventtags ... SELECT`,
+        the triggers of `eventtags` bump the tags `usage_count`.
+
+        Raises:
+            Tag.DoesNotExist: If any of the tag ids does not exist
+        """
+        from app.models import EventTag, Tag
+
+        query = (
+            insert(EventTag)
+            .from_select(
+                ["event_id", "tag_id"],
+                select(literal(event_id, Uuid), Tag.id).where(Tag.id.in_(tag_ids)),
+            )
+            .returning(EventTag.tag_id)
+        )
+        linked_tag_ids = (await session.execute(query)).scalars().all()
+        if len(linked_tag_ids) != len(tag_ids):
+            raise Tag.DoesNotExist("one or more of the provided tags does not exist")
+
+    async def close_ended_events(self) -> int:
+        """Closes the open events whose end date, or start date for events without
+        one, has passed. Returns the number of closed events"""
+        from app.models.events import EventPublicationStatus
+
+        return await self._transition_status(
+            EventPublicationStatus.OPEN,
+            EventPublicationStatus.CLOSE,
+            func.coalesce(self.model_class.ends_at, self.model_class.starts_at)
+            < func.now(),
+        )
+
+    async def archive_closed_events(self) -> int:
+        """Archives the closed events that ended more than `EVENT_ARCHIVE_AFTER_DAYS`
+        ago. Returns the number of archived events"""
+        from app.models.events import EventPublicationStatus
+
+        return await self._transition_status(
+            EventPublicationStatus.CLOSE,
+            EventPublicationStatus.ARCHIVE,
+            func.coalesce(self.model_class.ends_at, self.model_class.starts_at)
+            < func.now() - timedelta(days=settings.EVENT_ARCHIVE_AFTER_DAYS),
+        )
+
+    async def _transition_status(
+        self,
+        from_status: "EventPublicationStatus",
+        to_status: "EventPublicationStatus",
+        *whereclause,
+    ) -> int:
+        """Moves the matching events from one status to another with set-based updates
+        of at most `SCHEDULER_BATCH_SIZE` rows, each batch is committed on its own so
+        row locks are held briefly. Rows locked by other transactions are skipped and
+        picked up by a later run"""
+        batch_size = settings.SCHEDULER_BATCH_SIZE
+        transitioned = 0
+        while True:
+            async for session in get_db_session():
+                batch = (
+                    select(self.model_class.id)
+                    .where(self.model_class.status == from_status, *whereclause)
+                    .limit(batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+                query = (
+                    update(self.model_class)
+                    .where(self.model_class.id.in_(batch))
+                    .values(status=to_status, last_updated_at=func.now())
+                )
+                result = await session.execute(query)
+                await session.commit()
+            transitioned += result.rowcount
+            if result.rowcount:
+                self.invalidate_calendar_feeds()
+            if result.rowcount < batch_size:
+                return transitioned
@@ -1,17 +1,49 @@
+from collections.abc import Sequence
+from datetime import datetime, timedelta
 from typing import TYPE_CHECKING, Optional
 from uuid import UUID
 
+from fastapi.encoders import jsonable_encoder
 from fastapi_pagination.ext.sqlmodel import paginate
 from pydantic import ValidationError
-from sqlalchemy import func
+from sqlalchemy import (
+    Uuid,
+    any_,
+    bindparam,
+    case,
+    cast,
+    exists,
+    func,
+    literal,
+    not_,
+    tuple_,
+    type_coerce,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, aggregate_order_by, insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
 from sqlmodel import column, select, text
 
-from app.core.db import get_db_session
+from app.core.config import settings
+from app.core.db import get_db_session, get_read_session
+from app.core.utils import aware_datetime_now
 from app.models.managers.base_manager import BaseModelManager
 
 if TYPE_CHECKING:
-    from app.models import Organization, User
+    from sqlalchemy import Row
+
+    from app.models import (
+        Organization,
+        OrganizationInvite,
+        OrganizationJoinRequest,
+        User,
+    )
+    from app.models.organizations import (
+        OrganizationInviteStatus,
+        OrganizationMemberPermission,
+    )
+    from app.models.schemas.organizations import UpdateOrganizationMembers
 
 
 class OrganizationModelManager[T: Organization](BaseModelManager):
@@ -23,6 +55,9 @@ class OrganizationModelManager[T: Organization](BaseModelManager):
         about: str | None = None,
         session: AsyncSession | None = None,
     ) -> T:
+        """Creates the organization with the owner as its first member, the owner's
+        `permissions_version` is bumped in the same transaction"""
+        from app.models import User
         from app.models.organizations import (
             OrganizationMember,
             OrganizationMemberPermission,
@@ -45,7 +80,17 @@ class OrganizationModelManager[T: Organization](BaseModelManager):
         if owner:
             creation_data["owner_id"] = owner.id
 
-        return await super().create(creation_data=creation_data, session=session)
+        async for s in get_db_session():
+            session = s or session
+            creation_data["last_updated_at"] = aware_datetime_now()
+            organization = self.model_class.model_validate(creation_data)
+            session.add(organization)
+            await User.objects.bump_permissions_version(
+                session, creation_data["owner_id"]
+            )
+            await session.commit()
+            await session.refresh(organization)
+            return organization
 
     async def get_organizations_as_member(
         self,
@@ -69,3 +114,617 @@ class OrganizationModelManager[T: Organization](BaseModelManager):
                 )
             )
             return await paginate(session, query)
+
+    async def get_member_permissions(
+        self,
+        user_id: UUID,
+        *whereclause,
+        limit: int | None = None,
+        session: AsyncSession | None = None,
+    ) -> dict[UUID, list["OrganizationMemberPermission"]]:
+        """Returns the permissions of the user in each organization they are a member of,
+        only the member entries are read, not the whole organizations"""
+        from app.models.organizations import OrganizationMemberPermission
+
+        async for s in get_db_session():
+            session = s or session
+            query = (
+                select(
+                    self.model_class.id,
+                    func.jsonb_extract_path(column("members_jsonb"), "permissions"),
+                )
+                .select_from(self.model_class)
+                .join(
+                    func.jsonb_array_elements(self.model_class.members).alias(
+                        "members_jsonb"
+                    ),
+                    text("true"),  # LATERAL join
+                )
+                .where(
+                    func.jsonb_extract_path_text(column("members_jsonb"), "id")
+                    == str(user_id),
+                    *whereclause,
+                )
+                .limit(limit)
+            )
+            rows = (await session.execute(query)).all()
+            return {
+                organization_id: [
+                    OrganizationMemberPermission(permission)
+                    for permission in permissions or []
+                ]
+                for organization_id, permissions in rows
+            }
+
+    async def update_members(
+        self,
+        organization_id: UUID,
+        data: "UpdateOrganizationMembers",
+        session: AsyncSession | None = None,
+    ) -> T:
+        """Adds, updates and removes members of the organization in a single `UPDATE`
+        editing the `members` JSONB array server side: the removed entries are filtered
+        out, the updated ones merged with their changes and the added ones appended, so
+        concurrent edits of different members are all kept. The affected users'
+        `permissions_version` is bumped in the same transaction.
+
+        Raises:
+            User.DoesNotExist: If an added member is not a user
+            Organization.DoesNotExist: If the organization does not exist
+            ValueError: If the owner is updated or removed
+        """
+        from app.models import User
+
+        async for s in get_db_session():
+            session = s or session
+            added_ids = [member.id for member in data.add]
+            existing_users = await session.execute(
+                select(func.count(User.id)).where(User.id.in_(added_ids))
+            )
+            if existing_users.scalar_one() != len(added_ids):
+                raise User.DoesNotExist("every added member must be a user")
+            organization = await self.edit_members(session, organization_id, data)
+            if organization is None:
+                await self.get(session, self.model_class.id == organization_id)
+                raise ValueError(
+                    "the owner can't be updated or removed, transfer the ownership first"
+                )
+            await User.objects.bump_permissions_version(session, *data.member_ids)
+            await session.commit()
+            return organization
+
+    async def edit_members(
+        self,
+        session: AsyncSession,
+        organization_id: UUID,
+        data: "UpdateOrganizationMembers",
+    ) -> T | None:
+        """Runs the `UPDATE` of `update_members` in the transaction of `session`, to be
+        called in the transaction changing the memberships. Returns `None` when the
+        organization does not exist or the owner is updated or removed"""
+        query = (
+            update(self.model_class)
+            .where(
+                self.model_class.id == organization_id,
+                self.model_class.owner_id.not_in(
+                    [member.id for member in data.update] + data.remove
+                ),
+            )
+            .values(
+                members=self._edited_members(data),
+                last_updated_at=aware_datetime_now(),
+            )
+            .returning(self.model_class)
+        )
+        return (await session.scalars(query)).one_or_none()
+
+    def _member_elements(self):
+        """The `members` JSONB array of the organization being updated and the set of
+        its elements, with their `position` in the array"""
+        members = func.coalesce(
+            type_coerce(self.model_class.members, JSONB), literal([], JSONB)
+        )
+        elements = (
+            func.jsonb_array_elements(members)
+            .table_valued(column("value", JSONB), with_ordinality="position")
+            .render_derived("current")
+        )
+        return members, elements
+
+    def _edited_members(self, data: "UpdateOrganizationMembers"):
+        members, current = self._member_elements()
+        changes = (
+            func.jsonb_array_elements(
+                bindparam(
+                    "updated_members",
+                    jsonable_encoder(data.update, exclude_none=True),
+                    JSONB,
+                )
+            )
+            .table_valued(column("value", JSONB))
+            .render_derived("changes")
+        )
+        added = (
+            func.jsonb_array_elements(
+                bindparam("added_members", jsonable_encoder(data.add), JSONB)
+            )
+            .table_valued(column("value", JSONB))
+            .render_derived("added")
+        )
+        kept_members = (
+            select(
+                func.coalesce(
+                    func.jsonb_agg(
+                        aggregate_order_by(
+                            case(
+                                (changes.c.value.is_(None), current.c.value),
+                                else_=current.c.value.concat(changes.c.value),
+                            ),
+                            current.c.position,
+                        )
+                    ),
+                    literal([], JSONB),
+                )
+            )
+            .select_from(
+                current.outerjoin(
+                    changes, changes.c.value["id"] == current.c.value["id"]
+                )
+            )
+            .where(current.c.value["id"].astext.not_in(map(str, data.remove)))
+            .scalar_subquery()
+        )
+        # members added again are skipped
+        added_members = (
+            select(func.coalesce(func.jsonb_agg(added.c.value), literal([], JSONB)))
+            .where(
+                not_(
+                    members.contains(
+                        func.jsonb_build_array(
+                            func.jsonb_build_object("id", added.c.value["id"])
+                        )
+                    )
+                )
+            )
+            .scalar_subquery()
+        )
+        return kept_members.concat(added_members)
+
+    async def transfer_ownership(
+        self,
+        organization_id: UUID,
+        owner_id: UUID,
+        new_owner_id: UUID,
+        session: AsyncSession | None = None,
+    ) -> T:
+        """Makes the member `new_owner_id` the owner of the organization with every
+        permission in a single `UPDATE`, the previous owner stays a member with their
+        permissions. Both users' `permissions_version` is bumped in the same
+        transaction.
+
+        Raises:
+            Organization.DoesNotExist: If the organization does not exist
+            PermissionError: If `owner_id` is not the owner of the organization
+            ValueError: If `new_owner_id` is not a member of the organization
+        """
+        from app.models import User
+        from app.models.organizations import OrganizationMemberPermission
+
+        members, current = self._member_elements()
+        member_id = current.c.value["id"].astext
+        owner = {
+            "role": "Owner",
+            "permissions": [
+                permission.value for permission in OrganizationMemberPermission
+            ],
+        }
+        transferred_members = (
+            select(
+                func.jsonb_agg(
+                    aggregate_order_by(
+                        case(
+                            (
+                                member_id == str(new_owner_id),
+                                current.c.value.concat(literal(owner, JSONB)),
+                            ),
+                            (
+                                member_id == str(owner_id),
+                                current.c.value.concat(
+                                    literal({"role": "Member"}, JSONB)
+                                ),
+                            ),
+                            else_=current.c.value,
+                        ),
+                        current.c.position,
+                    )
+                )
+            )
+            .select_from(current)
+            .scalar_subquery()
+        )
+        query = (
+            update(self.model_class)
+            .where(
+                self.model_class.id == organization_id,
+                self.model_class.owner_id == owner_id,
+                members.contains(literal([{"id": str(new_owner_id)}], JSONB)),
+            )
+            .values(
+                owner_id=new_owner_id,
+                members=transferred_members,
+                last_updated_at=aware_datetime_now(),
+            )
+            .returning(self.model_class)
+        )
+        async for s in get_db_session():
+            session = s or session
+            organization = (await session.scalars(query)).one_or_none()
+            if organization is None:
+                organization = await self.get(
+                    session, self.model_class.id == organization_id
+                )
+                if organization.owner_id != owner_id:
+                    raise PermissionError(
+                        "only the owner can transfer the ownership of the organization"
+                    )
+                raise ValueError("the new owner must be a member of the organization")
+            await User.objects.bump_permissions_version(session, owner_id, new_owner_id)
+            await session.commit()
+            return organization
+
+
+class OrganizationInviteModelManager[T: OrganizationInvite](BaseModelManager):
+    async def invite(
+        self,
+        organization_id: UUID,
+        emails: list[str],
+        permissions: list["OrganizationMemberPermission"],
+        invited_by_id: UUID | None = None,
+        session: AsyncSession | None = None,
+    ) -> list[T]:
+        """Invites the emails to the organization with a single `INSERT ... SELECT ...
+        ON CONFLICT`: the emails of current members are skipped and an email invited
+        before gets its invite renewed (pending again, with the new permissions and
+        expiry) keeping its id. Returns the created and renewed invites.
+
+        Raises:
+            Organization.DoesNotExist: If the organization does not exist
+        """
+        from app.models import Organization, User
+        from app.models.organizations import OrganizationInviteStatus
+
+        now = aware_datetime_now()
+        expires_at = now + timedelta(
+            minutes=settings.ORGANIZATION_INVITE_EXPIRE_MINUTES
+        )
+        columns = self.model_class.__table__.c
+        new_id = self.model_class.model_fields["id"].default_factory
+        invited = (
+            func.unnest(
+                bindparam("ids", [new_id() for _ in emails], ARRAY(Uuid)),
+                bindparam("emails", emails, ARRAY(columns.email.type)),
+            )
+            .table_valued("id", "email")
+            .render_derived("invited")
+        )
+        # the emails of the users are stored as entered at signup, the invited ones are
+        # lowercased
+        is_member = exists().where(
+            func.lower(User.email) == invited.c.email,
+            type_coerce(Organization.members, JSONB).contains(
+                func.jsonb_build_array(func.jsonb_build_object("id", User.id))
+            ),
+        )
+        invites = (
+            select(
+                invited.c.id,
+                literal(now, columns.created_at.type),
+                literal(now, columns.last_updated_at.type),
+                Organization.id,
+                literal(OrganizationInviteStatus.PENDING, columns.status.type),
+                invited.c.email,
+                literal([permission.value for permission in permissions], JSONB),
+                literal(invited_by_id, columns.invited_by_id.type),
+                literal(expires_at, columns.expires_at.type),
+            )
+            .select_from(invited)
+            .join(Organization, Organization.id == organization_id)
+            .where(not_(is_member))
+        )
+        query = insert(self.model_class).from_select(
+            [
+                "id",
+                "created_at",
+                "last_updated_at",
+                "organization_id",
+                "status",
+                "email",
+                "permissions",
+                "invited_by_id",
+                "expires_at",
+            ],
+            invites,
+        )
+        query = query.on_conflict_do_update(
+            constraint="uq_organization_invites_organization_id_email",
+            set_={
+                column: query.excluded[column]
+                for column in [
+                    "last_updated_at",
+                    "status",
+                    "permissions",
+                    "invited_by_id",
+                    "expires_at",
+                ]
+            },
+        ).returning(
+            self.model_class.id, self.model_class.created_at, self.model_class.email
+        )
+        async for s in get_db_session():
+            session = s or session
+            rows = (await session.execute(query)).all()
+            if not rows:
+                # nothing is inserted for a missing organization
+                await Organization.objects.get(
+                    session,
+                    Organization.id == organization_id,
+                    options=[load_only(Organization.id)],
+                )
+            await session.commit()
+        return [
+            self.model_class(
+                id=invite_id,
+                created_at=created_at,
+                last_updated_at=now,
+                organization_id=organization_id,
+                status=OrganizationInviteStatus.PENDING,
+                email=email,
+                permissions=permissions,
+                invited_by_id=invited_by_id,
+                expires_at=expires_at,
+            )
+            for invite_id, created_at, email in rows
+        ]
+
+    async def respond(
+        self,
+        invite_id: UUID,
+        user: "User",
+        accept: bool,
+        session: AsyncSession | None = None,
+    ) -> T:
+        """Accepts or declines the pending invite sent to the email of the user,
+        accepting adds the user to the members of the organization with the permissions
+        of the invite in the same transaction.
+
+        Raises:
+            OrganizationInvite.DoesNotExist: If the user has no such pending invite or
+                it has expired
+        """
+        from app.models import Organization, User
+        from app.models.organizations import OrganizationInviteStatus
+        from app.models.schemas.organizations import (
+            AddOrganizationMember,
+            UpdateOrganizationMembers,
+        )
+
+        now = aware_datetime_now()
+        status = (
+            OrganizationInviteStatus.ACCEPTED
+            if accept
+            else OrganizationInviteStatus.DECLINED
+        )
+        query = (
+            update(self.model_class)
+            .where(
+                self.model_class.id == invite_id,
+                self.model_class.email == user.email.lower(),
+                self.model_class.status == OrganizationInviteStatus.PENDING,
+                self.model_class.expires_at > now,
+            )
+            .values(status=status, last_updated_at=now)
+            .returning(self.model_class)
+        )
+        async for s in get_db_session():
+            session = s or session
+            invite = (await session.scalars(query)).one_or_none()
+            if invite is None:
+                raise self.model_class.DoesNotExist(
+                    "invite not found, no longer pending or expired"
+                )
+            if accept:
+                member = AddOrganizationMember(
+                    id=user.id, permissions=invite.permissions
+                )
+                await Organization.objects.edit_members(
+                    session,
+                    invite.organization_id,
+                    UpdateOrganizationMembers(add=[member]),
+                )
+                await User.objects.bump_permissions_version(session, user.id)
+            await session.commit()
+            return invite
+
+
+class OrganizationJoinRequestModelManager[T: OrganizationJoinRequest](BaseModelManager):
+    async def request_to_join(
+        self, organization_id: UUID, user_id: UUID, session: AsyncSession | None = None
+    ) -> T:
+        """Creates a pending request of the user to join the organization with a single
+        `INSERT ... SELECT ... ON CONFLICT DO NOTHING`, nothing is inserted for members.
+
+        Raises:
+            Organization.DoesNotExist: If the organization does not exist
+            OrganizationJoinRequest.AlreadyExist: If the user already has a pending
+                request to join the organization
+            ValueError: If the user is already a member of the organization
+        """
+        from app.models import Organization
+        from app.models.organizations import OrganizationInviteStatus
+
+        now = aware_datetime_now()
+        request_id = self.model_class.model_fields["id"].default_factory()
+        columns = self.model_class.__table__.c
+        organization = select(
+            literal(request_id, columns.id.type),
+            literal(now, columns.created_at.type),
+            literal(now, columns.last_updated_at.type),
+            Organization.id,
+            literal(OrganizationInviteStatus.PENDING, columns.status.type),
+            literal(user_id, columns.user_id.type),
+        ).where(
+            Organization.id == organization_id,
+            not_(
+                type_coerce(Organization.members, JSONB).contains(
+                    literal([{"id": str(user_id)}], JSONB)
+                )
+            ),
+        )
+        query = (
+            insert(self.model_class)
+            .from_select(
+                [
+                    "id",
+                    "created_at",
+                    "last_updated_at",
+                    "organization_id",
+                    "status",
+                    "user_id",
+                ],
+                organization,
+            )
+            .on_conflict_do_nothing(
+                index_elements=["organization_id", "user_id"],
+                index_where=self.model_class.status == OrganizationInviteStatus.PENDING,
+            )
+            .returning(self.model_class.id)
+        )
+        async for s in get_db_session():
+            session = s or session
+            if (await session.execute(query)).scalar() is None:
+                organization = await Organization.objects.get(
+                    session,
+                    Organization.id == organization_id,
+                    options=[load_only(Organization.id, Organization.members)],
+                )
+                if organization.is_member(user_id=user_id):
+                    raise ValueError("you are already a member of the organization")
+                raise self.model_class.AlreadyExist(
+                    "you already requested to join the organization"
+                )
+            await session.commit()
+        return self.model_class(
+            id=request_id,
+            created_at=now,
+            last_updated_at=now,
+            organization_id=organization_id,
+            status=OrganizationInviteStatus.PENDING,
+            user_id=user_id,
+        )
+
+    async def review_queue(
+        self,
+        organization_id: UUID,
+        status: "OrganizationInviteStatus",
+        limit: int,
+        after: tuple[datetime, UUID] | None = None,
+        session: AsyncSession | None = None,
+    ) -> Sequence["Row"]:
+        """Returns the next `limit` requests of the status in the order they were sent,
+        following the request at the `(created_at, id)` position `after`, with their
+        user. Every page is a range scan of the
+        `ix_organization_join_requests_organization_id_status_created_at` index, as cheap
+        on the last page of the queue as on the first.
+        """
+        from app.models import User
+
+        query = (
+            select(
+                self.model_class.id,
+                self.model_class.organization_id,
+                self.model_class.user_id,
+                self.model_class.status,
+                self.model_class.created_at,
+                User.email,
+                User.first_name,
+                User.last_name,
+            )
+            .join(User, User.id == self.model_class.user_id)
+            .where(
+                self.model_class.organization_id == organization_id,
+                self.model_class.status == status,
+            )
+            .order_by(self.model_class.created_at, self.model_class.id)
+            .limit(limit)
+        )
+        if after is not None:
+            query = query.where(
+                tuple_(self.model_class.created_at, self.model_class.id)
+                > tuple_(*after)
+            )
+        async for s in get_read_session(session):
+            return (await s.execute(query)).all()
+
+    async def review(
+        self,
+        organization_id: UUID,
+        approve: list[UUID],
+        decline: list[UUID],
+        session: AsyncSession | None = None,
+    ) -> list[T]:
+        """Approves and declines pending requests to join the organization in a single
+        transaction: one `UPDATE` transitions every request and the approved users are
+        added to the members with one more, their `permissions_version` is bumped.
+        Requests that are not pending are skipped. Returns the reviewed requests.
+        """
+        from app.models import Organization, User
+        from app.models.organizations import OrganizationInviteStatus
+        from app.models.schemas.organizations import (
+            AddOrganizationMember,
+            UpdateOrganizationMembers,
+        )
+
+        status_type = self.model_class.__table__.c.status.type
+        approved_ids = bindparam("approved_ids", approve, ARRAY(Uuid))
+        reviewed_ids = bindparam("reviewed_ids", approve + decline, ARRAY(Uuid))
+        query = (
+            update(self.model_class)
+            .where(
+                self.model_class.organization_id == organization_id,
+                self.model_class.status == OrganizationInviteStatus.PENDING,
+                self.model_class.id == any_(reviewed_ids),
+            )
+            .values(
+                status=case(
+                    (
+                        self.model_class.id == any_(approved_ids),
+                        cast(OrganizationInviteStatus.ACCEPTED, status_type),
+                    ),
+                    else_=cast(OrganizationInviteStatus.DECLINED, status_type),
+                ),
+                last_updated_at=aware_datetime_now(),
+            )
+            .returning(self.model_class)
+        )
+        async for s in get_db_session():
+            session = s or session
+            reviewed = (await session.scalars(query)).all()
+            approved_user_ids = [
+                request.user_id
+                for request in reviewed
+                if request.status == OrganizationInviteStatus.ACCEPTED
+            ]
+            if approved_user_ids:
+                await Organization.objects.edit_members(
+                    session,
+                    organization_id,
+                    UpdateOrganizationMembers(
+                        add=[
+                            AddOrganizationMember(id=user_id)
+                            for user_id in approved_user_ids
+                        ]
+                    ),
+                )
+                await User.objects.bump_permissions_version(session, *approved_user_ids)
+            await session.commit()
+            return reviewed
@@ -1,8 +1,12 @@
 from typing import TYPE_CHECKING
 from uuid import UUID
 
+from sqlalchemy import exists, func, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import delete, select
 
+from app.core.config import settings
+from app.core.db import get_db_session
 from app.models.managers.base_manager import BaseModelManager
 
 if TYPE_CHECKING:
@@ -24,3 +28,80 @@ class OTPRecordManager[T: OTPRecord](BaseModelManager):
         }
 
         return await super().create(creation_data=creation_data, session=session)
+
+    async def is_valid(self, user_id: UUID, purpose: "OTPPurpose", code: str) -> bool:
+        """Whether the OTP exists and has not expired, without consuming it. Lets the
+        callers skip costly work (e.g. hashing a password) for invalid codes, the OTP
+        is still validated again by `consume`"""
+        async for session in get_db_session():
+            query = select(
+                exists().where(
+                    self.model_class.user_id == user_id,
+                    self.model_class.purpose == purpose,
+                    self.model_class.code == code,
+                    self.model_class.expires_at > func.now(),
+                )
+            )
+            return (await session.execute(query)).scalar_one()
+
+    async def consume(
+        self,
+        user_id: UUID,
+        purpose: "OTPPurpose",
+        code: str,
+        user_update_data: dict | None = None,
+    ) -> UUID:
+        """Validates and deletes an unexpired OTP in a single
+        `DELETE ... WHERE ... AND expires_at > now() RETURNING id`, applying
+        `user_update_data` to the OTP's user in the same transaction.
+
+        Concurrent submissions of the same code are race-free, only one of them deletes
+        the row.
+
+        Raises:
+            OTPRecord.DoesNotExist: If the OTP does not exist, was used or has expired
+        """
+        from app.models import User
+
+        async for session in get_db_session():
+            query = (
+                delete(self.model_class)
+                .where(
+                    self.model_class.user_id == user_id,
+                    self.model_class.purpose == purpose,
+                    self.model_class.code == code,
+                    self.model_class.expires_at > func.now(),
+                )
+                .returning(self.model_class.id)
+            )
+            otp_id = (await session.execute(query)).scalar_one_or_none()
+            if otp_id is None:
+                raise self.model_class.DoesNotExist("invalid or expired otp")
+            if user_update_data:
+                await session.execute(
+                    update(User)
+                    .where(User.id == user_id)
+                    .values(**user_update_data, last_updated_at=func.now())
+                )
+            await session.commit()
+            return otp_id
+
+    async def delete_expired(self) -> int:
+        """Deletes expired OTPs in batches of `SCHEDULER_BATCH_SIZE` rows, each batch is
+        committed on its own. Returns the number of deleted OTPs"""
+        batch_size = settings.SCHEDULER_BATCH_SIZE
+        deleted = 0
+        while True:
+            async for session in get_db_session():
+                batch = (
+                    select(self.model_class.id)
+                    .where(self.model_class.expires_at < func.now())
+                    .limit(batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+                query = delete(self.model_class).where(self.model_class.id.in_(batch))
+                result = await session.execute(query)
+                await session.commit()
+            deleted += result.rowcount
+            if result.rowcount < batch_size:
+                return deleted
@@ -0,0 +1,60 @@
+import time
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import delete, select
+
+from app.core.db import get_db_session
+from app.models.managers.base_manager import BaseModelManager
+
+if TYPE_CHECKING:
+    from app.models.rate_limits import RateLimitWindow
+
+
+class RateLimitWindowManager[T: RateLimitWindow](BaseModelManager):
+    async def hit(self, key: str, window_seconds: int) -> tuple[int, int, float]:
+        """Records a hit for `key` in the current window.
+
+        The upsert of the current window and the read of the previous window are a
+        single statement. Returns the hits of the current window, the hits of the
+        previous window and the elapsed fraction of the current window.
+        """
+        window, elapsed = divmod(time.time(), window_seconds)
+        window = int(window)
+        current_hits = (
+            insert(self.model_class)
+            .values(
+                key=key,
+                window=window,
+                hits=1,
+                expires_at=datetime.fromtimestamp((window + 2) * window_seconds, UTC),
+            )
+            .on_conflict_do_update(
+                index_elements=["key", "window"],
+                set_={"hits": self.model_class.hits + 1},
+            )
+            .returning(self.model_class.hits)
+            .cte("current_hits")
+        )
+        previous_hits = (
+            select(self.model_class.hits)
+            .where(self.model_class.key == key, self.model_class.window == window - 1)
+            .scalar_subquery()
+        )
+        query = select(current_hits.c.hits, func.coalesce(previous_hits, 0))
+        async for session in get_db_session():
+            current, previous = (await session.execute(query)).one()
+            await session.commit()
+        return current, previous, elapsed / window_seconds
+
+    async def delete_expired(self) -> int:
+        """Deletes the windows that can no longer affect a limit"""
+        async for session in get_db_session():
+            query = delete(self.model_class).where(
+                self.model_class.expires_at < func.now()
+            )
+            result = await session.execute(query)
+            await session.commit()
+        return result.rowcount
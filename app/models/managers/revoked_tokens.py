@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import time
+from collections.abc import Sequence
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import delete, select
+
+from app.core.bloom_filter import BloomFilter
+from app.core.config import settings
+from app.core.db import get_db_session
+from app.models.managers.base_manager import BaseModelManager
+
+if TYPE_CHECKING:
+    from app.core.security import TokenClaims
+    from app.models.revoked_tokens import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+
+class RevokedTokenFilter:
+    """In-process bloom filter of the ids of the unexpired revoked tokens.
+
+    A token missing from the filter is not revoked, so the database is only queried
+    for revoked tokens and the rare false positives. Revocations made by this process
+    are added right away, the filter is rebuilt in the background every
+    `REVOKED_TOKENS_FILTER_REFRESH_SECONDS` to pick up the ones made by other workers
+    and swapped in once complete, the old one is used until then.
+    """
+
+    def __init__(self):
+        self._filter: BloomFilter | None = None
+        self._loaded_at: float | None = None
+        # revocations made by this process while a rebuild reads the table
+        self._pending: list[str] | None = None
+
+    @property
+    def is_expired(self) -> bool:
+        # the rebuilds keep failing, the revocations of the other workers are missed
+        return (
+            self._loaded_at is None
+            or time.monotonic() - self._loaded_at
+            > 3 * settings.REVOKED_TOKENS_FILTER_REFRESH_SECONDS
+        )
+
+    def start_load(self) -> None:
+        """Called before reading the revoked tokens for `load`"""
+        self._pending = []
+
+    def load(self, jtis: Sequence[str]) -> None:
+        pending, self._pending = self._pending or [], None
+        # room for the revocations made by this process until the next rebuild
+        capacity = max(2 * (len(jtis) + len(pending)), 1024)
+        revoked_filter = BloomFilter.from_items(
+            jtis, capacity, error_rate=settings.REVOKED_TOKENS_FILTER_ERROR_RATE
+        )
+        for jti in pending:
+            revoked_filter.add(jti)
+        self._filter = revoked_filter
+        self._loaded_at = time.monotonic()
+
+    def add(self, jti: str) -> None:
+        if self._pending is not None:
+            self._pending.append(jti)
+        if self._filter is not None:
+            self._filter.add(jti)
+
+    def might_contain(self, jti: str) -> bool:
+        return self._filter is None or self.is_expired or jti in self._filter
+
+
+class RevokedTokenManager[T: RevokedToken](BaseModelManager):
+    revoked_filter = RevokedTokenFilter()
+    _refresh_task: asyncio.Task | None = None
+
+    async def revoke(
+        self, tokens: Sequence["TokenClaims"], session: AsyncSession | None = None
+    ) -> None:
+        """Revokes the tokens until they expire, tokens without a `jti` claim are ignored"""
+        values = [
+            {
+                "jti": token.jti,
+                "user_id": token.subject.user_id,
+                "expires_at": datetime.fromtimestamp(token.expires_at, UTC),
+            }
+            for token in tokens
+            if token.jti
+        ]
+        if not values:
+            return
+        async for s in get_db_session():
+            session = s or session
+            query = insert(self.model_class).values(values).on_conflict_do_nothing()
+            await session.execute(query)
+            await session.commit()
+        for value in values:
+            self.revoked_filter.add(value["jti"])
+
+    async def is_revoked(self, jti: str, session: AsyncSession | None = None) -> bool:
+        if not self.revoked_filter.might_contain(jti):
+            return False
+        async for s in get_db_session():
+            session = s or session
+            query = select(self.model_class.jti).where(self.model_class.jti == jti)
+            return (await session.execute(query)).first() is not None
+
+    async def delete_expired(self) -> int:
+        """Deletes the revoked tokens that have expired and can no longer be used"""
+        async for session in get_db_session():
+            query = delete(self.model_class).where(
+                self.model_class.expires_at < func.now()
+            )
+            result = await session.execute(query)
+            await session.commit()
+        return result.rowcount
+
+    def start_filter_refresh(self) -> None:
+        """Starts rebuilding the revoked tokens filter of this process periodically,
+        until it is loaded every token is checked against the database"""
+        if self._refresh_task is None:
+            RevokedTokenManager._refresh_task = asyncio.create_task(
+                self._refresh_revoked_filter(), name="revoked_tokens_filter"
+            )
+
+    async def stop_filter_refresh(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            RevokedTokenManager._refresh_task = None
+
+    async def _refresh_revoked_filter(self) -> None:
+        while True:
+            try:
+                await self._load_revoked_filter()
+            except Exception:
+                logger.exception("could not rebuild the revoked tokens filter")
+            await asyncio.sleep(settings.REVOKED_TOKENS_FILTER_REFRESH_SECONDS)
+
+    async def _load_revoked_filter(self, session: AsyncSession | None = None) -> None:
+        async for s in get_db_session():
+            session = s or session
+            query = select(self.model_class.jti).where(
+                self.model_class.expires_at > func.now()
+            )
+            self.revoked_filter.start_load()
+            self.revoked_filter.load((await session.execute(query)).scalars().all())
@@ -0,0 +1,196 @@
+import asyncio
+import heapq
+import time
+from bisect import bisect_left
+from typing import TYPE_CHECKING, NamedTuple
+from uuid import UUID, uuid4
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.core.config import settings
+from app.core.db import get_db_session
+from app.core.utils import aware_datetime_now
+from app.models.managers.base_manager import BaseModelManager
+
+if TYPE_CHECKING:
+    from app.models.tags import Tag
+
+
+class TagIndexEntry(NamedTuple):
+    id: UUID
+    value: str
+    usage_count: int
+
+
+class TagPrefixIndex:
+    """In-process index of tag values sorted by their lowercase value.
+
+    Prefix lookups are a `bisect` into the sorted keys followed by a scan of the
+    matching range, which keeps keystroke-rate autocomplete requests off the database.
+    The index is rebuilt when it is invalidated by a tag write in this process or
+    when it is older than `TAG_INDEX_TTL_SECONDS` (writes made by other workers).
+    """
+
+    def __init__(self):
+        self._keys: list[str] = []
+        self._entries: list[TagIndexEntry] = []
+        self._loaded_at: float | None = None
+        self._short_prefix_results: dict[tuple[str, int], list[TagIndexEntry]] = {}
+        self.is_complete = False
+
+    @property
+    def is_stale(self) -> bool:
+        return (
+            self._loaded_at is None
+            or time.monotonic() - self._loaded_at > settings.TAG_INDEX_TTL_SECONDS
+        )
+
+    def load(self, entries: list[TagIndexEntry], is_complete: bool) -> None:
+        entries = sorted(entries, key=lambda entry: entry.value.lower())
+        self._keys = [entry.value.lower() for entry in entries]
+        self._entries = entries
+        self._short_prefix_results = {}
+        self.is_complete = is_complete
+        self._loaded_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        self._loaded_at = None
+
+    def search(self, prefix: str, limit: int) -> list[TagIndexEntry]:
+        """Returns the `limit` most used tags starting with `prefix` (case-insensitive).
+
+        Results for one and two character prefixes match a large share of the index,
+        they are memoized until the next load.
+        """
+        prefix = prefix.lower()
+        if (prefix, limit) in self._short_prefix_results:
+            return self._short_prefix_results[(prefix, limit)]
+        matches = []
+        for position in range(bisect_left(self._keys, prefix), len(self._keys)):
+            if not self._keys[position].startswith(prefix):
+                break
+            matches.append(self._entries[position])
+        results = heapq.nlargest(limit, matches, key=lambda entry: entry.usage_count)
+        if len(prefix) <= 2:
+            self._short_prefix_results[(prefix, limit)] = results
+        return results
+
+
+class TagModelManager[T: Tag](BaseModelManager):
+    prefix_index = TagPrefixIndex()
+    _index_lock = asyncio.Lock()
+
+    async def autocomplete(
+        self, prefix: str, limit: int = 10, session: AsyncSession | None = None
+    ) -> list[TagIndexEntry]:
+        """Suggests the most used tags starting with `prefix`.
+
+        Suggestions are served from the in-process `prefix_index`, the database is only
+        queried to rebuild a stale index or when there are more tags than the index holds.
+        """
+        if self.prefix_index.is_stale:
+            async with self._index_lock:
+                if self.prefix_index.is_stale:
+                    await self._load_prefix_index(session)
+        if self.prefix_index.is_complete:
+            return self.prefix_index.search(prefix, limit)
+        return await self.search(prefix, limit, session=session)
+
+    async def search(
+        self, prefix: str, limit: int = 10, session: AsyncSession | None = None
+    ) -> list[TagIndexEntry]:
+        """Database prefix search, served by the `lower(value) text_pattern_ops` index"""
+        pattern = (
+            prefix.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        )
+        async for s in get_db_session():
+            session = s or session
+            query = (
+                select(
+                    self.model_class.id,
+                    self.model_class.value,
+                    self.model_class.usage_count,
+                )
+                .where(func.lower(self.model_class.value).like(f"{pattern}%"))
+                .order_by(self.model_class.usage_count.desc())
+                .limit(limit)
+            )
+            return [TagIndexEntry(*row) for row in await session.execute(query)]
+
+    async def upsert_values(
+        self, session: AsyncSession, values: list[str]
+    ) -> list[UUID]:
+        """Resolves tag values to their ids, creating the tags that do not exist yet.
+
+        Values are matched regardless of case, a new tag keeps the case of the first
+        value creating it. Existing and new tags are resolved in one statement, an
+        `INSERT ... ON CONFLICT (lower(value)) DO NOTHING RETURNING id` CTE unioned with
+        a select of the existing tags, the caller owns the transaction.
+
+        The values are inserted sorted: transactions inserting the same new values
+        wait on each other's unique index entries in the same order instead of
+        deadlocking.
+        """
+        first_values: dict[str, str] = {}
+        for value in values:
+            first_values.setdefault(value.lower(), value)
+        values = [first_values[key] for key in sorted(first_values)]
+        lower_values = [value.lower() for value in values]
+        now = aware_datetime_now()
+        inserted_tags = (
+            insert(self.model_class)
+            .values(
+                [
+                    {
+                        "id": uuid4(),
+                        "created_at": now,
+                        "last_updated_at": now,
+                        "value": value,
+                        "usage_count": 0,
+                    }
+                    for value in values
+                ]
+            )
+            .on_conflict_do_nothing(index_elements=[func.lower(self.model_class.value)])
+            .returning(self.model_class.id)
+            .cte("inserted_tags")
+        )
+        query = select(inserted_tags.c.id).union_all(
+            select(self.model_class.id).where(
+                func.lower(self.model_class.value).in_(lower_values)
+            )
+        )
+        tag_ids = list((await session.execute(query)).scalars())
+        if len(tag_ids) < len(values):
+            # a concurrent transaction committed some of the values after this
+            # statement's snapshot was taken, they are visible to a new statement
+            query = select(self.model_class.id).where(
+                func.lower(self.model_class.value).in_(lower_values),
+                self.model_class.id.not_in(tag_ids),
+            )
+            tag_ids.extend((await session.execute(query)).scalars())
+        return tag_ids
+
+    def invalidate_prefix_index(self) -> None:
+        self.prefix_index.invalidate()
+
+    async def _load_prefix_index(self, session: AsyncSession | None) -> None:
+        max_size = settings.TAG_INDEX_MAX_SIZE
+        async for s in get_db_session():
+            session = s or session
+            query = (
+                select(
+                    self.model_class.id,
+                    self.model_class.value,
+                    self.model_class.usage_count,
+                )
+                .order_by(self.model_class.usage_count.desc())
+                .limit(max_size + 1)
+            )
+            entries = [TagIndexEntry(*row) for row in await session.execute(query)]
+            self.prefix_index.load(
+                entries[:max_size], is_complete=len(entries) <= max_size
+            )
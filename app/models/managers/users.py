@@ -1,12 +1,20 @@
 from typing import TYPE_CHECKING, Optional
+from uuid import UUID
 
 from pydantic import EmailStr
+from sqlalchemy import literal, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+from starlette.concurrency import run_in_threadpool
 
+from app.core.db import get_db_session
 from app.core.security import get_password_hash, verify_password
+from app.core.utils import aware_datetime_now
 from app.models.managers.base_manager import BaseModelManager
 
 if TYPE_CHECKING:
+    from app.models.otp import OTPRecord
     from app.models.users import User
 
 
@@ -21,29 +29,131 @@ class UserModelManager[T: User](BaseModelManager):
         is_email_verified=False,
         session: AsyncSession | None = None,
     ) -> "User":
-        creation_data = {
-            "email": email,
-            "password": get_password_hash(password),
-            "first_name": first_name,
-            "last_name": last_name,
-            "is_active": is_active,
-            "is_email_verified": is_email_verified,
+        """Creates the user with a single `INSERT ... ON CONFLICT (email) DO NOTHING`,
+        the password is hashed in a worker thread.
+
+        Raises:
+            User.AlreadyExist: If a user with this email already exist
+        """
+        user = await self._build_user(
+            email, password, first_name, last_name, is_active, is_email_verified
+        )
+        query = self._insert_user_query(user)
+        async for s in get_db_session():
+            session = s or session
+            if (await session.execute(query)).scalar_one_or_none() is None:
+                raise self.model_class.AlreadyExist(
+                    "user with this email already exist"
+                )
+            await session.commit()
+        return user
+
+    async def signup(
+        self,
+        email: EmailStr,
+        password: str,
+        first_name: str | None,
+        last_name: str | None,
+        session: AsyncSession | None = None,
+    ) -> tuple["User", "OTPRecord"]:
+        """Creates the user and its email verification OTP in a single statement, the
+        OTP is inserted from the `INSERT ... ON CONFLICT (email) DO NOTHING RETURNING id`
+        of the user so neither row is created when the email is taken. Together with the
+        password hash computed in a worker thread, this is all the work of a signup.
+
+        Raises:
+            User.AlreadyExist: If a user with this email already exist
+        """
+        from app.models.otp import OTPPurpose, OTPRecord
+
+        user = await self._build_user(email, password, first_name, last_name)
+        otp = OTPRecord.model_validate(
+            {
+                "purpose": OTPPurpose.EMAIL_VERIFICATION,
+                "user_id": user.id,
+                "last_updated_at": user.last_updated_at,
+            }
+        )
+        new_user = self._insert_user_query(user).cte("new_user")
+        otp_columns = OTPRecord.__table__.c
+        otp_values = {
+            column.name: literal(getattr(otp, column.name), column.type)
+            for column in otp_columns
+            if column.name != "user_id"
+        }
+        query = (
+            insert(OTPRecord)
+            .from_select(
+                [*otp_values, "user_id"],
+                select(*otp_values.values(), new_user.c.id),
+            )
+            .returning(otp_columns.id)
+        )
+        async for s in get_db_session():
+            session = s or session
+            if (await session.execute(query)).scalar_one_or_none() is None:
+                raise self.model_class.AlreadyExist(
+                    "user with this email already exist"
+                )
+            await session.commit()
+        return user, otp
+
+    async def _build_user(
+        self,
+        email: EmailStr,
+        password: str,
+        first_name: str | None,
+        last_name: str | None,
+        is_active=True,
+        is_email_verified=False,
+    ) -> "User":
+        # bcrypt takes hundreds of milliseconds, the event loop keeps serving meanwhile
+        password_hash = await run_in_threadpool(get_password_hash, password)
+        return self.model_class.model_validate(
+            {
+                "email": email,
+                "password": password_hash,
+                "first_name": first_name,
+                "last_name": last_name,
+                "is_active": is_active,
+                "is_email_verified": is_email_verified,
+                "last_updated_at": aware_datetime_now(),
+            }
+        )
+
+    def _insert_user_query(self, user: "User"):
+        values = {
+            column.name: getattr(user, column.name)
+            for column in self.model_class.__table__.c
         }
-        try:
-            user = await self.get(session, self.model_class.email == email)
-        except self.model_class.DoesNotExist:
-            user = None
-        if user:
-            raise self.model_class.AlreadyExist("user with this email already exist")
-        return await super().create(creation_data=creation_data, session=session)
+        return (
+            insert(self.model_class)
+            .values(**values)
+            .on_conflict_do_nothing(index_elements=["email"])
+            .returning(self.model_class.id)
+        )
 
     async def authenticate(
         self, email: EmailStr, password: str, session: AsyncSession | None = None
     ) -> Optional["User"]:
-        try:
-            user = await self.get(session, self.model_class.email == email)
-        except self.model_class.DoesNotExist:
-            return None
+        # read from the primary, a replica may not have the password just reset yet
+        async for s in get_db_session():
+            session = session or s
+            try:
+                user = await self.get(session, self.model_class.email == email)
+            except self.model_class.DoesNotExist:
+                return None
         if not verify_password(password, user.password):
             return None
         return user
+
+    async def bump_permissions_version(
+        self, session: AsyncSession, *user_ids: UUID
+    ) -> None:
+        """Invalidates the organization permission claims in the access tokens issued
+        to the users, to be called in the transaction changing their memberships"""
+        await session.execute(
+            update(self.model_class)
+            .where(self.model_class.id.in_(user_ids))
+            .values(permissions_version=self.model_class.permissions_version + 1)
+        )
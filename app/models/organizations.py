@@ -2,12 +2,19 @@ from enum import Enum
 from typing import TYPE_CHECKING, ClassVar, Optional
 from uuid import UUID
 
-from pydantic import EmailStr
-from sqlmodel import Field, Relationship
+from pydantic import AwareDatetime, EmailStr
+from sqlalchemy import Index, UniqueConstraint, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlmodel import TIMESTAMP, Field, Relationship
+from sqlmodel import Enum as SAEnum
 
-from app.extras.models import BaseDBModel, MutableSABaseModel
+from app.extras.models import BaseDBModel, MutableSABaseModel, TimeOrderedDBModel
 
-from .managers.organizations import OrganizationModelManager
+from .managers.organizations import (
+    OrganizationInviteModelManager,
+    OrganizationJoinRequestModelManager,
+    OrganizationModelManager,
+)
 
 if TYPE_CHECKING:
     from .users import User
@@ -17,6 +24,7 @@ class OrganizationMemberPermission(str, Enum):
     MANAGE_EVENTS = "EVENT:WRITE"
     INVITE_MEMBERS = "MEMBERS:INVITE"
     APPROVE_REQUESTS = "MEMBERS:APPROVE_REQUEST"
+    MANAGE_MEMBERS = "MEMBERS:MANAGE"
 
 
 class OrganizationMember(MutableSABaseModel):
@@ -82,35 +90,80 @@ class OrganizationInviteStatus(str, Enum):
     EXPIRED = "EXPIRED"
 
 
-class OrganizationInvite(BaseDBModel):
+class OrganizationInvite(TimeOrderedDBModel, table=True):
     """This is used to represent an organization inviting a user to be a part of its members.
 
     When the owner or an organization member tries to invite a user, this model is created with
     a status of pending, an invitation email is sent to the user, if the user does not have an
     eventtrakka account, they can choose to create one. an authenticated user can then choose to
-    accept the invite or decline the invite
+    accept the invite or decline the invite. Inviting an email again renews its pending invite.
     """
 
     __tablename__ = "organization_invites"
+    __table_args__ = (
+        UniqueConstraint(
+            "organization_id",
+            "email",
+            name="uq_organization_invites_organization_id_email",
+        ),
+    )
 
     organization_id: UUID = Field(foreign_key="organizations.id", ondelete="CASCADE")
-    status: OrganizationInviteStatus
-    email: EmailStr
+    status: OrganizationInviteStatus = Field(
+        OrganizationInviteStatus.PENDING,
+        sa_column=Field(SAEnum(OrganizationInviteStatus)),
+    )
+    email: EmailStr = Field(max_length=320)
     permissions: list[OrganizationMemberPermission] = Field(
-        description="A list of administrative features an organization member can perform in the organization"
+        default_factory=list,
+        sa_type=JSONB,
+        description="A list of administrative features an organization member can perform in the organization",
+    )
+    invited_by_id: UUID | None = Field(
+        foreign_key="users.id", ondelete="SET NULL", description="The inviting member"
+    )
+    expires_at: AwareDatetime = Field(sa_type=TIMESTAMP(timezone=True))
+
+    objects: ClassVar[OrganizationInviteModelManager["OrganizationInvite"]] = (
+        OrganizationInviteModelManager()
     )
 
 
-class OrganizationJoinRequest(BaseDBModel):
+class OrganizationJoinRequest(TimeOrderedDBModel, table=True):
     """This is used to represent an authenticated user requesting to join an organization.
 
     An authenticated user may find an organization they belong to but have not been added as a member
     and send a request to the organization, existing members of the organizations with access to approve
-    requests may choose to approve or decline the request.
+    requests may choose to approve or decline the request. A user has at most one pending request per
+    organization.
     """
 
     __tablename__ = "organization_join_requests"
+    __table_args__ = (
+        # the review queue, pages of requests of a status in the order they were sent
+        Index(
+            "ix_organization_join_requests_organization_id_status_created_at",
+            "organization_id",
+            "status",
+            "created_at",
+            "id",
+        ),
+        Index(
+            "uq_organization_join_requests_pending",
+            "organization_id",
+            "user_id",
+            unique=True,
+            postgresql_where=text("status = 'PENDING'"),
+        ),
+    )
 
     organization_id: UUID = Field(foreign_key="organizations.id", ondelete="CASCADE")
-    status: OrganizationInviteStatus
-    user_id: UUID = Field(foreign_key="users.id")
+    status: OrganizationInviteStatus = Field(
+        OrganizationInviteStatus.PENDING,
+        sa_column=Field(SAEnum(OrganizationInviteStatus)),
+    )
+    user_id: UUID = Field(foreign_key="users.id", ondelete="CASCADE")
+
+    objects: ClassVar[
+        OrganizationJoinRequestModelManager["OrganizationJoinRequest"]
+    ] = OrganizationJoinRequestModelManager()
@@ -6,12 +6,13 @@ from typing import ClassVar
 from uuid import UUID
 
 from pydantic import AwareDatetime
+from sqlalchemy import Index
 from sqlmodel import TIMESTAMP, Field
 from sqlmodel import Enum as SAEnum
 
 from app.core.config import settings
 from app.core.utils import aware_datetime_now
-from app.extras.models import BaseDBModel
+from app.extras.models import TimeOrderedDBModel
 from app.models.managers.otp import OTPRecordManager
 
 
@@ -25,10 +26,11 @@ def generate_otp(length: int = 6) -> str:
     return "".join(secrets.choice(characters) for _ in range(length))
 
 
-class OTPRecord(BaseDBModel, table=True):
+class OTPRecord(TimeOrderedDBModel, table=True):
     """OTPRecord stores one-time passwords for email verification and authentication."""
 
     __tablename__ = "otp_records"
+    __table_args__ = (Index("ix_otp_records_user_id_purpose", "user_id", "purpose"),)
 
     code: str = Field(
         max_length=settings.OTP_LENGTH,
@@ -44,6 +46,7 @@ class OTPRecord(BaseDBModel, table=True):
         default_factory=lambda: aware_datetime_now()
         + timedelta(seconds=settings.OTP_EXPIRE_MINUTES),
         sa_type=TIMESTAMP(timezone=True),
+        index=True,
     )
     user_id: UUID | None = Field(
         foreign_key="users.id",
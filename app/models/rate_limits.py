@@ -0,0 +1,32 @@
+from typing import ClassVar
+
+from pydantic import AwareDatetime
+from sqlalchemy import BigInteger
+from sqlmodel import TIMESTAMP, Field, SQLModel
+
+from app.models.managers.rate_limits import RateLimitWindowManager
+
+
+class RateLimitWindow(SQLModel, table=True):
+    """Hit counter of a rate limited key for one fixed window, used by the database
+    rate limit store to share limits between the app workers.
+
+    The table is unlogged, its content is lost on a database crash which only resets
+    the limits.
+    """
+
+    __tablename__ = "rate_limit_windows"
+    __table_args__ = {"prefixes": ["UNLOGGED"]}
+
+    key: str = Field(primary_key=True, max_length=384)
+    window: int = Field(
+        primary_key=True,
+        sa_type=BigInteger,
+        description="The index of the window, i.e. the unix time divided by the window size",
+    )
+    hits: int = Field(0)
+    expires_at: AwareDatetime = Field(sa_type=TIMESTAMP(timezone=True), index=True)
+
+    objects: ClassVar[RateLimitWindowManager["RateLimitWindow"]] = (
+        RateLimitWindowManager()
+    )
@@ -0,0 +1,22 @@
+from typing import ClassVar
+from uuid import UUID
+
+from pydantic import AwareDatetime
+from sqlmodel import TIMESTAMP, Field, SQLModel
+
+from app.models.managers.revoked_tokens import RevokedTokenManager
+
+
+class RevokedToken(SQLModel, table=True):
+    """A jwt revoked before its expiry (e.g. on logout), identified by its `jti` claim.
+
+    The row is only needed until the token expires, expired rows are pruned.
+    """
+
+    __tablename__ = "revoked_tokens"
+
+    jti: str = Field(primary_key=True, max_length=32)
+    user_id: UUID = Field(foreign_key="users.id", ondelete="CASCADE")
+    expires_at: AwareDatetime = Field(sa_type=TIMESTAMP(timezone=True), index=True)
+
+    objects: ClassVar[RevokedTokenManager["RevokedToken"]] = RevokedTokenManager()
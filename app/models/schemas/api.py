@@ -1,9 +1,10 @@
 from typing import Literal
 from uuid import UUID
 
-from sqlmodel import SQLModel
+from sqlmodel import Field, SQLModel
 
 from app.core.security import APIScope
+from app.models.organizations import OrganizationMemberPermission
 
 
 class ResponseData[T](SQLModel):
@@ -16,6 +17,13 @@ class PaginatedDataResponseData[T](SQLModel):
     results: list[T]
 
 
+class KeysetPage[T](SQLModel):
+    items: list[T]
+    next_cursor: str | None = Field(
+        None, description="The `cursor` of the next page, `None` on the last page"
+    )
+
+
 class Token(SQLModel):
     token_type: str = "bearer"
 
@@ -33,6 +41,24 @@ class TokenSubject(SQLModel):
     type: Literal["access_token", "refresh_token", "verification_token"]
     user_id: UUID
     scopes: list[APIScope] = []
+    organization_permissions: dict[UUID, list[OrganizationMemberPermission]] | None = (
+        Field(
+            None,
+            description="The permissions of the user in each organization they are a "
+            "member of, `None` when the claims are not embedded in the token",
+        )
+    )
+    permissions_version: int | None = Field(
+        None,
+        description="The user's `permissions_version` when the organization permissions "
+        "were read, the claims are stale if it no longer matches",
+    )
+
+
+class Logout(SQLModel):
+    refresh_token: str | None = Field(
+        None, description="Revoked with the access token when provided"
+    )
 
 
 class PasswordReset(SQLModel):
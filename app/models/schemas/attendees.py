@@ -0,0 +1,18 @@
+from uuid import UUID
+
+from pydantic import AwareDatetime, EmailStr
+from sqlmodel import SQLModel
+
+
+class CreateAttendee(SQLModel):
+    event_id: UUID
+    email: EmailStr
+    questionnaire_submission: dict | None = None
+
+
+class AttendeePublic(SQLModel):
+    id: UUID
+    event_id: UUID
+    email: EmailStr
+    attended_event: bool
+    created_at: AwareDatetime
@@ -1,18 +1,27 @@
+from typing import Annotated
 from uuid import UUID
 
-from pydantic import AwareDatetime, Field
+from pydantic import AwareDatetime, Field, StringConstraints
 from sqlmodel import SQLModel
 
 from app.core.utils import aware_datetime_now
 from app.models.events import (
     AttendeeQuestion,
+    ContactInformation,
     EventFee,
     EventMode,
+    EventOfficialType,
     EventPublicationStatus,
     EventSource,
 )
+from app.models.schemas.organizations import OrganizationPublic
+from app.models.schemas.tags import TagPublic
 from app.models.tags import Tag
 
+TagValue = Annotated[
+    str, StringConstraints(strip_whitespace=True, min_length=1, max_length=32)
+]
+
 
 class CreateEvent(SQLModel):
     source: EventSource = EventSource.EVENTTRAKKA
@@ -22,6 +31,10 @@ class CreateEvent(SQLModel):
     theme: str | None = None
     description: str | None = None
     tags: list[UUID] | None = None
+    tag_values: list[TagValue] | None = Field(
+        None,
+        description="tags by value (e.g. `OSCAFest`), tags that do not exist yet are created",
+    )
     fee: EventFee | None = None
     starts_at: AwareDatetime = Field(default_factory=aware_datetime_now)
     ends_at: AwareDatetime | None = None
@@ -32,6 +45,7 @@ class CreateEvent(SQLModel):
 
 
 class EventPublic(SQLModel):
+    id: UUID
     mode_of_attending: EventMode
     status: EventPublicationStatus
     title: str
@@ -45,3 +59,20 @@ class EventPublic(SQLModel):
     link: str | None = None
     passcode: str | None = None
     attendee_questionnaire: list[AttendeeQuestion] | None = None
+
+
+class EventOfficialPublic(SQLModel):
+    id: UUID
+    type: EventOfficialType
+    first_name: str
+    last_name: str
+    role: str
+    contact_information: ContactInformation | None = None
+
+
+class EventDetailPublic(EventPublic):
+    tags: list[TagPublic]
+    organization: OrganizationPublic | None = None
+    officials: list[EventOfficialPublic]
+    attendee_count: int
+    attended_count: int
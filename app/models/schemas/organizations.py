@@ -1,6 +1,14 @@
+from typing import Self
 from uuid import UUID
 
-from sqlmodel import SQLModel
+from pydantic import AwareDatetime, EmailStr, field_validator, model_validator
+from sqlmodel import Field, SQLModel
+
+from app.core.config import settings
+from app.models.organizations import (
+    OrganizationInviteStatus,
+    OrganizationMemberPermission,
+)
 
 
 class CreateOrganization(SQLModel):
@@ -14,3 +22,106 @@ class OrganizationPublic(SQLModel):
     is_verified: bool
     logo_url: str | None
     about: str | None
+
+
+class AddOrganizationMember(SQLModel):
+    id: UUID = Field(description="The id of the user to add as a member")
+    role: str = "Member"
+    permissions: list[OrganizationMemberPermission] = Field(default_factory=list)
+
+
+class UpdateOrganizationMember(SQLModel):
+    id: UUID
+    role: str | None = None
+    permissions: list[OrganizationMemberPermission] | None = None
+
+
+class UpdateOrganizationMembers(SQLModel):
+    add: list[AddOrganizationMember] = Field(default_factory=list, max_length=1000)
+    update: list[UpdateOrganizationMember] = Field(
+        default_factory=list, max_length=1000
+    )
+    remove: list[UUID] = Field(default_factory=list, max_length=1000)
+
+    @model_validator(mode="after")
+    def check_members_are_distinct(self) -> Self:
+        if len(self.member_ids) != len(set(self.member_ids)):
+            raise ValueError("a member can only be added, updated or removed once")
+        return self
+
+    @property
+    def member_ids(self) -> list[UUID]:
+        return [
+            *(member.id for member in self.add),
+            *(member.id for member in self.update),
+            *self.remove,
+        ]
+
+    @property
+    def granted_permissions(self) -> set[OrganizationMemberPermission]:
+        """The permissions given to the added and updated members"""
+        return {
+            *(permission for member in self.add for permission in member.permissions),
+            *(
+                permission
+                for member in self.update
+                for permission in member.permissions or []
+            ),
+        }
+
+
+class TransferOrganizationOwnership(SQLModel):
+    new_owner_id: UUID = Field(
+        description="The member the organization is transferred to"
+    )
+
+
+class InviteOrganizationMembers(SQLModel):
+    emails: list[EmailStr] = Field(
+        min_length=1, max_length=settings.ORGANIZATION_INVITE_MAX_EMAILS
+    )
+    permissions: list[OrganizationMemberPermission] = Field(default_factory=list)
+
+    @field_validator("emails")
+    @classmethod
+    def normalize_emails(cls, emails: list[str]) -> list[str]:
+        """Lowercases the emails and drops the duplicates, keeping their order"""
+        return list(dict.fromkeys(email.lower() for email in emails))
+
+
+class OrganizationInvitePublic(SQLModel):
+    id: UUID
+    organization_id: UUID
+    email: EmailStr
+    status: OrganizationInviteStatus
+    permissions: list[OrganizationMemberPermission]
+    expires_at: AwareDatetime
+
+
+class OrganizationInviteResponse(SQLModel):
+    token: str = Field(description="The token of the invitation email")
+
+
+class OrganizationJoinRequestPublic(SQLModel):
+    id: UUID
+    organization_id: UUID
+    user_id: UUID
+    status: OrganizationInviteStatus
+    created_at: AwareDatetime
+
+
+class OrganizationJoinRequestReview(OrganizationJoinRequestPublic):
+    email: EmailStr
+    first_name: str | None
+    last_name: str | None
+
+
+class ReviewOrganizationJoinRequests(SQLModel):
+    approve: list[UUID] = Field(default_factory=list, max_length=1000)
+    decline: list[UUID] = Field(default_factory=list, max_length=1000)
+
+    @model_validator(mode="after")
+    def check_requests_are_distinct(self) -> Self:
+        if set(self.approve) & set(self.decline):
+            raise ValueError("a request can't be both approved and declined")
+        return self
@@ -0,0 +1,14 @@
+from uuid import UUID
+
+from sqlmodel import SQLModel
+
+
+class TagPublic(SQLModel):
+    id: UUID
+    value: str
+
+
+class TagSuggestion(SQLModel):
+    id: UUID
+    value: str
+    usage_count: int
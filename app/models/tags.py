@@ -1,13 +1,32 @@
+from typing import ClassVar
+
+from sqlalchemy import Index, column, func
 from sqlmodel import Field
 
 from app.extras.models import BaseDBModel
+from app.models.managers.tags import TagModelManager
 
 
 class Tag(BaseDBModel, table=True):
     __tablename__ = "tags"
+    __table_args__ = (
+        # tags are unique regardless of case, the index also serves prefix searches
+        Index(
+            "uq_tags_value_lower",
+            func.lower(column("value")).label("value_lower"),
+            unique=True,
+            postgresql_ops={"value_lower": "text_pattern_ops"},
+        ),
+    )
 
     value: str = Field(
         max_length=32,
         description="The tag content. (e.g. `#HacktoberFest2024`, `OSCAFest`)",
         unique=True,
     )
+    # kept in step with the links of `eventtags` by its triggers
+    usage_count: int = Field(
+        0, description="The number of events tagged with this tag, used for ranking"
+    )
+
+    objects: ClassVar[TagModelManager["Tag"]] = TagModelManager()
@@ -1,22 +1,38 @@
 from typing import ClassVar
 
-from pydantic import EmailStr
-from sqlmodel import Field
+from pydantic import AwareDatetime, EmailStr
+from sqlalchemy import Index, column, func
+from sqlmodel import TIMESTAMP, Field
 
 from app.core.security import get_password_hash
-from app.extras.models import BaseDBModel
+from app.extras.models import TimeOrderedDBModel
 from app.models.managers.users import UserModelManager
 
 
-class User(BaseDBModel, table=True):
+class User(TimeOrderedDBModel, table=True):
     __tablename__ = "users"
+    __table_args__ = (
+        # serves the case insensitive lookups, see `OrganizationInviteModelManager.invite`
+        Index("ix_users_email_lower", func.lower(column("email"))),
+    )
 
-    email: EmailStr = Field(max_length=320)
+    email: EmailStr = Field(max_length=320, unique=True, index=True)
     password: str = Field(max_length=60)
     first_name: str | None = Field(max_length=50)
     last_name: str | None = Field(max_length=50)
     is_active: bool = Field(default=True)
     is_email_verified: bool = Field(False)
+    permissions_version: int = Field(
+        0,
+        description="Incremented whenever the user's organization memberships or "
+        "permissions change, used to detect stale permission claims in access tokens",
+    )
+    tokens_valid_after: AwareDatetime | None = Field(
+        None,
+        sa_type=TIMESTAMP(timezone=True),
+        description="Tokens issued to the user before this time are rejected, set when "
+        "the password is reset",
+    )
 
     objects: ClassVar[UserModelManager["User"]] = UserModelManager()
 
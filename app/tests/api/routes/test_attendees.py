@@ -0,0 +1,46 @@
+import uuid
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, delete
+
+from app.core.config import settings
+from app.models import Event
+from app.models.events import EventPublicationStatus
+from app.tests.utils import assert_max_queries, create_event
+
+
+def test_create_attendee(client: TestClient, event: Event) -> None:
+    data = {"event_id": str(event.id), "email": "jane@eventtrakka.com"}
+    with assert_max_queries(1):
+        response = client.post(f"{settings.API_V1_STR}/attendees/", json=data)
+    assert response.status_code == 201
+    attendee = response.json()["data"]
+    assert attendee["event_id"] == str(event.id)
+    assert attendee["email"] == "jane@eventtrakka.com"
+
+
+def test_create_attendee_twice(client: TestClient, event: Event) -> None:
+    data = {"event_id": str(event.id), "email": "jane@eventtrakka.com"}
+    response = client.post(f"{settings.API_V1_STR}/attendees/", json=data)
+    assert response.status_code == 201
+    # the email addresses are compared case insensitively
+    data["email"] = "Jane@EventTrakka.com"
+    response = client.post(f"{settings.API_V1_STR}/attendees/", json=data)
+    assert response.status_code == 409
+
+
+def test_create_attendee_draft_event(client: TestClient, db: Session) -> None:
+    event = create_event(db, status=EventPublicationStatus.DRAFT)
+    try:
+        data = {"event_id": str(event.id), "email": "jane@eventtrakka.com"}
+        response = client.post(f"{settings.API_V1_STR}/attendees/", json=data)
+        assert response.status_code == 404
+    finally:
+        db.exec(delete(Event).where(Event.id == event.id))
+        db.commit()
+
+
+def test_create_attendee_missing_event(client: TestClient) -> None:
+    data = {"event_id": str(uuid.uuid4()), "email": "jane@eventtrakka.com"}
+    response = client.post(f"{settings.API_V1_STR}/attendees/", json=data)
+    assert response.status_code == 404
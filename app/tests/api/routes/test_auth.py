@@ -0,0 +1,73 @@
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.utils import aware_datetime_now
+from app.models import User
+from app.tests.utils import USER_PASSWORD, assert_max_queries, login
+
+
+def test_obtain_access_token(client: TestClient, user: User) -> None:
+    with assert_max_queries(2):
+        response = client.post(
+            f"{settings.API_V1_STR}/auth/access-token/",
+            data={"username": user.email, "password": USER_PASSWORD},
+        )
+    assert response.status_code == 200
+    tokens = response.json()["data"]
+    assert tokens["access_token"]
+    assert tokens["refresh_token"]
+
+
+def test_obtain_access_token_incorrect_password(client: TestClient, user: User) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/auth/access-token/",
+        data={"username": user.email, "password": "incorrect"},
+    )
+    assert response.status_code == 400
+
+
+def test_logout(client: TestClient, user: User) -> None:
+    response = client.post(
+        f"{settings.API_V1_STR}/auth/access-token/",
+        data={"username": user.email, "password": USER_PASSWORD},
+    )
+    tokens = response.json()["data"]
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    refresh_headers = {"Authorization": f"Bearer {tokens['refresh_token']}"}
+
+    response = client.post(
+        f"{settings.API_V1_STR}/auth/logout/",
+        headers=headers,
+        json={"refresh_token": tokens["refresh_token"]},
+    )
+    assert response.status_code == 200, response.text
+
+    response = client.get(f"{settings.API_V1_STR}/users/current-user/", headers=headers)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Token has been revoked"
+    response = client.post(
+        f"{settings.API_V1_STR}/auth/refresh-token/", headers=refresh_headers
+    )
+    assert response.status_code == 401
+    # the other tokens of the user are still valid
+    response = client.get(
+        f"{settings.API_V1_STR}/users/current-user/", headers=login(client, user)
+    )
+    assert response.status_code == 200
+
+
+def test_tokens_valid_after(client: TestClient, db: Session, user: User) -> None:
+    headers = login(client, user)
+    # e.g. reset the password, in the same second the token was issued
+    user.tokens_valid_after = aware_datetime_now()
+    db.add(user)
+    db.commit()
+
+    response = client.get(f"{settings.API_V1_STR}/users/current-user/", headers=headers)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Token has been revoked"
+    response = client.get(
+        f"{settings.API_V1_STR}/users/current-user/", headers=login(client, user)
+    )
+    assert response.status_code == 200
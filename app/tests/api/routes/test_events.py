@@ -0,0 +1,139 @@
+import threading
+import uuid
+from collections.abc import Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import Connection, Engine, insert
+from sqlmodel import Session, delete, update
+
+from app.core.config import settings
+from app.models import Attendee, Event, EventTag, Organization, Tag, User
+from app.models.events import EventPublicationStatus
+from app.tests.utils import assert_max_queries, create_event, create_organization
+
+
+@pytest.mark.usefixtures("event")
+def test_get_public_events(client: TestClient) -> None:
+    with assert_max_queries(3):
+        response = client.get(f"{settings.API_V1_STR}/events/public/")
+    assert response.status_code == 200
+    assert response.json()["total"] >= 1
+
+
+@pytest.fixture
+def tags(db: Session) -> Iterator[list[Tag]]:
+    tags = [Tag(value=f"detail-{uuid.uuid4().hex[:16]}") for _ in range(2)]
+    db.add_all(tags)
+    db.commit()
+    yield tags
+    tag_ids = [tag.id for tag in tags]
+    db.exec(delete(EventTag).where(EventTag.tag_id.in_(tag_ids)))
+    db.exec(delete(Tag).where(Tag.id.in_(tag_ids)))
+    db.commit()
+
+
+def get_event_detail(client: TestClient, event: Event) -> dict:
+    with assert_max_queries(1):
+        response = client.get(f"{settings.API_V1_STR}/events/{event.id}/")
+    assert response.status_code == 200, response.text
+    return response.json()["data"]
+
+
+def test_event_detail_tags(
+    client: TestClient, db: Session, event: Event, tags: list[Tag]
+) -> None:
+    assert get_event_detail(client, event)["tags"] == []
+
+    db.add(EventTag(tag_id=tags[0].id, event_id=event.id))
+    db.commit()
+    assert [tag["value"] for tag in get_event_detail(client, event)["tags"]] == [
+        tags[0].value
+    ]
+
+    tags[0].value = f"renamed-{uuid.uuid4().hex[:16]}"
+    db.add(tags[0])
+    db.commit()
+    assert [tag["value"] for tag in get_event_detail(client, event)["tags"]] == [
+        tags[0].value
+    ]
+
+
+def test_event_detail_organization(
+    client: TestClient, db: Session, event: Event, user: User
+) -> None:
+    organization = create_organization(db, user)
+    try:
+        event.organization_id = organization.id
+        db.add(event)
+        db.commit()
+        detail = get_event_detail(client, event)
+        assert detail["organization"]["name"] == organization.name
+
+        organization.name = f"Renamed {uuid.uuid4().hex}"
+        db.add(organization)
+        db.commit()
+        assert get_event_detail(client, event)["organization"]["name"] == (
+            organization.name
+        )
+    finally:
+        db.exec(delete(Organization).where(Organization.id == organization.id))
+        db.commit()
+
+
+def test_event_detail_attendee_counts(
+    client: TestClient, db: Session, event: Event
+) -> None:
+    for email in ("jane@eventtrakka.com", "john@eventtrakka.com"):
+        data = {"event_id": str(event.id), "email": email}
+        response = client.post(f"{settings.API_V1_STR}/attendees/", json=data)
+        assert response.status_code == 201
+    detail = get_event_detail(client, event)
+    assert (detail["attendee_count"], detail["attended_count"]) == (2, 0)
+
+    db.exec(
+        update(Attendee)
+        .where(Attendee.event_id == event.id, Attendee.email == "jane@eventtrakka.com")
+        .values(attended_event=True)
+    )
+    db.commit()
+    detail = get_event_detail(client, event)
+    assert (detail["attendee_count"], detail["attended_count"]) == (2, 1)
+
+
+def test_event_detail_draft(client: TestClient, db: Session) -> None:
+    event = create_event(db, status=EventPublicationStatus.DRAFT)
+    try:
+        response = client.get(f"{settings.API_V1_STR}/events/{event.id}/")
+        assert response.status_code == 404
+        response = client.get(f"{settings.API_V1_STR}/events/{uuid.uuid4()}/")
+        assert response.status_code == 404
+    finally:
+        db.exec(delete(Event).where(Event.id == event.id))
+        db.commit()
+
+
+def test_event_detail_concurrent_tags(
+    client: TestClient, db_engine: Engine, event: Event, tags: list[Tag]
+) -> None:
+    """Both tags added by concurrent transactions are in the snapshot, the rebuild of
+    the second one waits for the first one to commit"""
+
+    def tag_event(connection: Connection, tag: Tag) -> None:
+        connection.execute(insert(EventTag).values(tag_id=tag.id, event_id=event.id))
+
+    with db_engine.connect() as first, db_engine.connect() as second:
+        tag_event(first, tags[0])
+        second_tagged = threading.Thread(
+            target=lambda: (tag_event(second, tags[1]), second.commit())
+        )
+        second_tagged.start()
+        # the second transaction is blocked by the row lock of the first one
+        second_tagged.join(timeout=0.5)
+        assert second_tagged.is_alive()
+        first.commit()
+        second_tagged.join()
+
+    assert {tag["value"] for tag in get_event_detail(client, event)["tags"]} == {
+        tag.value for tag in tags
+    }
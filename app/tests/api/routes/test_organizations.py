@@ -0,0 +1,327 @@
+import uuid
+from collections.abc import Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, delete
+
+from app.core.config import settings
+from app.core.email_service import EmailService
+from app.core.utils import aware_datetime_now
+from app.models import Organization, User
+from app.models.organizations import (
+    OrganizationJoinRequest,
+    OrganizationMemberPermission,
+)
+from app.tests.utils import create_organization, create_user, login
+
+Permission = OrganizationMemberPermission
+
+
+@pytest.fixture
+def members(db: Session) -> Iterator[list[User]]:
+    # the emails are stored as entered at signup
+    members = [create_user(db, email=f"Jane.{uuid.uuid4().hex}@EventTrakka.com")]
+    members += [create_user(db) for _ in range(2)]
+    yield members
+    db.exec(delete(User).where(User.id.in_([member.id for member in members])))
+    db.commit()
+
+
+@pytest.fixture
+def organization(
+    db: Session, user: User, members: list[User]
+) -> Iterator[Organization]:
+    """Organization of `user` where the first member manages members, the second
+    invites them and the third manages events"""
+    organization = create_organization(
+        db,
+        user,
+        [
+            (members[0], [Permission.MANAGE_MEMBERS, Permission.INVITE_MEMBERS]),
+            (members[1], [Permission.INVITE_MEMBERS]),
+            (members[2], [Permission.MANAGE_EVENTS]),
+        ],
+    )
+    yield organization
+    db.exec(delete(Organization).where(Organization.id == organization.id))
+    db.commit()
+
+
+def update_members(
+    client: TestClient, organization: Organization, member: User, data: dict
+):
+    return client.post(
+        f"{settings.API_V1_STR}/organizations/{organization.id}/update-members/",
+        json=data,
+        headers=login(client, member),
+    )
+
+
+def test_update_members_as_owner(
+    client: TestClient, organization: Organization, user: User, members: list[User]
+) -> None:
+    data = {
+        "update": [
+            {"id": str(members[1].id), "permissions": [Permission.MANAGE_EVENTS]}
+        ],
+        "remove": [str(members[2].id)],
+    }
+    response = update_members(client, organization, user, data)
+    assert response.status_code == 200
+    updated = {
+        member["id"]: member["permissions"]
+        for member in response.json()["data"]["members"]
+    }
+    assert updated[str(members[1].id)] == [Permission.MANAGE_EVENTS]
+    assert str(members[2].id) not in updated
+
+
+def test_update_members_with_manage_members(
+    client: TestClient, organization: Organization, members: list[User]
+) -> None:
+    data = {
+        "update": [
+            {"id": str(members[1].id), "permissions": [Permission.MANAGE_MEMBERS]}
+        ]
+    }
+    response = update_members(client, organization, members[0], data)
+    assert response.status_code == 200
+
+
+def test_update_members_without_manage_members(
+    client: TestClient, organization: Organization, members: list[User]
+) -> None:
+    response = update_members(
+        client, organization, members[1], {"remove": [str(members[2].id)]}
+    )
+    assert response.status_code == 403
+
+
+def test_update_members_grant_missing_permission(
+    client: TestClient, organization: Organization, members: list[User]
+) -> None:
+    data = {
+        "update": [
+            {"id": str(members[1].id), "permissions": [Permission.MANAGE_EVENTS]}
+        ]
+    }
+    response = update_members(client, organization, members[0], data)
+    assert response.status_code == 403
+
+
+def test_update_members_self(
+    client: TestClient, organization: Organization, members: list[User]
+) -> None:
+    data = {
+        "update": [
+            {
+                "id": str(members[0].id),
+                "permissions": [Permission.MANAGE_MEMBERS],
+                "role": "Admin",
+            }
+        ]
+    }
+    response = update_members(client, organization, members[0], data)
+    assert response.status_code == 403
+    response = update_members(
+        client, organization, members[0], {"remove": [str(members[0].id)]}
+    )
+    assert response.status_code == 403
+
+
+@pytest.fixture
+def sent_invites(monkeypatch: pytest.MonkeyPatch) -> dict[str, str]:
+    """The invite urls sent by email, by recipient"""
+    sent: dict[str, str] = {}
+
+    async def send_organization_invites(_, __, invite_urls: dict[str, str]) -> None:
+        sent.update(invite_urls)
+
+    monkeypatch.setattr(
+        EmailService, "send_organization_invites", send_organization_invites
+    )
+    return sent
+
+
+def invite_members(
+    client: TestClient, organization: Organization, member: User, data: dict
+):
+    return client.post(
+        f"{settings.API_V1_STR}/organizations/{organization.id}/invites/",
+        json=data,
+        headers=login(client, member),
+    )
+
+
+def test_invite_members(
+    client: TestClient,
+    organization: Organization,
+    members: list[User],
+    sent_invites: dict[str, str],
+) -> None:
+    data = {
+        "emails": ["Jane@EventTrakka.com", members[0].email],
+        "permissions": [Permission.INVITE_MEMBERS],
+    }
+    response = invite_members(client, organization, members[1], data)
+    assert response.status_code == 201
+    # current members are skipped whatever the case of their email
+    invites = response.json()["data"]
+    assert [invite["email"] for invite in invites] == ["jane@eventtrakka.com"]
+    assert list(sent_invites) == ["jane@eventtrakka.com"]
+
+
+def test_invite_members_grant_missing_permission(
+    client: TestClient,
+    organization: Organization,
+    members: list[User],
+    sent_invites: dict[str, str],
+) -> None:
+    data = {
+        "emails": ["jane@eventtrakka.com"],
+        "permissions": [Permission.MANAGE_MEMBERS],
+    }
+    response = invite_members(client, organization, members[1], data)
+    assert response.status_code == 403
+    assert not sent_invites
+
+
+@pytest.fixture
+def requesters(db: Session) -> Iterator[list[User]]:
+    requesters = [create_user(db) for _ in range(5)]
+    yield requesters
+    db.exec(delete(User).where(User.id.in_([user.id for user in requesters])))
+    db.commit()
+
+
+def create_join_requests(
+    db: Session, organization: Organization, users: list[User]
+) -> list[OrganizationJoinRequest]:
+    """Pending requests of the users, all sent at the same time"""
+    created_at = aware_datetime_now()
+    join_requests = [
+        OrganizationJoinRequest(
+            organization_id=organization.id,
+            user_id=user.id,
+            created_at=created_at,
+            last_updated_at=created_at,
+        )
+        for user in users
+    ]
+    db.add_all(join_requests)
+    db.commit()
+    return join_requests
+
+
+def review_join_requests(
+    client: TestClient, organization: Organization, member: User, data: dict
+):
+    return client.post(
+        f"{settings.API_V1_STR}/organizations/{organization.id}/join-requests/review/",
+        json=data,
+        headers=login(client, member),
+    )
+
+
+def test_join_requests_pages(
+    client: TestClient,
+    db: Session,
+    organization: Organization,
+    user: User,
+    requesters: list[User],
+) -> None:
+    join_requests = create_join_requests(db, organization, requesters)
+    headers = login(client, user)
+    pages, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get(
+            f"{settings.API_V1_STR}/organizations/{organization.id}/join-requests/",
+            params=params,
+            headers=headers,
+        )
+        assert response.status_code == 200, response.text
+        page = response.json()
+        pages.append([item["id"] for item in page["items"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    # the requests sent at the same time are ordered by id
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert sum(pages, []) == sorted(str(request.id) for request in join_requests)
+
+
+def test_join_requests_invalid_cursor(
+    client: TestClient, organization: Organization, user: User
+) -> None:
+    response = client.get(
+        f"{settings.API_V1_STR}/organizations/{organization.id}/join-requests/",
+        params={"cursor": "not a cursor"},
+        headers=login(client, user),
+    )
+    assert response.status_code == 400
+
+
+def test_request_to_join_twice(
+    client: TestClient,
+    db: Session,
+    user: User,
+    organization: Organization,
+    members: list[User],
+    requesters: list[User],
+) -> None:
+    url = f"{settings.API_V1_STR}/organizations/{organization.id}/join-requests/"
+    headers = login(client, requesters[0])
+    response = client.post(url, headers=headers)
+    assert response.status_code == 201, response.text
+    # a single pending request per user, enforced by the partial unique index
+    response = client.post(url, headers=headers)
+    assert response.status_code == 409
+    with pytest.raises(IntegrityError, match="uq_organization_join_requests_pending"):
+        create_join_requests(db, organization, requesters[:1])
+    db.rollback()
+    response = client.post(url, headers=login(client, members[0]))
+    assert response.status_code == 400
+
+    # a declined user may request again
+    response = client.get(url, headers=login(client, user))
+    join_request_id = response.json()["items"][0]["id"]
+    response = review_join_requests(
+        client, organization, user, {"decline": [join_request_id]}
+    )
+    assert response.status_code == 200
+    response = client.post(url, headers=headers)
+    assert response.status_code == 201
+
+
+def test_review_join_requests(
+    client: TestClient,
+    db: Session,
+    organization: Organization,
+    user: User,
+    members: list[User],
+    requesters: list[User],
+) -> None:
+    join_requests = create_join_requests(db, organization, requesters[:3])
+    data = {
+        "approve": [str(join_requests[0].id), str(join_requests[1].id)],
+        "decline": [str(join_requests[2].id)],
+    }
+    response = review_join_requests(client, organization, members[1], data)
+    assert response.status_code == 403
+
+    response = review_join_requests(client, organization, user, data)
+    assert response.status_code == 200, response.text
+    assert response.json()["detail"] == "2 requests approved, 1 declined"
+    # the reviewed requests are skipped
+    response = review_join_requests(client, organization, user, data)
+    assert response.json()["detail"] == "0 requests approved, 0 declined"
+
+    db.refresh(organization)
+    member_ids = [member.id for member in organization.members]
+    assert len(member_ids) == len(set(member_ids)) == 1 + len(members) + 2
+    assert {requesters[0].id, requesters[1].id} <= set(member_ids)
+    assert requesters[2].id not in member_ids
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException, Request
+
+from app.api import rate_limit
+from app.api.rate_limit import InMemoryRateLimitStore, RateLimit, client_ip
+from app.core.config import settings
+
+WINDOW_SECONDS = 60
+
+
+class Clock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    """The time of the store, at the start of a window"""
+    clock = Clock(100 * WINDOW_SECONDS)
+    monkeypatch.setattr(rate_limit, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def store(monkeypatch: pytest.MonkeyPatch) -> InMemoryRateLimitStore:
+    store = InMemoryRateLimitStore()
+    monkeypatch.setattr(rate_limit, "rate_limit_store", store)
+    return store
+
+
+def hit(limiter: RateLimit, identity: str = "203.0.113.7") -> int | None:
+    """The `Retry-After` of the rejected hit, `None` if it was allowed"""
+    try:
+        asyncio.run(limiter.hit(identity))
+    except HTTPException as error:
+        assert error.status_code == 429
+        return int(error.headers["Retry-After"])
+    return None
+
+
+def test_store_windows(store: InMemoryRateLimitStore, clock: Clock) -> None:
+    assert asyncio.run(store.hit("key", WINDOW_SECONDS)) == (1, 0, 0.0)
+    assert asyncio.run(store.hit("key", WINDOW_SECONDS)) == (2, 0, 0.0)
+
+    clock.now += WINDOW_SECONDS * 1.5
+    assert asyncio.run(store.hit("key", WINDOW_SECONDS)) == (1, 2, 0.5)
+
+    # the hits older than the previous window are dropped
+    clock.now += WINDOW_SECONDS * 2
+    assert asyncio.run(store.hit("key", WINDOW_SECONDS)) == (1, 0, 0.5)
+
+
+def test_store_prune(clock: Clock) -> None:
+    store = InMemoryRateLimitStore(max_keys=4)
+    for key in ("a", "b", "c"):
+        asyncio.run(store.hit(key, WINDOW_SECONDS))
+    clock.now += WINDOW_SECONDS * 2
+    for key in ("d", "e"):
+        asyncio.run(store.hit(key, WINDOW_SECONDS))
+    assert set(store._windows) == {"d", "e"}
+
+
+@pytest.mark.usefixtures("store")
+def test_limit_weights_previous_window(clock: Clock) -> None:
+    limiter = RateLimit("login", limit=4, window_seconds=WINDOW_SECONDS)
+    assert [hit(limiter) for _ in range(4)] == [None] * 4
+    assert hit(limiter) == WINDOW_SECONDS
+
+    # at the start of the next window the previous one is still fully counted
+    clock.now += WINDOW_SECONDS
+    assert hit(limiter) == WINDOW_SECONDS
+
+    # 3/4 into the window, 1/4 of the 5 previous hits are counted with the 2 current
+    clock.now += WINDOW_SECONDS * 0.75
+    assert hit(limiter) is None
+    assert hit(limiter) == WINDOW_SECONDS // 4
+
+
+@pytest.mark.usefixtures("store")
+def test_limit_per_key() -> None:
+    limiter = RateLimit("login", limit=1, window_seconds=WINDOW_SECONDS)
+    assert hit(limiter, "203.0.113.7") is None
+    assert hit(limiter, "203.0.113.7") is not None
+    assert hit(limiter, "203.0.113.8") is None
+    # the same identity in another scope
+    assert hit(RateLimit("signup", 1, WINDOW_SECONDS), "203.0.113.7") is None
+
+
+def request(forwarded_for: str | None = None) -> Request:
+    headers = [(b"x-forwarded-for", forwarded_for.encode())] if forwarded_for else []
+    return Request({"type": "http", "headers": headers, "client": ("10.0.0.2", 4321)})
+
+
+def test_client_ip(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUST_X_FORWARDED_FOR", False)
+    assert client_ip(request("203.0.113.7, 10.0.0.1")) == "10.0.0.2"
+
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUST_X_FORWARDED_FOR", True)
+    assert client_ip(request("203.0.113.7, 10.0.0.1")) == "203.0.113.7"
+    assert client_ip(request()) == "10.0.0.2"
+
+
+def test_client_ip_without_client() -> None:
+    assert client_ip(Request({"type": "http", "headers": []})) == "unknown"
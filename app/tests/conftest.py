@@ -0,0 +1,66 @@
+"""The tests run against the database of the settings, migrated to the head revision.
+
+Usage:
+    alembic upgrade head && pytest app/tests
+"""
+
+import os
+from collections.abc import Awaitable, Callable, Iterator
+
+import pytest
+
+# the jobs would change the status of the events created by the tests
+os.environ.setdefault("SCHEDULER_ENABLED", "false")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import Engine, create_engine  # noqa: E402
+from sqlmodel import Session, delete  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Event, User  # noqa: E402
+from app.tests.utils import create_event, create_user  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client() -> Iterator[TestClient]:
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture(scope="session")
+def run(client: TestClient) -> Callable[..., Awaitable]:
+    """Runs a coroutine function on the event loop of the app, where the connections of
+    its engines were opened, e.g. `run(Tag.objects.autocomplete, "py")`"""
+    return client.portal.call
+
+
+@pytest.fixture(scope="session")
+def db_engine() -> Iterator[Engine]:
+    engine = create_engine(str(settings.DATABASE_URI))
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(db_engine: Engine) -> Iterator[Session]:
+    """Session creating the rows of the test, they are deleted after it"""
+    with Session(db_engine, expire_on_commit=False) as session:
+        yield session
+
+
+@pytest.fixture
+def user(db: Session) -> Iterator[User]:
+    user = create_user(db)
+    yield user
+    db.exec(delete(User).where(User.id == user.id))
+    db.commit()
+
+
+@pytest.fixture
+def event(db: Session) -> Iterator[Event]:
+    event = create_event(db)
+    yield event
+    db.exec(delete(Event).where(Event.id == event.id))
+    db.commit()
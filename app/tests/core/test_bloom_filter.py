@@ -0,0 +1,72 @@
+import uuid
+
+import pytest
+
+from app.core.bloom_filter import BloomFilter
+from app.core.config import settings
+from app.models.managers.revoked_tokens import RevokedTokenFilter
+
+
+def jtis(count: int) -> list[str]:
+    return [uuid.uuid4().hex for _ in range(count)]
+
+
+def test_bloom_filter_no_false_negatives() -> None:
+    items = jtis(10_000)
+    bloom_filter = BloomFilter.from_items(items, capacity=10_000, error_rate=0.001)
+    assert all(item in bloom_filter for item in items)
+
+    false_positives = sum(item in bloom_filter for item in jtis(10_000))
+    assert false_positives < 50
+
+
+def test_bloom_filter_empty() -> None:
+    bloom_filter = BloomFilter(capacity=0)
+    assert bloom_filter.capacity == 1
+    assert "jti" not in bloom_filter
+
+
+def test_revoked_filter_before_load() -> None:
+    revoked_filter = RevokedTokenFilter()
+    # every token is checked against the database until the filter is loaded
+    assert revoked_filter.might_contain(uuid.uuid4().hex)
+    revoked_filter.add("jti")
+    assert revoked_filter.might_contain(uuid.uuid4().hex)
+
+
+def test_revoked_filter_load() -> None:
+    revoked, not_revoked = jtis(100), jtis(100)
+    revoked_filter = RevokedTokenFilter()
+    revoked_filter.start_load()
+    revoked_filter.load(revoked[:50])
+    revoked_filter.add(revoked[50])
+    assert all(revoked_filter.might_contain(jti) for jti in revoked[:51])
+    assert sum(revoked_filter.might_contain(jti) for jti in not_revoked) < 5
+
+
+def test_revoked_filter_keeps_revocations_during_rebuild() -> None:
+    revoked = jtis(3)
+    revoked_filter = RevokedTokenFilter()
+    revoked_filter.start_load()
+    revoked_filter.load(revoked[:1])
+
+    # revoked after the rebuild read the table, missing from the jtis it loads
+    revoked_filter.start_load()
+    revoked_filter.add(revoked[1])
+    revoked_filter.load(revoked[:1])
+    revoked_filter.add(revoked[2])
+    assert all(revoked_filter.might_contain(jti) for jti in revoked)
+
+
+def test_revoked_filter_expires(monkeypatch: pytest.MonkeyPatch) -> None:
+    revoked_filter = RevokedTokenFilter()
+    revoked_filter.start_load()
+    revoked_filter.load([])
+    jti = uuid.uuid4().hex
+    assert not revoked_filter.is_expired
+    assert not revoked_filter.might_contain(jti)
+
+    # not rebuilt for 3 refresh intervals, the revocations of other workers are missed
+    monkeypatch.setattr(settings, "REVOKED_TOKENS_FILTER_REFRESH_SECONDS", 0)
+    assert revoked_filter.is_expired
+    assert revoked_filter.might_contain(jti)
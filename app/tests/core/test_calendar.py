@@ -0,0 +1,172 @@
+from datetime import UTC, datetime, timedelta
+from email.utils import format_datetime as format_http_date
+
+import pytest
+from fastapi import Request
+
+from app.core.calendar import LINE_OCTETS, content_line, escape_text, is_not_modified
+from app.core.config import settings
+from app.core.utils import aware_datetime_now
+from app.models import Event
+from app.models.events import EventMode, EventPublicationStatus
+from app.models.managers.events import CalendarFeed
+
+ETAG = '"0123456789abcdef"'
+LAST_MODIFIED = datetime(2026, 10, 19, 12, 0, tzinfo=UTC)
+
+
+def unfold(line: bytes) -> bytes:
+    return line.removesuffix(b"\r\n").replace(b"\r\n ", b"")
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "a" * (LINE_OCTETS - len("SUMMARY:")),
+        "a" * 200,
+        # 2, 3 and 4 octets characters straddling the fold boundaries
+        "é" * 100,
+        "a" + "€" * 100,
+        "ab" + "🎉" * 60,
+    ],
+)
+def test_content_line_folding(value: str) -> None:
+    line = content_line("SUMMARY", value)
+    assert line.endswith(b"\r\n")
+    physical_lines = line.removesuffix(b"\r\n").split(b"\r\n")
+    assert all(len(physical_line) <= LINE_OCTETS for physical_line in physical_lines)
+    assert all(physical_line.startswith(b" ") for physical_line in physical_lines[1:])
+    # every folded line is valid utf-8 on its own
+    for physical_line in physical_lines:
+        physical_line.decode()
+    assert unfold(line).decode() == f"SUMMARY:{value}"
+
+
+def test_content_line_not_folded() -> None:
+    value = "a" * (LINE_OCTETS - len("SUMMARY:"))
+    assert content_line("SUMMARY", value) == f"SUMMARY:{value}\r\n".encode()
+
+
+def test_escape_text() -> None:
+    assert escape_text("a\\b;c,d") == r"a\\b\;c\,d"
+    assert escape_text("line\r\nbreak\nend") == r"line\nbreak\nend"
+    assert escape_text("PyCon: Lagos") == "PyCon: Lagos"
+
+
+def request(**headers: str) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "headers": [
+                (name.replace("_", "-").encode(), value.encode())
+                for name, value in headers.items()
+            ],
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    ("headers", "not_modified"),
+    [
+        ({}, False),
+        ({"if_none_match": ETAG}, True),
+        ({"if_none_match": f'"other", W/{ETAG}'}, True),
+        ({"if_none_match": "*"}, True),
+        ({"if_none_match": '"other"'}, False),
+        # If-Modified-Since is ignored with If-None-Match
+        (
+            {
+                "if_none_match": '"other"',
+                "if_modified_since": format_http_date(LAST_MODIFIED, usegmt=True),
+            },
+            False,
+        ),
+        ({"if_modified_since": format_http_date(LAST_MODIFIED, usegmt=True)}, True),
+        (
+            {
+                "if_modified_since": format_http_date(
+                    LAST_MODIFIED + timedelta(days=1), usegmt=True
+                )
+            },
+            True,
+        ),
+        (
+            {
+                "if_modified_since": format_http_date(
+                    LAST_MODIFIED - timedelta(seconds=1), usegmt=True
+                )
+            },
+            False,
+        ),
+        ({"if_modified_since": "yesterday"}, False),
+    ],
+)
+def test_is_not_modified(headers: dict[str, str], not_modified: bool) -> None:
+    assert is_not_modified(request(**headers), ETAG, LAST_MODIFIED) is not_modified
+
+
+def build_event(**values) -> Event:
+    starts_at = aware_datetime_now() + timedelta(days=7)
+    values = {
+        "status": EventPublicationStatus.OPEN,
+        "mode_of_attending": EventMode.VIRTUAL,
+        "title": "PyCon",
+        "starts_at": starts_at,
+        "ends_at": starts_at + timedelta(hours=8),
+        "link": "https://eventtrakka.com/live",
+        "last_updated_at": aware_datetime_now(),
+        **values,
+    }
+    return Event(**values)
+
+
+def is_listed(event: Event) -> bool:
+    return event.status == EventPublicationStatus.OPEN
+
+
+def test_feed_apply_etag() -> None:
+    feed = CalendarFeed()
+    events = [build_event(), build_event(title="DjangoCon")]
+    feed.apply("Events", events, is_listed, is_complete=True)
+    etag = feed.etag
+    assert etag
+    assert b"SUMMARY:DjangoCon\r\n" in feed.body
+
+    # fetched again unchanged
+    feed.apply("Events", events, is_listed)
+    assert feed.etag == etag
+    feed.apply("Events", [], is_listed)
+    assert feed.etag == etag
+
+    events[1].title = "DjangoCon Africa"
+    feed.apply("Events", events[1:], is_listed)
+    assert feed.etag != etag
+    assert b"SUMMARY:DjangoCon Africa\r\n" in feed.body
+
+    etag = feed.etag
+    events[0].status = EventPublicationStatus.DRAFT
+    feed.apply("Events", events[:1], is_listed)
+    assert feed.etag != etag
+    assert b"SUMMARY:PyCon\r\n" not in feed.body
+
+
+def test_feed_full_refresh(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "EVENT_FEED_FULL_REFRESH_EVERY", 2)
+    feed = CalendarFeed()
+    assert feed.updated_after is None
+    events = [build_event(), build_event(title="DjangoCon")]
+    feed.apply("Events", events, is_listed, is_complete=True)
+    assert feed.updated_after == max(e.last_updated_at for e in events) - (
+        CalendarFeed.WATERMARK_OVERLAP
+    )
+
+    # deleted by another worker, an incremental refresh does not fetch it
+    feed.apply("Events", [], is_listed)
+    assert b"SUMMARY:DjangoCon\r\n" in feed.body
+    feed.apply("Events", [], is_listed)
+    assert feed.updated_after is None
+    etag = feed.etag
+    feed.apply("Events", events[:1], is_listed, is_complete=True)
+    assert b"SUMMARY:DjangoCon\r\n" not in feed.body
+    assert feed.etag != etag
+    assert feed.updated_after is not None
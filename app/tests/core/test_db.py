@@ -0,0 +1,121 @@
+"""Read routing tests, the ones reading from a replica need a second DSN of the database
+(e.g. a streaming replica, or the primary under another host name) in
+`TEST_DATABASE_REPLICA_URI`, they are skipped without it."""
+
+import itertools
+import os
+import uuid
+from collections.abc import Awaitable, Callable, Iterator
+
+import pytest
+from sqlmodel import Session, delete, select, update
+
+from app.core import db as database
+from app.core.config import settings
+from app.core.db import Replica, get_db_session, route_request_reads
+from app.models import RateLimitWindow, User
+
+
+async def execute(statement) -> None:
+    async for session in get_db_session():
+        await session.execute(statement)
+        await session.commit()
+
+
+@pytest.fixture
+def rate_limit_key(db: Session) -> Iterator[str]:
+    key = f"test:{uuid.uuid4().hex}"
+    yield key
+    db.exec(delete(RateLimitWindow).where(RateLimitWindow.key == key))
+    db.commit()
+
+
+def test_write_detection(
+    run: Callable[..., Awaitable], user: User, rate_limit_key: str
+) -> None:
+    async def writes() -> list[bool]:
+        with route_request_reads() as routing:
+            wrote = []
+            await execute(
+                select(select(User.id).where(User.id == user.id).cte("users").c.id)
+            )
+            wrote.append(routing.wrote)
+            await RateLimitWindow.objects.hit(rate_limit_key, 60)
+            wrote.append(routing.wrote)
+            # changes no row
+            await execute(delete(User).where(User.id == uuid.uuid4()))
+            wrote.append(routing.wrote)
+            await execute(
+                update(User).where(User.id == user.id).values(first_name="John")
+            )
+            wrote.append(routing.wrote)
+            return wrote
+
+    assert run(writes) == [False, False, False, True]
+
+
+def set_replicas(monkeypatch: pytest.MonkeyPatch, replicas: list[Replica]) -> None:
+    monkeypatch.setattr(database, "replicas", replicas)
+    monkeypatch.setattr(database, "_next_replicas", itertools.cycle(replicas))
+    monkeypatch.setattr(settings, "REPLICA_LAG_CHECK_INTERVAL_SECONDS", 0)
+
+
+@pytest.fixture
+def replica(
+    run: Callable[..., Awaitable], monkeypatch: pytest.MonkeyPatch
+) -> Iterator[Replica]:
+    uri = os.environ.get("TEST_DATABASE_REPLICA_URI")
+    if not uri:
+        pytest.skip("TEST_DATABASE_REPLICA_URI is not set")
+    replica = Replica(uri)
+    set_replicas(monkeypatch, [replica])
+    yield replica
+    run(replica.engine.dispose)
+
+
+def test_read_your_writes(
+    run: Callable[..., Awaitable], replica: Replica, user: User
+) -> None:
+    async def read_engines() -> list:
+        engines = [await database._read_engine()]
+        with route_request_reads():
+            engines.append(await database._read_engine())
+            await execute(
+                update(User).where(User.id == user.id).values(first_name="John")
+            )
+            engines.append(await database._read_engine())
+        return engines
+
+    # the reads outside of a request are served by the primary
+    assert run(read_engines) == [database.engine, replica.engine, database.engine]
+    assert replica.lag_seconds == 0
+
+
+def test_replica_lag_guard(
+    run: Callable[..., Awaitable], replica: Replica, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    async def read_engine():
+        with route_request_reads():
+            return await database._read_engine()
+
+    monkeypatch.setattr(settings, "REPLICA_MAX_LAG_SECONDS", -1)
+    assert run(read_engine) is database.engine
+    monkeypatch.setattr(settings, "REPLICA_MAX_LAG_SECONDS", 5)
+    assert run(read_engine) is replica.engine
+
+
+def test_unreachable_replica(
+    run: Callable[..., Awaitable], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    replica = Replica("postgresql+psycopg://postgres@localhost:1/eventtrakka")
+    set_replicas(monkeypatch, [replica])
+
+    async def read_engine():
+        with route_request_reads():
+            return await database._read_engine()
+
+    try:
+        assert run(read_engine) is database.engine
+        assert replica.lag_seconds == float("inf")
+    finally:
+        run(replica.engine.dispose)
@@ -0,0 +1,74 @@
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+
+@pytest.fixture
+def registry() -> MetricsRegistry:
+    registry = MetricsRegistry()
+    registry.register(Counter("requests_total", "Requests", labels=("route",)))
+    registry.register(Gauge("in_flight", "Requests being processed"))
+    registry.register(Histogram("duration_seconds", "Duration", buckets=(0.1, 1)))
+    return registry
+
+
+def record(registry: MetricsRegistry, requests: int, in_flight: int) -> None:
+    registry._metrics["requests_total"].inc(requests, route="/events/")
+    registry._metrics["in_flight"].set(in_flight)
+    registry._metrics["duration_seconds"].observe(0.5)
+
+
+def test_render_labels_the_worker(registry: MetricsRegistry) -> None:
+    record(registry, requests=3, in_flight=1)
+    lines = registry.render().splitlines()
+    worker = os.getpid()
+    assert f'requests_total{{worker="{worker}",route="/events/"}} 3.0' in lines
+    assert f'in_flight{{worker="{worker}"}} 1.0' in lines
+    assert f'duration_seconds_bucket{{worker="{worker}",le="1.0"}} 1' in lines
+
+
+def test_render_merges_the_workers(registry: MetricsRegistry) -> None:
+    record(registry, requests=3, in_flight=1)
+    first = json.loads(json.dumps(registry.dump()))
+    record(registry, requests=2, in_flight=4)
+    second = registry.dump()
+
+    lines = registry.render({"1": first, "2": second}).splitlines()
+    # the counters and histograms are summed, the gauges kept apart
+    assert 'requests_total{route="/events/"} 8.0' in lines
+    assert 'in_flight{worker="1"} 1.0' in lines
+    assert 'in_flight{worker="2"} 4.0' in lines
+    assert 'duration_seconds_bucket{le="0.1"} 0' in lines
+    assert 'duration_seconds_bucket{le="1.0"} 3' in lines
+    assert "duration_seconds_sum 1.5" in lines
+    assert "duration_seconds_count 3" in lines
+
+
+def test_render_workers_files(
+    registry: MetricsRegistry, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, "METRICS_MULTIPROCESS_DIR", str(tmp_path))
+    record(registry, requests=2, in_flight=4)
+    # the file of a worker that exited
+    exited = registry.dump()
+    (tmp_path / "1.json").write_text(json.dumps(exited))
+    stale_at = time.time() - 3 * settings.METRICS_WRITE_INTERVAL_SECONDS - 1
+    os.utime(tmp_path / "1.json", (stale_at, stale_at))
+    record(registry, requests=1, in_flight=1)
+
+    lines = asyncio.run(registry.render_workers()).splitlines()
+    assert 'requests_total{route="/events/"} 5.0' in lines
+    assert [line for line in lines if line.startswith("in_flight{")] == [
+        f'in_flight{{worker="{os.getpid()}"}} 1.0'
+    ]
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "1.json",
+        f"{os.getpid()}.json",
+    ]
@@ -0,0 +1,131 @@
+import asyncio
+import random
+from collections.abc import Awaitable, Callable, Iterator
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import Engine
+from sqlmodel import Session, delete, select
+
+from app.core.config import settings
+from app.core.scheduler import Scheduler
+from app.core.utils import aware_datetime_now
+from app.models import Event
+from app.models.events import EventPublicationStatus
+from app.tests.utils import create_event
+
+
+@pytest.fixture(autouse=True)
+def scheduler_settings(monkeypatch: pytest.MonkeyPatch) -> None:
+    # a lock of its own, a scheduler of a running server would hold the default one
+    monkeypatch.setattr(settings, "SCHEDULER_LOCK_KEY", random.getrandbits(62))
+    monkeypatch.setattr(settings, "SCHEDULER_LEADER_RETRY_SECONDS", 0.05)
+
+
+@pytest.fixture
+def ended_events(db: Session) -> Iterator[list[Event]]:
+    ends_at = aware_datetime_now() - timedelta(days=1)
+    events = [
+        create_event(db, starts_at=ends_at - timedelta(hours=8), ends_at=ends_at)
+        for _ in range(3)
+    ]
+    yield events
+    db.exec(delete(Event).where(Event.id.in_([event.id for event in events])))
+    db.commit()
+
+
+def counting_scheduler(runs: list[str], name: str) -> Scheduler:
+    async def job() -> int:
+        runs.append(name)
+        return 0
+
+    scheduler = Scheduler()
+    scheduler.add_job("count", job, interval_seconds=3600)
+    return scheduler
+
+
+def statuses(db: Session, events: list[Event]) -> set[EventPublicationStatus]:
+    db.expire_all()
+    return set(
+        db.exec(
+            select(Event.status).where(Event.id.in_([event.id for event in events]))
+        )
+    )
+
+
+def test_only_the_leader_runs_jobs(run: Callable[..., Awaitable]) -> None:
+    runs: list[str] = []
+    first = counting_scheduler(runs, "first")
+    second = counting_scheduler(runs, "second")
+
+    async def elect() -> None:
+        first.start()
+        second.start()
+        await asyncio.sleep(0.5)
+
+    async def stop(*schedulers: Scheduler) -> None:
+        for scheduler in schedulers:
+            await scheduler.stop()
+
+    try:
+        run(elect)
+        assert [first.is_leader, second.is_leader].count(True) == 1
+        leader, follower = (first, second) if first.is_leader else (second, first)
+        assert len(runs) == 1
+        assert leader.jobs["count"].stats.runs == 1
+        assert follower.jobs["count"].stats.runs == 0
+
+        # the advisory lock is released when the leader stops, the follower takes it
+        run(stop, leader)
+        run(asyncio.sleep, 0.5)
+        assert follower.is_leader
+        assert follower.jobs["count"].stats.runs == 1
+    finally:
+        run(stop, first, second)
+
+
+def test_transition_status_batches(
+    db: Session,
+    run: Callable[..., Awaitable],
+    ended_events: list[Event],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    invalidations = []
+    monkeypatch.setattr(settings, "SCHEDULER_BATCH_SIZE", 2)
+    monkeypatch.setattr(
+        Event.objects, "invalidate_calendar_feeds", lambda: invalidations.append(1)
+    )
+
+    assert run(Event.objects.close_ended_events) >= len(ended_events)
+    assert statuses(db, ended_events) == {EventPublicationStatus.CLOSE}
+    # one invalidation per committed batch
+    assert len(invalidations) >= 2
+
+    # the archived events ended more than EVENT_ARCHIVE_AFTER_DAYS ago
+    run(Event.objects.archive_closed_events)
+    assert statuses(db, ended_events) == {EventPublicationStatus.CLOSE}
+    monkeypatch.setattr(settings, "EVENT_ARCHIVE_AFTER_DAYS", 0)
+    invalidations.clear()
+    assert run(Event.objects.archive_closed_events) >= len(ended_events)
+    assert statuses(db, ended_events) == {EventPublicationStatus.ARCHIVE}
+    assert invalidations
+
+
+def test_transition_status_skips_locked_rows(
+    db: Session,
+    db_engine: Engine,
+    run: Callable[..., Awaitable],
+    ended_events: list[Event],
+) -> None:
+    locked, *others = ended_events
+    with Session(db_engine) as lock_session:
+        lock_session.exec(
+            select(Event.id).where(Event.id == locked.id).with_for_update()
+        ).one()
+        run(Event.objects.close_ended_events)
+        assert statuses(db, others) == {EventPublicationStatus.CLOSE}
+        assert statuses(db, [locked]) == {EventPublicationStatus.OPEN}
+
+    # picked up by the next run once the lock is released
+    run(Event.objects.close_ended_events)
+    assert statuses(db, [locked]) == {EventPublicationStatus.CLOSE}
@@ -0,0 +1,61 @@
+import base64
+import uuid
+from datetime import timedelta
+
+import pytest
+
+from app.core import utils
+from app.core.utils import aware_datetime_now, decode_cursor, encode_cursor, uuid7
+
+
+class Clock:
+    def __init__(self, now_ns: int):
+        self.now_ns = now_ns
+
+    def time_ns(self) -> int:
+        return self.now_ns
+
+
+def test_uuid7_version_and_variant() -> None:
+    before_ms = utils.time.time_ns() // 1_000_000
+    id = uuid7()
+    assert id.version == 7
+    assert id.variant == uuid.RFC_4122
+    assert before_ms <= id.int >> 80 <= before_ms + 1_000
+
+
+def test_uuid7_monotonic_in_the_same_millisecond(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    clock = Clock(utils.time.time_ns())
+    monkeypatch.setattr(utils, "time", clock)
+    ids = [uuid7() for _ in range(1_000)]
+    assert ids == sorted(set(ids))
+    assert {id.int >> 80 for id in ids} == {clock.now_ns // 1_000_000}
+    assert all(id.version == 7 and id.variant == uuid.RFC_4122 for id in ids)
+
+    # the clock went back
+    clock.now_ns -= 10**9
+    assert uuid7() > ids[-1]
+
+
+def test_cursor_round_trip() -> None:
+    created_at = aware_datetime_now() - timedelta(microseconds=1)
+    id = uuid7()
+    assert decode_cursor(encode_cursor(created_at, id)) == (created_at, id)
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "",
+        "not a cursor",
+        base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+        base64.urlsafe_b64encode(b"2024-01-01T00:00:00+00:00").decode(),
+        base64.urlsafe_b64encode(b"2024-01-01T00:00:00+00:00|not-a-uuid").decode(),
+        base64.urlsafe_b64encode(f"yesterday|{uuid.uuid4()}".encode()).decode(),
+    ],
+)
+def test_decode_invalid_cursor(cursor: str) -> None:
+    with pytest.raises(ValueError, match="invalid cursor"):
+        decode_cursor(cursor)
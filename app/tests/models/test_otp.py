@@ -0,0 +1,64 @@
+from collections.abc import Awaitable, Callable
+from datetime import timedelta
+
+import pytest
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.utils import aware_datetime_now
+from app.models import User
+from app.models.otp import OTPPurpose, OTPRecord
+
+
+def create_otp(db: Session, user: User, expires_in: timedelta) -> OTPRecord:
+    otp = OTPRecord(
+        user_id=user.id,
+        purpose=OTPPurpose.EMAIL_VERIFICATION,
+        expires_at=aware_datetime_now() + expires_in,
+    )
+    db.add(otp)
+    db.commit()
+    return otp
+
+
+def test_consume_once(db: Session, run: Callable[..., Awaitable], user: User) -> None:
+    otp = create_otp(db, user, timedelta(minutes=5))
+    args = (user.id, OTPPurpose.EMAIL_VERIFICATION, otp.code)
+
+    assert run(OTPRecord.objects.is_valid, *args)
+    assert run(OTPRecord.objects.consume, *args, {"first_name": "John"}) == otp.id
+    db.refresh(user)
+    assert user.first_name == "John"
+
+    assert not run(OTPRecord.objects.is_valid, *args)
+    with pytest.raises(OTPRecord.DoesNotExist):
+        run(OTPRecord.objects.consume, *args)
+
+
+def test_consume_expired(
+    db: Session, run: Callable[..., Awaitable], user: User
+) -> None:
+    otp = create_otp(db, user, -timedelta(seconds=1))
+    args = (user.id, OTPPurpose.EMAIL_VERIFICATION, otp.code)
+
+    assert not run(OTPRecord.objects.is_valid, *args)
+    with pytest.raises(OTPRecord.DoesNotExist):
+        run(OTPRecord.objects.consume, *args, {"first_name": "John"})
+    db.refresh(user)
+    assert user.first_name == "Jane"
+
+
+def test_delete_expired(
+    db: Session,
+    run: Callable[..., Awaitable],
+    user: User,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(settings, "SCHEDULER_BATCH_SIZE", 2)
+    expired = [create_otp(db, user, -timedelta(minutes=1)) for _ in range(3)]
+    unexpired = create_otp(db, user, timedelta(minutes=5))
+
+    assert run(OTPRecord.objects.delete_expired) >= len(expired)
+    assert set(db.exec(select(OTPRecord.id).where(OTPRecord.user_id == user.id))) == {
+        unexpired.id
+    }
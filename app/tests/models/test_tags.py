@@ -0,0 +1,114 @@
+import uuid
+from collections.abc import Callable, Iterator
+
+import pytest
+from sqlmodel import Session, delete
+
+from app.core.config import settings
+from app.models import Tag
+from app.models.managers.tags import TagIndexEntry, TagPrefixIndex
+
+
+def entry(value: str, usage_count: int = 0) -> TagIndexEntry:
+    return TagIndexEntry(uuid.uuid4(), value, usage_count)
+
+
+@pytest.fixture
+def index() -> TagPrefixIndex:
+    index = TagPrefixIndex()
+    index.load(
+        [
+            entry("Rust"),
+            entry("pytest", 5),
+            entry("Python", 40),
+            entry("py"),
+            entry("PyCon", 12),
+            entry("pz"),
+            entry("p"),
+        ],
+        is_complete=True,
+    )
+    return index
+
+
+def values(entries: list[TagIndexEntry]) -> list[str]:
+    return [entry.value for entry in entries]
+
+
+def test_search_prefix_bounds(index: TagPrefixIndex) -> None:
+    assert set(values(index.search("py", 10))) == {"py", "PyCon", "Python", "pytest"}
+    assert values(index.search("pyt", 10)) == ["Python", "pytest"]
+    assert values(index.search("pz", 10)) == ["pz"]
+    # before the first and after the last key
+    assert values(index.search("a", 10)) == []
+    assert values(index.search("zz", 10)) == []
+
+
+def test_search_case_folding(index: TagPrefixIndex) -> None:
+    assert values(index.search("PYT", 10)) == values(index.search("pyt", 10))
+    assert values(index.search("rUs", 10)) == ["Rust"]
+
+
+def test_search_orders_by_usage_count(index: TagPrefixIndex) -> None:
+    assert values(index.search("py", 10))[:3] == ["Python", "PyCon", "pytest"]
+    assert values(index.search("py", 2)) == ["Python", "PyCon"]
+
+
+def test_short_prefix_results_until_next_load(index: TagPrefixIndex) -> None:
+    assert values(index.search("ru", 10)) == ["Rust"]
+    index.invalidate()
+    assert index.is_stale
+    index.load([entry("Rust"), entry("Ruby", 3)], is_complete=True)
+    assert values(index.search("ru", 10)) == ["Ruby", "Rust"]
+
+
+@pytest.fixture
+def prefix_index() -> Iterator[None]:
+    """The prefix index of `Tag.objects` is rebuilt after the test"""
+    yield
+    Tag.objects.invalidate_prefix_index()
+
+
+@pytest.fixture
+def tags(db: Session) -> Iterator[Callable[..., Tag]]:
+    created: list[Tag] = []
+
+    def create_tag(value: str, usage_count: int = 0) -> Tag:
+        tag = Tag(value=value, usage_count=usage_count)
+        db.add(tag)
+        db.commit()
+        created.append(tag)
+        return tag
+
+    yield create_tag
+    db.exec(delete(Tag).where(Tag.id.in_([tag.id for tag in created])))
+    db.commit()
+
+
+@pytest.mark.usefixtures("prefix_index")
+def test_autocomplete_invalidate_prefix_index(
+    run: Callable, tags: Callable[..., Tag]
+) -> None:
+    # no other tag starts with these characters
+    prefix = "ǂǂ"
+    assert run(Tag.objects.autocomplete, prefix) == []
+    tags(f"{prefix}{uuid.uuid4().hex[:16]}")
+    # the short prefix result is memoized until the index is rebuilt
+    assert run(Tag.objects.autocomplete, prefix) == []
+    Tag.objects.invalidate_prefix_index()
+    assert len(run(Tag.objects.autocomplete, prefix)) == 1
+
+
+@pytest.mark.usefixtures("prefix_index")
+def test_autocomplete_database_fallback(
+    run: Callable, tags: Callable[..., Tag], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    prefix = f"ǂ{uuid.uuid4().hex[:8]}"
+    popular = tags(f"{prefix}-Popular", usage_count=7)
+    rare = tags(f"{prefix}-rare", usage_count=1)
+    # the index only holds part of the tags
+    monkeypatch.setattr(settings, "TAG_INDEX_MAX_SIZE", 0)
+    Tag.objects.invalidate_prefix_index()
+    suggestions = run(Tag.objects.autocomplete, prefix.upper())
+    assert not Tag.objects.prefix_index.is_complete
+    assert [suggestion.id for suggestion in suggestions] == [popular.id, rare.id]
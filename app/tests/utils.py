@@ -0,0 +1,106 @@
+import uuid
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from datetime import timedelta
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.query_stats import QueryStats, collect_queries
+from app.core.security import get_password_hash
+from app.core.utils import aware_datetime_now
+from app.models import Event, Organization, User
+from app.models.events import EventMode, EventPublicationStatus
+from app.models.organizations import OrganizationMember, OrganizationMemberPermission
+
+USER_PASSWORD = "correct-horse-battery-staple"
+
+
+@contextmanager
+def assert_max_queries(max_queries: int) -> Iterator[QueryStats]:
+    """Fails the test if the block executes more than `max_queries` SQL statements,
+    to keep the number of queries of hot endpoints from growing unnoticed.
+
+    Example:
+        with assert_max_queries(3):
+            response = client.get(f"{settings.API_V1_STR}/events/public/")
+    """
+    with collect_queries() as stats:
+        yield stats
+    assert stats.queries <= max_queries, (
+        f"expected at most {max_queries} queries, got {stats.summary()}"
+    )
+
+
+def create_user(db: Session, **values) -> User:
+    values = {
+        "email": f"{uuid.uuid4().hex}@eventtrakka.com",
+        "password": get_password_hash(USER_PASSWORD),
+        "first_name": "Jane",
+        "last_name": "Doe",
+        "is_email_verified": True,
+        **values,
+    }
+    user = User(**values)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def create_event(db: Session, **values) -> Event:
+    starts_at = aware_datetime_now() + timedelta(days=7)
+    values = {
+        "status": EventPublicationStatus.OPEN,
+        "mode_of_attending": EventMode.VIRTUAL,
+        "title": "PyCon",
+        "theme": None,
+        "description": None,
+        "starts_at": starts_at,
+        "ends_at": starts_at + timedelta(hours=8),
+        "location": None,
+        "link": "https://eventtrakka.com/live",
+        "passcode": None,
+        **values,
+    }
+    event = Event(**values)
+    db.add(event)
+    db.commit()
+    return event
+
+
+def create_organization(
+    db: Session,
+    owner: User,
+    members: Sequence[tuple[User, list[OrganizationMemberPermission]]] = (),
+) -> Organization:
+    """Creates the organization of `owner` with every permission and `members`"""
+    organization = Organization(
+        name=f"Organization {uuid.uuid4().hex}",
+        about=None,
+        owner_id=owner.id,
+        members=[
+            OrganizationMember(
+                id=owner.id,
+                role="Owner",
+                permissions=list(OrganizationMemberPermission),
+            ),
+            *(
+                OrganizationMember(id=member.id, role="Member", permissions=permissions)
+                for member, permissions in members
+            ),
+        ],
+    )
+    db.add(organization)
+    db.commit()
+    return organization
+
+
+def login(client: TestClient, user: User) -> dict[str, str]:
+    """The authorization header of an access token of the user"""
+    response = client.post(
+        f"{settings.API_V1_STR}/auth/access-token/",
+        data={"username": user.email, "password": USER_PASSWORD},
+    )
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['data']['access_token']}"}
@@ -0,0 +1,97 @@
+"""Compares the throughput of event lookups by id under the connection
+policies of `DB_POOLER_MODE`: a queue pool with server-side prepared statements, a
+queue pool without them (transaction pooling) and no pool at all (every checkout
+opens a connection, as behind an external pooler with `DB_POOL_CLASS=null`).
+
+Point `--uri` at a PgBouncer to measure the pooler itself, the database configured by
+the `POSTGRES_*` settings is used otherwise. The lookups read the seeded events of
+`benchmarks.load.seed`, a query this cheap is where planning it again each time costs
+the most.
+
+Usage:
+    python -m benchmarks.db_pooler [--uri postgresql+psycopg://...]
+        [--concurrency 32] [--queries 5000]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.db import build_engine
+from app.models.events import Event
+
+POLICIES = {
+    "queue_prepared": {"pool_class": "queue", "prepare_threshold": 5},
+    "queue_unprepared": {"pool_class": "queue", "prepare_threshold": None},
+    "null_unprepared": {"pool_class": "null", "prepare_threshold": None},
+}
+
+
+async def sample_event_ids(uri: str) -> list[uuid.UUID]:
+    engine = build_engine(uri, pool_class="null", prepare_threshold=None)
+    try:
+        async with engine.connect() as connection:
+            return list(
+                (await connection.execute(select(Event.id).limit(1000))).scalars()
+            )
+    finally:
+        await engine.dispose()
+
+
+async def measure(
+    uri: str, policy: dict, event_ids: list[uuid.UUID], concurrency: int, queries: int
+) -> dict:
+    engine = build_engine(uri, **policy)
+    remaining = 0
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            async with engine.connect() as connection:
+                await connection.execute(
+                    select(Event).where(Event.id == random.choice(event_ids))
+                )
+
+    try:
+        # warm up the pool and the prepared statements of its connections
+        remaining = concurrency * 10
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        remaining = queries
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    finally:
+        await engine.dispose()
+    return {"queries": queries, "queries_per_second": round(queries / elapsed, 1)}
+
+
+async def run(args: argparse.Namespace) -> dict:
+    event_ids = await sample_event_ids(args.uri)
+    if not event_ids:
+        sys.exit("the database is not seeded, run `python -m benchmarks.load.seed`")
+    return {
+        name: await measure(args.uri, policy, event_ids, args.concurrency, args.queries)
+        for name, policy in POLICIES.items()
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--uri", default=str(settings.DATABASE_URI))
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--queries", type=int, default=5000)
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
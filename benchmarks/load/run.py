@@ -0,0 +1,340 @@
+"""Drives the auth, listing and RSVP flows of the API at a fixed concurrency and
+reports the throughput and latency percentiles of each flow as JSON.
+
+The app is served by uvicorn with the SMTP stand-in (`app/extras/email_test_server.py`)
+unless `--base-url` points to a running instance. The database must be seeded with
+`benchmarks.load.seed` first.
+
+Usage:
+    python -m benchmarks.load.run [--concurrency 32] [--requests 2000]
+        [--workers 1] [--output results.json] [--baseline previous-results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import UTC, datetime
+
+import httpx
+
+from app.core.config import settings
+from benchmarks.load.seed import SEED_EMAIL_DOMAIN, SEED_PASSWORD, connect
+
+API = settings.API_V1_STR
+SMTP_PORT = 1026
+
+
+@dataclass
+class Scenario:
+    name: str
+    send: Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+    expected_status: int
+
+
+@dataclass
+class SeedData:
+    user_emails: list[str]
+    open_event_ids: list[str]
+    access_tokens: list[str]
+
+
+def load_seed_data() -> SeedData:
+    with connect() as connection:
+        user_emails = [
+            row[0]
+            for row in connection.execute(
+                f"SELECT email FROM users WHERE email LIKE 'user-%%@{SEED_EMAIL_DOMAIN}'"
+                " ORDER BY email LIMIT 1000"
+            )
+        ]
+        open_event_ids = [
+            str(row[0])
+            for row in connection.execute(
+                "SELECT id FROM events WHERE status = 'OPEN' AND title LIKE 'Load event %%'"
+                " LIMIT 10000"
+            )
+        ]
+    if not user_emails or not open_event_ids:
+        sys.exit("the database is not seeded, run `python -m benchmarks.load.seed`")
+    return SeedData(user_emails, open_event_ids, access_tokens=[])
+
+
+def build_scenarios(seed: SeedData) -> list[Scenario]:
+    async def signup(client: httpx.AsyncClient, _i: int) -> httpx.Response:
+        email = f"signup-{uuid.uuid4().hex}@{SEED_EMAIL_DOMAIN}"
+        return await client.post(
+            f"{API}/auth/signup/",
+            json={
+                "email": email,
+                "first_name": "Load",
+                "last_name": "Signup",
+                "password": SEED_PASSWORD,
+                "confirm_password": SEED_PASSWORD,
+            },
+        )
+
+    async def access_token(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        email = seed.user_emails[i % len(seed.user_emails)]
+        return await client.post(
+            f"{API}/auth/access-token/",
+            data={"username": email, "password": SEED_PASSWORD},
+        )
+
+    async def public_events(client: httpx.AsyncClient, _i: int) -> httpx.Response:
+        page = random.randint(1, 50)
+        return await client.get(f"{API}/events/public/", params={"page": page})
+
+    async def organizations(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        token = seed.access_tokens[i % len(seed.access_tokens)]
+        return await client.get(
+            f"{API}/organizations/", headers={"Authorization": f"Bearer {token}"}
+        )
+
+    async def rsvp(client: httpx.AsyncClient, _i: int) -> httpx.Response:
+        return await client.post(
+            f"{API}/attendees/",
+            json={
+                "event_id": random.choice(seed.open_event_ids),
+                "email": f"rsvp-{uuid.uuid4().hex}@{SEED_EMAIL_DOMAIN}",
+            },
+        )
+
+    return [
+        Scenario("signup", signup, expected_status=201),
+        Scenario("access_token", access_token, expected_status=200),
+        Scenario("public_events", public_events, expected_status=200),
+        Scenario("organizations", organizations, expected_status=200),
+        Scenario("rsvp", rsvp, expected_status=201),
+    ]
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    index = min(int(fraction * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, scenario: Scenario, requests: int, concurrency: int
+) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    next_request = 0
+
+    async def worker() -> None:
+        nonlocal errors, next_request
+        while next_request < requests:
+            i = next_request
+            next_request += 1
+            started = time.perf_counter()
+            try:
+                response = await scenario.send(client, i)
+                is_error = response.status_code != scenario.expected_status
+            except httpx.HTTPError:
+                is_error = True
+            if is_error:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    milliseconds = [latency * 1000 for latency in latencies] or [0.0]
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 2),
+        "latency_ms": {
+            "p50": round(percentile(milliseconds, 0.50), 2),
+            "p95": round(percentile(milliseconds, 0.95), 2),
+            "p99": round(percentile(milliseconds, 0.99), 2),
+            "mean": round(statistics.fmean(milliseconds), 2),
+            "max": round(milliseconds[-1], 2),
+        },
+    }
+
+
+async def fetch_access_tokens(
+    client: httpx.AsyncClient, seed: SeedData, count: int
+) -> list[str]:
+    tokens = []
+    for email in seed.user_emails[:count]:
+        response = await client.post(
+            f"{API}/auth/access-token/",
+            data={"username": email, "password": SEED_PASSWORD},
+        )
+        response.raise_for_status()
+        tokens.append(response.json()["data"]["access_token"])
+    return tokens
+
+
+async def run(args: argparse.Namespace, seed: SeedData) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(
+        base_url=args.base_url, limits=limits, timeout=60
+    ) as client:
+        seed.access_tokens = await fetch_access_tokens(client, seed, count=20)
+        scenarios = build_scenarios(seed)
+        selected = [s for s in scenarios if not args.only or s.name in args.only]
+        results = {}
+        for scenario in selected:
+            # warm up the connections and the caches of the workers
+            await run_scenario(client, scenario, args.warmup, args.concurrency)
+            results[scenario.name] = await run_scenario(
+                client, scenario, args.requests, args.concurrency
+            )
+            print(scenario.name, json.dumps(results[scenario.name]), file=sys.stderr)
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(UTC).isoformat(),
+        "concurrency": args.concurrency,
+        "requests_per_scenario": args.requests,
+        "workers": args.workers,
+        "scenarios": results,
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def wait_until(is_ready: Callable[[], bool], what: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while not is_ready():
+        if time.monotonic() > deadline:
+            sys.exit(f"{what} did not start in {timeout}s")
+        time.sleep(0.2)
+
+
+def is_port_open(port: int) -> bool:
+    with socket.socket() as sock:
+        return sock.connect_ex(("127.0.0.1", port)) == 0
+
+
+def is_app_ready(base_url: str) -> bool:
+    try:
+        return httpx.get(f"{base_url}{API}/openapi.json").status_code == 200
+    except httpx.HTTPError:
+        return False
+
+
+@contextmanager
+def serve(args: argparse.Namespace) -> Iterator[None]:
+    """Starts the SMTP stand-in and the app, the rate limits and the scheduled jobs
+    are disabled so they don't skew the measurements"""
+    env = {
+        **os.environ,
+        "MAIL_SERVER": "localhost",
+        "MAIL_PORT": str(SMTP_PORT),
+        "RATE_LIMIT_ENABLED": "false",
+        "SCHEDULER_ENABLED": "false",
+        "PROFILING_ENABLED": "false",
+    }
+    app_log = open(args.app_log, "a") if args.app_log else subprocess.DEVNULL
+    processes = []
+    try:
+        if not is_port_open(SMTP_PORT):
+            processes.append(
+                subprocess.Popen(
+                    [sys.executable, "app/extras/email_test_server.py"],
+                    stdout=subprocess.DEVNULL,
+                )
+            )
+            wait_until(lambda: is_port_open(SMTP_PORT), "the SMTP stand-in")
+        processes.append(
+            subprocess.Popen(
+                [
+                    sys.executable,
+                    "-m",
+                    "uvicorn",
+                    "app.main:app",
+                    "--port",
+                    str(args.port),
+                    "--workers",
+                    str(args.workers),
+                    "--log-level",
+                    "warning",
+                ],
+                env=env,
+                stdout=app_log,
+                stderr=app_log,
+            )
+        )
+        wait_until(lambda: is_app_ready(args.base_url), "the app")
+        yield
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait(timeout=30)
+        if args.app_log:
+            app_log.close()
+
+
+def compare(results: dict, baseline: dict) -> None:
+    """Prints the change of the throughput and p99 latency of each flow"""
+    for name, result in results["scenarios"].items():
+        previous = baseline["scenarios"].get(name)
+        if previous is None:
+            continue
+        rps_change = (result["rps"] / previous["rps"] - 1) * 100
+        p99_change = (
+            result["latency_ms"]["p99"] / previous["latency_ms"]["p99"] - 1
+        ) * 100
+        print(
+            f"{name:<15} rps {result['rps']:>9.1f} ({rps_change:+.1f}%)"
+            f"  p99 {result['latency_ms']['p99']:>8.1f}ms ({p99_change:+.1f}%)",
+            file=sys.stderr,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--base-url", help="benchmark a running app instead")
+    parser.add_argument("--app-log", help="file to write the logs of the app to")
+    parser.add_argument("--only", nargs="*", help="flows to run, all by default")
+    parser.add_argument("--output", help="file to write the results to")
+    parser.add_argument("--baseline", help="results of a previous run to compare to")
+    args = parser.parse_args()
+
+    seed = load_seed_data()
+    if args.base_url:
+        results = asyncio.run(run(args, seed))
+    else:
+        args.base_url = f"http://127.0.0.1:{args.port}"
+        with serve(args):
+            results = asyncio.run(run(args, seed))
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    print(output)
+    if args.baseline:
+        with open(args.baseline) as file:
+            compare(results, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Seeds the database configured by the `POSTGRES_*` settings with load test data.
+
+Every seeded row is generated server side with `generate_series`, at `--scale 1` it
+creates 10k users, 100 organizations of 1k members, 100k events and 1M attendees.
+Seeded rows are recognisable (`@loadtest.eventtrakka.com` emails and `load-org-`
+organization names) and `--reset` deletes them, use a dedicated database anyway.
+
+Usage:
+    python -m benchmarks.load.seed [--scale 1.0] [--reset]
+"""
+
+import argparse
+import time
+
+import psycopg
+
+from app.core.config import settings
+from app.core.security import get_password_hash
+
+SEED_EMAIL_DOMAIN = "loadtest.eventtrakka.com"
+SEED_ORGANIZATION_PREFIX = "load-org-"
+SEED_PASSWORD = "load-test-password"
+
+USERS = 10_000
+ORGANIZATIONS = 100
+MEMBERS_PER_ORGANIZATION = 1_000
+EVENTS = 100_000
+ATTENDEES = 1_000_000
+
+RESET_SQL = [
+    f"DELETE FROM organizations WHERE name LIKE '{SEED_ORGANIZATION_PREFIX}%'",
+    f"DELETE FROM users WHERE email LIKE '%@{SEED_EMAIL_DOMAIN}'",
+]
+
+USERS_SQL = f"""
+INSERT INTO users (
+    id, created_at, last_updated_at, email, password, first_name, last_name,
+    is_active, is_email_verified, permissions_version
+)
+SELECT gen_random_uuid(), now(), now(), 'user-' || n || '@{SEED_EMAIL_DOMAIN}',
+    %(password_hash)s, 'Load', 'User ' || n, true, true, 0
+FROM generate_series(0, %(users)s - 1) AS n
+"""
+
+# organization `o` is owned by user `o`, its members are the users following the owner
+ORGANIZATIONS_SQL = f"""
+WITH seeded_users AS (
+    SELECT id, split_part(split_part(email, '@', 1), '-', 2)::int AS n
+    FROM users WHERE email LIKE '%%@{SEED_EMAIL_DOMAIN}' AND email LIKE 'user-%%'
+)
+INSERT INTO organizations (
+    id, created_at, last_updated_at, name, is_verified, about, owner_id, members
+)
+SELECT gen_random_uuid(), now(), now(), '{SEED_ORGANIZATION_PREFIX}' || o, true,
+    'Seeded for load tests', owner.id, members.members
+FROM generate_series(0, %(organizations)s - 1) AS o
+JOIN seeded_users AS owner ON owner.n = o %% %(users)s
+CROSS JOIN LATERAL (
+    SELECT jsonb_agg(
+        jsonb_build_object(
+            'id', member.id,
+            'role', CASE WHEN member.id = owner.id THEN 'Owner' ELSE 'Member' END,
+            'permissions', CASE WHEN member.id = owner.id
+                THEN '["EVENT:WRITE", "MEMBERS:INVITE", "MEMBERS:APPROVE_REQUEST", "MEMBERS:MANAGE"]'::jsonb
+                ELSE '["EVENT:WRITE"]'::jsonb END
+        )
+    ) AS members
+    FROM seeded_users AS member
+    WHERE (member.n - o %% %(users)s + %(users)s) %% %(users)s < %(members)s
+) AS members
+"""
+
+EVENTS_SQL = f"""
+WITH seeded_organizations AS (
+    SELECT id, substr(name, length('{SEED_ORGANIZATION_PREFIX}') + 1)::int AS n
+    FROM organizations WHERE name LIKE '{SEED_ORGANIZATION_PREFIX}%%'
+)
+INSERT INTO events (
+    id, created_at, last_updated_at, source, organization_id, status,
+    mode_of_attending, title, description, starts_at, ends_at, location, link
+)
+SELECT gen_random_uuid(), now(), now(), 'EVENTTRAKKA', organization.id,
+    (ARRAY['DRAFT', 'OPEN', 'OPEN', 'OPEN', 'CLOSE', 'ARCHIVE'])[1 + e %% 6]
+        ::eventpublicationstatus,
+    (CASE WHEN e %% 2 = 0 THEN 'VIRTUAL' ELSE 'PHYSICAL' END)::eventmode,
+    'Load event ' || e, 'Seeded for load tests',
+    now() + (e %% 365 - 120) * interval '1 day',
+    now() + (e %% 365 - 120) * interval '1 day' + interval '3 hours',
+    CASE WHEN e %% 2 = 1 THEN 'Ado-Ekiti' END,
+    CASE WHEN e %% 2 = 0 THEN 'https://meet.example.com/' || e END
+FROM generate_series(0, %(events)s - 1) AS e
+JOIN seeded_organizations AS organization ON organization.n = e %% %(organizations)s
+"""
+
+# attendees are spread over the seeded events that are not drafts
+ATTENDEES_SQL = f"""
+WITH seeded_events AS (
+    SELECT id, (row_number() OVER (ORDER BY id)) - 1 AS n
+    FROM events
+    WHERE title LIKE 'Load event %%' AND status != 'DRAFT'
+),
+seeded_events_count AS (SELECT count(*) AS total FROM seeded_events)
+INSERT INTO attendees (
+    id, created_at, last_updated_at, event_id, attended_event, email
+)
+SELECT gen_random_uuid(), now(), now(), event.id, a %% 3 = 0,
+    'attendee-' || a || '@{SEED_EMAIL_DOMAIN}'
+FROM generate_series(0, %(attendees)s - 1) AS a
+CROSS JOIN seeded_events_count
+JOIN seeded_events AS event ON event.n = a %% seeded_events_count.total
+"""
+
+
+def connect() -> psycopg.Connection:
+    return psycopg.connect(
+        host=settings.POSTGRES_HOST,
+        port=settings.POSTGRES_PORT,
+        user=settings.POSTGRES_USER,
+        password=settings.POSTGRES_PASSWORD,
+        dbname=settings.POSTGRES_DB,
+    )
+
+
+def seed(scale: float, reset: bool) -> dict[str, int]:
+    volumes = {
+        "users": max(int(USERS * scale), 10),
+        "organizations": max(int(ORGANIZATIONS * scale), 1),
+        "members": max(int(MEMBERS_PER_ORGANIZATION * scale), 1),
+        "events": max(int(EVENTS * scale), 10),
+        "attendees": max(int(ATTENDEES * scale), 10),
+    }
+    params = {**volumes, "password_hash": get_password_hash(SEED_PASSWORD)}
+    with connect() as connection:
+        if reset:
+            for statement in RESET_SQL:
+                connection.execute(statement)
+        for name, statement in [
+            ("users", USERS_SQL),
+            ("organizations", ORGANIZATIONS_SQL),
+            ("events", EVENTS_SQL),
+            ("attendees", ATTENDEES_SQL),
+        ]:
+            started = time.perf_counter()
+            rowcount = connection.execute(statement, params).rowcount
+            print(f"seeded {rowcount} {name} in {time.perf_counter() - started:.1f}s")
+        connection.commit()
+    with connect() as connection:
+        connection.autocommit = True
+        connection.execute("ANALYZE")
+    return volumes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument(
+        "--reset", action="store_true", help="delete previously seeded rows first"
+    )
+    args = parser.parse_args()
+    seed(args.scale, args.reset)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Micro-benchmarks of the hot paths, they run offline: nothing is sent to the database
+or the mail server.
+
+Usage:
+    pytest benchmarks/micro --benchmark-autosave
+    pytest benchmarks/micro --benchmark-compare --benchmark-compare-fail=mean:15%
+"""
+
+import os
+import uuid
+
+import pytest
+
+# the settings are loaded on import, the database and mail server are never reached
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+os.environ.setdefault("PROJECT_NAME", "EventTrakka")
+os.environ.setdefault("POSTGRES_HOST", "localhost")
+os.environ.setdefault("POSTGRES_PORT", "5432")
+os.environ.setdefault("POSTGRES_USER", "postgres")
+os.environ.setdefault("POSTGRES_DB", "eventtrakka")
+os.environ.setdefault("MAIL_SERVER", "localhost")
+
+from app.models.organizations import OrganizationMemberPermission  # noqa: E402
+
+
+def build_members(count: int) -> list[dict]:
+    """Organization members as stored in the `organizations.members` JSONB column"""
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "role": "Member",
+            "permissions": [OrganizationMemberPermission.MANAGE_EVENTS.value],
+        }
+        for _ in range(count)
+    ]
+
+
+@pytest.fixture(scope="session", params=[100, 10_000], ids=lambda n: f"{n}-members")
+def members(request) -> list[dict]:
+    return build_members(request.param)
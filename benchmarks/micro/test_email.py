@@ -0,0 +1,20 @@
+"""Rendering of the emails sent by `EmailService`, i.e. everything `send_bulk_mail` does
+per email before connecting to the mail server"""
+
+from app.core.config import settings
+from app.core.email_service import build_message, subject_template
+
+
+def test_render_verification_email(benchmark):
+    def render():
+        subject = subject_template("Verify your Email - {{ project_name }}").render(
+            {"project_name": settings.PROJECT_NAME}
+        )
+        return build_message(
+            "jane@eventtrakka.com",
+            subject,
+            "verify-email.html",
+            {"name": "Jane", "otp": "123456"},
+        )
+
+    benchmark(render)
@@ -0,0 +1,19 @@
+from sqlalchemy.dialects import postgresql
+
+from app.models.organizations import OrganizationMember, OrganizationMembersSAType
+
+DIALECT = postgresql.dialect()
+
+
+def test_process_bind_param(benchmark, members):
+    field = OrganizationMembersSAType
+    value = OrganizationMember.coerce("members", members)
+    benchmark(field.process_bind_param, value, DIALECT)
+
+
+def test_process_result_value(benchmark, members):
+    benchmark(OrganizationMembersSAType.process_result_value, members, DIALECT)
+
+
+def test_coerce(benchmark, members):
+    benchmark(OrganizationMember.coerce, "members", members)
@@ -0,0 +1,124 @@
+"""The python side of the `BaseModelManager.create`, `get` and `filter` calls: the
+`instrumented` wrapper, opening the session of `get_db_session` or
+`get_read_session`, validating the created model and building the statements and
+the page. The sessions are real but execute no statement, the database round trip
+and the compilation of the statements are left out."""
+
+import asyncio
+import uuid
+from collections.abc import Iterator
+
+import pytest
+from fastapi_pagination import Params, set_params
+from sqlalchemy.orm import Session
+
+from app.core.utils import aware_datetime_now
+from app.models import Event, User
+from app.models.events import EventMode, EventPublicationStatus
+
+
+class StubResult:
+    def __init__(self, rows: list[tuple]):
+        self.rows = rows
+
+    def scalar_one(self):
+        return self.rows[0][0]
+
+    def unique(self) -> "StubResult":
+        return self
+
+    def all(self) -> list[tuple]:
+        return self.rows
+
+
+@pytest.fixture(scope="module")
+def rows() -> Iterator[list[tuple]]:
+    """The rows returned by every statement executed by the sessions, set by the
+    benchmark"""
+    rows: list[tuple] = []
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(Session, "execute", lambda *_, **__: StubResult(rows))
+        monkeypatch.setattr(Session, "scalar", lambda *_, **__: len(rows))
+        monkeypatch.setattr(Session, "commit", lambda *_, **__: None)
+        monkeypatch.setattr(Session, "refresh", lambda *_, **__: None)
+        yield rows
+
+
+@pytest.fixture(scope="module")
+def event_loop() -> Iterator[asyncio.AbstractEventLoop]:
+    loop = asyncio.new_event_loop()
+    yield loop
+    # the session generators left at their first session are closed by tasks
+    # scheduled when they are collected
+    loop.run_until_complete(asyncio.gather(*asyncio.all_tasks(loop)))
+    loop.run_until_complete(loop.shutdown_asyncgens())
+    loop.close()
+
+
+def build_user() -> User:
+    return User.model_validate(
+        {
+            "email": "jane@eventtrakka.com",
+            "first_name": "Jane",
+            "last_name": "Doe",
+            "password": "hashed",
+            "last_updated_at": aware_datetime_now(),
+        }
+    )
+
+
+def build_event() -> Event:
+    starts_at = aware_datetime_now()
+    return Event(
+        status=EventPublicationStatus.OPEN,
+        mode_of_attending=EventMode.VIRTUAL,
+        title="PyCon",
+        starts_at=starts_at,
+        ends_at=starts_at,
+        link="https://eventtrakka.com/live",
+        last_updated_at=starts_at,
+    )
+
+
+@pytest.mark.usefixtures("rows")
+def test_create(benchmark, event_loop):
+    def create():
+        creation_data = {
+            "email": "jane@eventtrakka.com",
+            "first_name": "Jane",
+            "last_name": "Doe",
+            "password": "hashed",
+        }
+        return event_loop.run_until_complete(
+            User.objects.create(creation_data=creation_data)
+        )
+
+    assert benchmark(create).email == "jane@eventtrakka.com"
+
+
+def test_get(benchmark, event_loop, rows):
+    rows[:] = [(build_user(),)]
+    user_id = uuid.uuid4()
+
+    def get():
+        return event_loop.run_until_complete(User.objects.get(None, User.id == user_id))
+
+    assert benchmark(get) is rows[0][0]
+
+
+def test_filter(benchmark, event_loop, rows):
+    rows[:] = [(build_event(),) for _ in range(50)]
+
+    def filter_page():
+        with set_params(Params(page=1, size=50)):
+            return event_loop.run_until_complete(
+                Event.objects.filter(
+                    None,
+                    Event.status.in_(
+                        [EventPublicationStatus.OPEN, EventPublicationStatus.CLOSE]
+                    ),
+                    options=Event.objects.listing_load_options,
+                )
+            )
+
+    assert len(benchmark(filter_page).items) == 50
@@ -0,0 +1,40 @@
+import uuid
+
+import pytest
+
+from app.core.utils import aware_datetime_now
+from app.models.organizations import Organization, OrganizationMemberPermission
+
+from .conftest import build_members
+
+
+@pytest.fixture(scope="module")
+def organization() -> Organization:
+    return Organization.model_validate(
+        {
+            "name": "benchmark",
+            "about": None,
+            "owner_id": uuid.uuid4(),
+            "members": build_members(10_000),
+            "last_updated_at": aware_datetime_now(),
+        }
+    )
+
+
+def test_member_has_permission_last_member(benchmark, organization):
+    member_id = organization.members[-1].id
+    result = benchmark(
+        organization.member_has_permission,
+        OrganizationMemberPermission.MANAGE_EVENTS,
+        user_id=member_id,
+    )
+    assert result
+
+
+def test_member_has_permission_non_member(benchmark, organization):
+    result = benchmark(
+        organization.member_has_permission,
+        OrganizationMemberPermission.MANAGE_EVENTS,
+        user_id=uuid.uuid4(),
+    )
+    assert not result
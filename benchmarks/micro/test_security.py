@@ -0,0 +1,29 @@
+import uuid
+from datetime import timedelta
+
+from app.core import security
+from app.models.schemas.api import TokenSubject
+
+EXPIRES_DELTA = timedelta(minutes=30)
+
+
+def test_create_access_token(benchmark):
+    subject = TokenSubject(type="access_token", user_id=uuid.uuid4())
+    benchmark(security.create_access_token, subject, EXPIRES_DELTA)
+
+
+def test_decode_jwt_subject_cached(benchmark):
+    subject = TokenSubject(type="access_token", user_id=uuid.uuid4())
+    token = security.create_access_token(subject, EXPIRES_DELTA)
+    benchmark(security.decode_jwt_subject, token)
+
+
+def test_decode_jwt_subject_cold(benchmark):
+    subject = TokenSubject(type="access_token", user_id=uuid.uuid4())
+    token = security.create_access_token(subject, EXPIRES_DELTA)
+
+    def decode_cold():
+        security.verified_tokens.clear()
+        return security.decode_jwt_subject(token)
+
+    benchmark(decode_cold)
@@ -0,0 +1,84 @@
+"""Compares loading rows keyed by random (`uuid4`) and time-ordered (`uuid7`) ids into
+a table shaped like `attendees`: insert throughput, WAL written and primary key size.
+
+The rows are inserted in batches of one transaction each, like the RSVPs of the app,
+into scratch tables of the database configured by the `POSTGRES_*` settings which are
+dropped afterwards.
+
+Usage:
+    python -m benchmarks.uuid_inserts [--rows 10000000] [--batch 10000]
+"""
+
+import argparse
+import json
+import time
+import uuid
+from collections.abc import Callable
+
+from app.core.utils import uuid7
+from benchmarks.load.seed import connect
+
+SCHEMES: dict[str, Callable[[], uuid.UUID]] = {"uuid4": uuid.uuid4, "uuid7": uuid7}
+
+CREATE_TABLE_SQL = """
+CREATE TABLE {table} (
+    id uuid PRIMARY KEY,
+    created_at timestamptz NOT NULL DEFAULT now(),
+    event_id uuid NOT NULL,
+    attended_event boolean NOT NULL DEFAULT false,
+    email varchar(320) NOT NULL
+)
+"""
+
+
+def load(scheme: str, rows: int, batch: int) -> dict:
+    generate_id = SCHEMES[scheme]
+    table = f"benchmark_{scheme}_attendees"
+    event_ids = [str(uuid.uuid4()) for _ in range(100)]
+    with connect() as connection:
+        connection.autocommit = True
+        connection.execute(f"DROP TABLE IF EXISTS {table}")
+        connection.execute(CREATE_TABLE_SQL.format(table=table))
+        wal_start = connection.execute("SELECT pg_current_wal_lsn()").fetchone()[0]
+        elapsed = 0.0
+        try:
+            for start in range(0, rows, batch):
+                lines = "".join(
+                    f"{generate_id()}\t{event_ids[n % 100]}\tattendee-{n}@example.com\n"
+                    for n in range(start, min(start + batch, rows))
+                )
+                started = time.perf_counter()
+                with connection.transaction():
+                    with connection.cursor().copy(
+                        f"COPY {table} (id, event_id, email) FROM STDIN"
+                    ) as copy:
+                        copy.write(lines)
+                elapsed += time.perf_counter() - started
+            wal_bytes, index_bytes, table_bytes = connection.execute(
+                "SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), %s),"
+                " pg_relation_size(%s), pg_relation_size(%s)",
+                (wal_start, f"{table}_pkey", table),
+            ).fetchone()
+        finally:
+            connection.execute(f"DROP TABLE IF EXISTS {table}")
+    return {
+        "rows": rows,
+        "rows_per_second": round(rows / elapsed),
+        "wal_mb": round(float(wal_bytes) / 2**20, 1),
+        "primary_key_mb": round(index_bytes / 2**20, 1),
+        "table_mb": round(table_bytes / 2**20, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--batch", type=int, default=10_000)
+    args = parser.parse_args()
+
+    results = {scheme: load(scheme, args.rows, args.batch) for scheme in SCHEMES}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()